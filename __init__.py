@@ -0,0 +1,4 @@
+"""
+โปรแกรมจัดตารางเรียน/ห้องเรียนด้วย CP-SAT (import เป็น package ชื่อ src)
+ไม่ import module ย่อยที่นี่ เพื่อให้คำสั่งสั้นๆ เริ่มเร็ว
+"""
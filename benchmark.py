@@ -0,0 +1,333 @@
+"""
+Benchmark สำหรับเปรียบเทียบ formulation / โหมดต่างๆ ของโมเดล
+วิธีใช้: python -m src.benchmark room_modes --time-limit 30
+         python -m src.benchmark parallel_build (build อย่างเดียว ไม่ solve)
+         python -m src.benchmark imports   (ไม่ต้องโหลดข้อมูล)
+         python -m src.benchmark occupancy (ไม่ต้องโหลดข้อมูล)
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+from src.main import default_data_dir
+
+# ortools / pandas / numpy ถูก import ในแต่ละ benchmark (--help และ imports เริ่มเร็ว)
+
+# คำสั่งที่ใช้วัดเวลาเริ่มต้น (import time) ของแต่ละทางเข้า
+IMPORT_COMMANDS = {
+    "main --help": ["-m", "src.main", "--help"],
+    "import src.main": ["-c", "import src.main"],
+    "import src.validator": ["-c", "import src.validator"],
+    "import src.data_loader": ["-c", "import src.data_loader"],
+    "import src.model": ["-c", "import src.model"],
+    "service --help": ["-m", "src.service", "--help"],
+    "benchmark --help": ["-m", "src.benchmark", "--help"],
+}
+
+
+def _build_and_solve(data, options, time_limit):
+    from ortools.sat.python import cp_model
+    from src.model import TimetableModel
+    from src.solver import TimetableSolver
+
+    build_start = time.time()
+    timetable_model = TimetableModel(data, options=options)
+    model, all_vars = timetable_model.build_model()
+    build_time = time.time() - build_start
+
+    proto = model.Proto()
+    solver = TimetableSolver(
+        model,
+        all_vars,
+        data,
+        params={"max_time_in_seconds": time_limit, "log_search_progress": False},
+    )
+    status = solver.run()
+
+    row = {
+        "options": options,
+        "build_s": round(build_time, 3),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "status": solver.solver.StatusName(status),
+        "objective": None,
+        "bound": None,
+        "gap": None,
+        "solve_s": round(solver.solver.WallTime(), 3),
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        row["objective"] = solver.solver.ObjectiveValue()
+        row["bound"] = solver.solver.BestObjectiveBound()
+        if row["objective"]:
+            row["gap"] = round(
+                abs(row["objective"] - row["bound"]) / abs(row["objective"]), 4
+            )
+        # ตรวจว่าเลือกห้องจริงได้ครบ (โหมด pool ใช้ colouring หลัง solve)
+        solver.extract_solution()
+    return row
+
+
+def bench_room_modes(data, time_limit=30.0, modes=("dense", "sparse", "pool")):
+    """
+    เปรียบเทียบ dense (ทุกกิจกรรม x ทุกห้อง) / sparse / pool (cumulative ต่อ room class)
+    """
+    rows = []
+    for mode in modes:
+        print(f"\n=== room_mode: {mode} ===")
+        rows.append(_build_and_solve(data, {"room_mode": mode}, time_limit))
+    _print_table(rows)
+    return rows
+
+
+def bench_balance(data, time_limit=30.0):
+    """
+    เปรียบเทียบ room balance แบบ max - min ทั้งระบบ กับ deviation ภายในกลุ่มความจุ
+    ดู bound / gap และเวลาที่ใช้จนถึง relative_gap_limit (solve_s)
+    """
+    rows = []
+    for mode in ("max_min", "deviation"):
+        print(f"\n=== balance_mode: {mode} ===")
+        rows.append(_build_and_solve(data, {"balance_mode": mode}, time_limit))
+    _print_table(rows)
+    return rows
+
+
+def bench_same_room(data, time_limit=30.0):
+    """
+    เปรียบเทียบ same-room objective แบบนับห้องที่ใช้ (used) กับ home room ต่อกลุ่ม
+    """
+    rows = []
+    for mode in ("used", "home"):
+        print(f"\n=== same_room_mode: {mode} ===")
+        rows.append(_build_and_solve(data, {"same_room_mode": mode}, time_limit))
+    _print_table(rows)
+    return rows
+
+
+def bench_naming(data, time_limit=30.0):
+    """
+    เปรียบเทียบเวลา build ระหว่างตั้งชื่อตัวแปรทุกตัว กับ debug_names=False (ชื่อแบบ lazy)
+    """
+    rows = []
+    for debug in (True, False):
+        print(f"\n=== debug_names: {debug} ===")
+        rows.append(_build_and_solve(data, {"debug_names": debug}, time_limit))
+    _print_table(rows)
+    return rows
+
+
+def bench_parallel_build(data, time_limit=30.0):
+    """
+    เปรียบเทียบการสร้าง hard constraint กลุ่มพื้นฐานแบบ sequential กับแบบขนาน (PARALLEL_BUILD)
+    core_s = เฉพาะกลุ่มที่ขนานได้ (รวม skeleton + merge), build_s = build ทั้งโมเดล
+    ไม่ solve (time_limit ไม่ใช้) และตรวจว่า constraint ที่ได้เหมือนกันทุกตัวตามลำดับ
+    """
+    from src.config import PARALLEL_BUILD
+    from src.constraints import Constraints
+    from src.model import TimetableModel
+
+    saved = dict(PARALLEL_BUILD)
+    rows = []
+    protos = []
+    try:
+        for parallel in (False, True):
+            print(f"\n=== parallel_build: {parallel} ===")
+            PARALLEL_BUILD.update(enabled=parallel, min_room_vars=0)
+
+            timetable_model = TimetableModel(data)
+            timetable_model.create_variables()
+            constraints = Constraints(
+                timetable_model.model,
+                timetable_model.all_vars,
+                timetable_model.model_data,
+                options=timetable_model.options,
+                names=timetable_model.names,
+            )
+            core_start = time.time()
+            if parallel:
+                constraints._add_core_families_parallel()
+            else:
+                model_data = timetable_model.model_data
+                constraints._add_core_families(
+                    model_data["courses"], model_data["rooms"]
+                )
+            core_time = time.time() - core_start
+
+            build_start = time.time()
+            model, _ = TimetableModel(data).build_model()
+            build_time = time.time() - build_start
+
+            proto = model.Proto()
+            protos.append([str(ct) for ct in proto.constraints])
+            rows.append(
+                {
+                    "parallel": parallel,
+                    "core_s": round(core_time, 3),
+                    "build_s": round(build_time, 3),
+                    "constraints": len(proto.constraints),
+                }
+            )
+    finally:
+        PARALLEL_BUILD.clear()
+        PARALLEL_BUILD.update(saved)
+
+    same = protos[0] == protos[1]
+    for row in rows:
+        row["same_constraints"] = same
+    _print_table(rows)
+    return rows
+
+
+def bench_imports(repeat=5):
+    """
+    วัดเวลาเริ่ม process ของแต่ละคำสั่ง (ค่าต่ำสุดจาก repeat ครั้ง, วินาที)
+    รันแบบ subprocess ใหม่ทุกครั้งเพื่อไม่ให้ module ที่ import แล้วใน process นี้มีผล
+    """
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (package_parent, env.get("PYTHONPATH")) if p
+    )
+
+    rows = []
+    for name, args in IMPORT_COMMANDS.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable] + args,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+            times.append(time.perf_counter() - start)
+        rows.append({"command": name, "best_s": round(min(times), 4)})
+    _print_table(rows)
+    return rows
+
+
+def bench_occupancy(num_slots=75, num_keys=200, queries=200000, seed=0):
+    """
+    วัด throughput ของ OccupancyIndex (ล้านครั้งต่อวินาที) บนข้อมูลสุ่ม
+    - is_free: ถาม key เดียว, all_free: ถามห้อง + อาจารย์ 2 คนพร้อมกัน
+    - free_starts: ถามทุก start ของ key ชุดหนึ่งพร้อมกัน (นับเป็นจำนวน start ที่ถาม)
+    """
+    import random
+
+    import numpy as np
+    from src.occupancy import OccupancyIndex
+
+    rng = random.Random(seed)
+    index = OccupancyIndex(num_slots)
+    keys = [("room", k) for k in range(num_keys)]
+    for key in keys:
+        for _ in range(num_slots // 6):
+            duration = rng.choice((1, 2, 3, 4))
+            index.assign(key, rng.randrange(num_slots - duration + 1), duration)
+
+    durations = [rng.choice((1, 2, 3, 4)) for _ in range(queries)]
+    probes = [
+        (
+            keys[rng.randrange(num_keys)],
+            [keys[rng.randrange(num_keys)] for _ in range(3)],
+            rng.randrange(num_slots - d + 1),
+            d,
+        )
+        for d in durations
+    ]
+
+    rows = []
+    start = time.perf_counter()
+    for key, _, s, d in probes:
+        index.is_free(key, s, d)
+    rows.append(_throughput("is_free", queries, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for _, group, s, d in probes:
+        index.all_free(group, s, d)
+    rows.append(_throughput("all_free (3 keys)", queries, time.perf_counter() - start))
+
+    starts = np.arange(num_slots - 3, dtype=np.int64)
+    batches = max(1, queries // len(starts))
+    start = time.perf_counter()
+    for k in range(batches):
+        _, group, _, _ = probes[k]
+        index.free_starts(group, starts, 4)
+    rows.append(
+        _throughput(
+            "free_starts (3 keys)", batches * len(starts), time.perf_counter() - start
+        )
+    )
+
+    # assign + unassign คู่กัน (ย้ายกิจกรรมไปมา)
+    start = time.perf_counter()
+    for key, _, s, d in probes:
+        index.assign(key, s, d)
+        index.unassign(key, s, d)
+    rows.append(_throughput("assign+unassign", queries, time.perf_counter() - start))
+    _print_table(rows)
+    return rows
+
+
+def _throughput(name, count, seconds):
+    return {
+        "operation": name,
+        "count": count,
+        "seconds": round(seconds, 4),
+        "M_per_s": round(count / seconds / 1e6, 2) if seconds else None,
+    }
+
+
+def _print_table(rows):
+    if not rows:
+        return
+    keys = list(rows[0].keys())
+    print("\n| " + " | ".join(keys) + " |")
+    print("|" + "---|" * len(keys))
+    for row in rows:
+        print("| " + " | ".join(str(row[k]) for k in keys) + " |")
+
+
+BENCHMARKS = {
+    "room_modes": bench_room_modes,
+    "balance": bench_balance,
+    "same_room": bench_same_room,
+    "naming": bench_naming,
+    "parallel_build": bench_parallel_build,
+}
+
+# benchmark ที่ไม่ต้องโหลดข้อมูล
+NO_DATA_BENCHMARKS = {
+    "imports": bench_imports,
+    "occupancy": bench_occupancy,
+}
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Timetable benchmarks")
+    parser.add_argument(
+        "name", choices=sorted(list(BENCHMARKS) + list(NO_DATA_BENCHMARKS))
+    )
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--data-dir", default=None)
+    args = parser.parse_args(argv)
+
+    if args.name in NO_DATA_BENCHMARKS:
+        NO_DATA_BENCHMARKS[args.name]()
+        return
+    from src.data_loader import DataLoader
+    from src.presolve import reduce_data
+
+    # เหมือนโหมดจริง (presolve ก่อน build) และไม่ถามรหัสวิชาที่จะตัดทาง terminal
+    data = reduce_data(
+        DataLoader(args.data_dir or default_data_dir(), interactive=False).load_data()
+    )
+    BENCHMARKS[args.name](data, time_limit=args.time_limit)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,230 @@
+import time
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import COARSE_TO_FINE
+from src.domains import day_key
+from src.model import TimetableModel
+from src.solver import TimetableSolver
+
+
+def build_coarse_grid(time_slots, factor):
+    """
+    รวมคาบละเอียดที่ติดกัน (วันเดียวกัน) ทีละ factor คาบเป็นคาบหยาบ 1 คาบ
+    เศษท้ายช่วง (เช่น 11:30-12:00 ก่อนพักเที่ยง) จะไม่มีคาบหยาบ
+    คืนค่า (coarse_slots, fine_index) โดย fine_index[k] = คาบละเอียดแรกของคาบหยาบ k
+    """
+    coarse_slots = []
+    fine_index = []
+    run = []
+    for i, slot in enumerate(time_slots):
+        if run:
+            prev = time_slots[run[-1]]
+            if day_key(prev) != day_key(slot) or prev["end_min"] != slot["start_min"]:
+                run = []
+        run.append(i)
+        if len(run) == factor:
+            first, last = time_slots[run[0]], time_slots[run[-1]]
+            label = (
+                first["label"].rsplit("-", 1)[0] + "-" + last["label"].rsplit("-", 1)[1]
+            )
+            coarse_slots.append(dict(first, end_min=last["end_min"], label=label))
+            fine_index.append(run[0])
+            run = []
+    return coarse_slots, fine_index
+
+
+def coarsen_data(data, factor):
+    """
+    สร้างข้อมูลบนตารางคาบหยาบ (duration หารด้วย factor)
+    เวลาว่างอาจารย์: คาบหยาบว่างเมื่อคาบละเอียดทุกคาบในนั้นว่าง (คำตอบหยาบจึง map กลับได้เสมอ)
+    คืนค่า (coarse_data, fine_index) หรือ (None, reason) ถ้าใช้ตารางหยาบไม่ได้
+    """
+    for c in data["courses"]:
+        for comp in c.get("components", []):
+            if comp.get("duration_slots", 1) % factor:
+                return None, f"{comp['id']} has duration {comp['duration_slots']}"
+
+    coarse_slots, fine_index = build_coarse_grid(data["time_slots"], factor)
+    if not coarse_slots:
+        return None, "no coarse slots"
+
+    courses = []
+    for c in data["courses"]:
+        course = dict(c)
+        course["components"] = [
+            dict(comp, duration_slots=comp.get("duration_slots", 1) // factor)
+            for comp in c.get("components", [])
+        ]
+        courses.append(course)
+
+    availability = {}
+    for teacher, mask in data.get("teacher_availability", {}).items():
+        coarse_mask = 0
+        for k, first in enumerate(fine_index):
+            block = ((1 << factor) - 1) << first
+            if mask & block == block:
+                coarse_mask |= 1 << k
+        availability[teacher] = coarse_mask
+
+    coarse_of = {}
+    for k, first in enumerate(fine_index):
+        for i in range(first, first + factor):
+            coarse_of[i] = k
+    preferences = {}
+    for teacher, slot_costs in data.get("teacher_preferences", {}).items():
+        costs = {}
+        for i, cost in slot_costs.items():
+            if i in coarse_of:
+                costs[coarse_of[i]] = costs.get(coarse_of[i], 0) + cost
+        preferences[teacher] = costs
+
+    time_config = dict(data.get("time_config", {}))
+    time_config["slot_minutes"] = time_config.get("slot_minutes", 30) * factor
+    coarse_data = dict(
+        data,
+        courses=courses,
+        time_slots=coarse_slots,
+        teacher_availability=availability,
+        teacher_preferences=preferences,
+        time_config=time_config,
+    )
+    return coarse_data, fine_index
+
+
+class CoarseToFineSolver:
+    """
+    Coarse-to-fine solving
+    1. solve บนตารางคาบหยาบ (เช่น 60 นาที) -> โดเมนของ start เล็กลงครึ่งหนึ่ง หา feasible ได้เร็ว
+    2. map คำตอบกลับเป็นคาบละเอียด (30 นาที) ใช้เป็น hint แล้ว solve ต่อเฉพาะการ refine
+       (refine = "day": ตรึงวันของแต่ละกิจกรรม เหลือแค่เลื่อนเวลาในวัน/เปลี่ยนห้อง)
+    ถ้า duration บางกิจกรรมหารไม่ลงตัว จะ solve บนตารางละเอียดตามปกติ
+    """
+
+    def __init__(self, data, config=None, options=None):
+        self.data = data
+        self.options = options
+        self.config = dict(COARSE_TO_FINE)
+        if config:
+            self.config.update(config)
+
+        self.solution = None
+        self.stages = []
+
+    def solve(self):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        slot_minutes = self.data.get("time_config", {}).get("slot_minutes", 30)
+        coarse_minutes = int(self.config["coarse_minutes"])
+        hints = None
+        if coarse_minutes % slot_minutes or coarse_minutes <= slot_minutes:
+            print(
+                f"Coarse-to-fine: {coarse_minutes} min is not a multiple of "
+                f"{slot_minutes} min -> solving on the fine grid only"
+            )
+        else:
+            factor = coarse_minutes // slot_minutes
+            coarse_data, fine_index = coarsen_data(self.data, factor)
+            if coarse_data is None:
+                print(f"Coarse-to-fine: skipped ({fine_index}) -> fine grid only")
+            else:
+                hints = self._solve_coarse(coarse_data, fine_index)
+
+        print("--- Coarse-to-fine: refine on fine grid ---")
+        fine = TimetableModel(self.data, options=self.options)
+        model, all_vars = fine.build_model()
+        if hints:
+            fine.add_hints(hints)
+            if self.config.get("refine") == "day":
+                self._fix_days(model, all_vars, hints)
+
+        solver = TimetableSolver(
+            model,
+            all_vars,
+            self.data,
+            params={"max_time_in_seconds": float(self.config["refine_time"])},
+        )
+        status = solver.run()
+        solver.analyze_status(status)
+        self._record("fine", slot_minutes, solver, status)
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.solution = solver.extract_solution()
+            solver.export_solution(self.solution)
+        elif status == cp_model.INFEASIBLE:
+            solver.report_infeasibility()
+
+        lines = [
+            "## Coarse-to-Fine Stages",
+            "| stage | slot (min) | status | objective | wall time (s) |",
+            "|---|---|---|---|---|",
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"| {stage['stage']} | {stage['slot_minutes']} | {stage['status']} "
+                f"| {stage['objective']} | {stage['wall_time']} |"
+            )
+        solver._write_run_log(
+            status, start_dt, datetime.now(), time.time() - start_ts, lines
+        )
+        return self.solution
+
+    def _solve_coarse(self, coarse_data, fine_index):
+        """
+        solve ตารางหยาบ แล้วแปลงคำตอบเป็น {act_id: {"start": คาบละเอียด, "room"}}
+        """
+        minutes = coarse_data["time_config"]["slot_minutes"]
+        print(
+            f"--- Coarse-to-fine: coarse grid {minutes} min "
+            f"({len(coarse_data['time_slots'])} slots vs {len(self.data['time_slots'])}) ---"
+        )
+        coarse = TimetableModel(coarse_data, options=self.options)
+        model, all_vars = coarse.build_model()
+        solver = TimetableSolver(
+            model,
+            all_vars,
+            coarse_data,
+            params={"max_time_in_seconds": float(self.config["coarse_time"])},
+        )
+        status = solver.run()
+        solver.analyze_status(status)
+        self._record("coarse", minutes, solver, status)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            print("Coarse grid found no solution -> refining without hints")
+            return None
+
+        return {
+            act_id: {"start": fine_index[sol["start"]], "room": sol["room"]}
+            for act_id, sol in solver.extract_solution().items()
+        }
+
+    def _fix_days(self, model, all_vars, hints):
+        # คาบของวันเดียวกันเรียงติดกันใน time_slots -> จำกัด start ด้วยช่วง index ของวัน
+        day_range = {}
+        for i, slot in enumerate(self.data["time_slots"]):
+            lo, hi = day_range.get(day_key(slot), (i, i))
+            day_range[day_key(slot)] = (min(lo, i), max(hi, i))
+
+        for c_vars in all_vars.values():
+            for act_id, act in c_vars["activities"].items():
+                if act_id not in hints:
+                    continue
+                day = day_key(self.data["time_slots"][hints[act_id]["start"]])
+                lo, hi = day_range[day]
+                model.Add(act["start"] >= lo)
+                model.Add(act["start"] <= hi)
+
+    def _record(self, stage, slot_minutes, solver, status):
+        objective = None
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            objective = solver.solver.ObjectiveValue()
+        self.stages.append(
+            {
+                "stage": stage,
+                "slot_minutes": slot_minutes,
+                "status": solver.solver.StatusName(status),
+                "objective": objective,
+                "wall_time": round(solver.solver.WallTime(), 2),
+            }
+        )
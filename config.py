@@ -0,0 +1,256 @@
+"""
+ค่าตั้งต้น (Configuration) ของโปรแกรมจัดตาราง
+รวมค่าที่เคย hard-code ไว้ใน solver/model เพื่อให้ปรับได้จากที่เดียว
+"""
+
+# พารามิเตอร์ของ CP-SAT (ชื่อ key ตรงกับ solver.parameters)
+SOLVER_PARAMS = {
+    "max_time_in_seconds": 600.0,
+    "log_search_progress": True,
+    "relative_gap_limit": 0.03,
+    # เพิ่มจำนวน Thread เพื่อช่วยประมวลผล (ถ้าเครื่องมีหลาย Core)
+    "num_search_workers": 8,
+    # "random_seed": 42,
+}
+
+# โหมด reproducible (timetable --reproducible / --replay): input เดิม -> ตารางเดิมทุกครั้ง
+# ใช้กับโหมด single; fingerprint ของข้อมูล/config/โมเดลถูกบันทึกใน run log
+REPRODUCIBLE = {
+    # ใช้แทนค่าใน SOLVER_PARAMS
+    "params": {
+        "random_seed": 42,
+        # จำนวน worker ต้องคงที่ (ผลลัพธ์ขึ้นกับจำนวน worker)
+        "num_search_workers": 8,
+        # worker ทำงานสลับกันเป็น batch ตามลำดับตายตัว (deterministic แม้ใช้หลาย thread)
+        "interleave_search": True,
+        # หยุดตาม deterministic time (นับงานที่ทำ ไม่ขึ้นกับความเร็วเครื่อง/โหลด)
+        "max_deterministic_time": 300.0,
+        # เวลาจริงสูงสุดกันค้าง (ถ้าหยุดเพราะค่านี้ ผลลัพธ์จะไม่ reproducible)
+        "max_time_in_seconds": 3600.0,
+    },
+    # polish จำกัดด้วยจำนวนรอบแทนเวลา
+    "polish_iterations": 20000,
+}
+
+# ตารางเวลา (DataLoader._generate_time_slots): ความยาวคาบ / เวลาเรียน / พักเที่ยง
+TIME_GRID = {
+    "slot_minutes": 30,
+    "day_start": "08:30",
+    "day_end": "17:00",
+    "lunch_start": "12:00",
+    "lunch_end": "13:00",
+    "days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+}
+
+# กลุ่มนักศึกษา (cohort) สำหรับ cohort_no_overlap
+# ปกติใช้เฉพาะ Cohort.csv (รายการลงทะเบียนจริง) ถ้าไม่มีไฟล์จะไม่มี cohort
+COHORTS = {
+    # True = ไม่มี Cohort.csv ให้อนุมานจาก ชั้นปี + สาขา (DataLoader._build_cohorts)
+    # วิชากลุ่มเดียวทุกวิชาในชั้นปี (รวมวิชาเลือก) จะห้ามชนกัน จึงต้องเปิดเอง
+    "infer": False,
+}
+
+# Multi-week horizon (horizon.py): วางแผนหลายสัปดาห์ แก้ทีละ window (สัปดาห์ก่อนหน้าถูกตรึง)
+HORIZON = {
+    "weeks": 1,
+    # จำนวนสัปดาห์ต่อ window (โมเดลมีเฉพาะคาบ/กิจกรรมของ window นั้น หน่วยความจำจึงคงที่)
+    "window_weeks": 1,
+    # เวลา solve ต่อ window (วินาที)
+    "window_time": 120.0,
+    # กิจกรรมที่เคยจัดใน window ก่อน: "fix" = ตรึงเวลา/ห้องเดิม, "soft" = ย้ายได้แต่มี penalty
+    "carry": "fix",
+}
+
+# Coarse-to-fine: solve บนตารางคาบหยาบก่อน (โดเมนเล็กกว่า) แล้ว map เป็น hint ของตารางละเอียด
+COARSE_TO_FINE = {
+    # ความยาวคาบของตารางหยาบ (ต้องเป็นจำนวนเท่าของ slot_minutes และทุก duration ต้องหารลงตัว)
+    "coarse_minutes": 60,
+    # เวลา solve ตารางหยาบ / ตารางละเอียด (วินาที)
+    "coarse_time": 120.0,
+    "refine_time": 480.0,
+    # "day" = ตรึงวันของแต่ละกิจกรรมตามคำตอบหยาบ (refine เฉพาะเวลาในวัน/ห้อง)
+    # "free" = ใช้เป็น hint อย่างเดียว
+    "refine": "day",
+}
+
+# ตัวเลือกของการสร้างโมเดล (TimetableModel / Constraints)
+MODEL_OPTIONS = {
+    # "dense"  = สร้างตัวแปรห้องให้ทุกกิจกรรม x ทุกห้อง
+    # "sparse" = สร้างเฉพาะห้องที่ความจุพอสำหรับกิจกรรมนั้น
+    # "pool"   = รวมห้องที่เหมือนกันเป็น room class ใช้ cumulative แทน no-overlap รายห้อง
+    # "none"   = ไม่สร้างตัวแปรห้อง (phase 1 ของ two-phase decomposition)
+    "room_mode": "dense",
+    # ใส่ objective ความกระชับรายวัน (day span) หรือไม่
+    "use_compactness": True,
+    # เพิ่ม ordering constraint ให้ห้อง/กลุ่มเรียนที่เหมือนกัน (ลด symmetry)
+    "symmetry_breaking": True,
+    # ห้ามวิชาของนักศึกษากลุ่มเดียวกัน (data["cohorts"] จาก Cohort.csv หรือ COHORTS["infer"]) เวลาชนกัน
+    "cohort_no_overlap": True,
+    # สมดุลการใช้ห้อง: "deviation" = ระยะห่างจากค่าเฉลี่ยภายในกลุ่มความจุ (เฉพาะห้องที่ใช้ได้)
+    #                  หน่วยเป็นจำนวนครั้งต่อห้อง (ปัดขึ้น) ไม่ขึ้นกับจำนวนห้องในกลุ่ม
+    #                  จึงเทียบกับ OBJECTIVE_WEIGHTS["room_balance"] ได้ตรงๆ
+    #                  "max_min"   = max - min ของทุกห้อง (แบบเดิม)
+    "balance_mode": "deviation",
+    # same room ต่อกลุ่มวิชา: "used" = นับจำนวนห้องที่กลุ่มใช้
+    #                       "home" = เลือก home room ต่อกลุ่ม นับกิจกรรมที่อยู่นอก home room
+    "same_room_mode": "used",
+    # ตั้งชื่อตัวแปรทุกตัวใน proto (False = build เร็วขึ้น/ใช้หน่วยความจำน้อยลง
+    # ชื่อถูกเก็บใน side index และสร้างเฉพาะตอนรายงาน infeasibility)
+    "debug_names": True,
+}
+
+# ลดขนาดข้อมูลก่อนสร้างโมเดล (presolve.py)
+PRESOLVE = {
+    "enabled": True,
+    # รวมแถวที่ซ้ำกันทุกคอลัมน์ใน Comsci_Test.csv
+    "merge_duplicates": True,
+    # ตัดวิชาที่ไม่มีกิจกรรม (ไม่มี L/P ที่ต้องจัด)
+    "drop_empty_courses": True,
+    # กิจกรรมที่มีห้องความจุพอห้องเดียว -> สร้างตัวแปรห้องเดียว
+    "preassign_single_room": True,
+    # ตัดห้องที่ความจุไม่พอสำหรับทุกวิชา
+    "drop_unusable_rooms": True,
+}
+
+# Greedy heuristic (heuristic.py) สำหรับโหมด single
+HEURISTIC = {
+    # ใส่คำตอบ greedy เป็น hint ให้ CP-SAT
+    "hint": True,
+    # solver หมดเวลาโดยไม่มีคำตอบ -> export คำตอบ greedy แทน (ถ้าจัดได้ครบทุกกิจกรรม)
+    "fallback": True,
+    # จำนวนรอบสูงสุดของ greedy (รอบถัดไปจัดกิจกรรมที่จัดไม่ได้ก่อน)
+    "passes": 20,
+    # เวลาสูงสุด (วินาที) ตรวจระหว่างรอบ (None = ไม่จำกัด; โหมด reproducible ไม่ใช้ค่านี้)
+    "time_limit": 1.0,
+    # หยุดเมื่อจำนวนกิจกรรมที่จัดไม่ได้ไม่ลดลงติดต่อกันกี่รอบ
+    "patience": 4,
+}
+
+# Local search หลัง solve (polish.py): ปรับคำตอบ FEASIBLE ที่หมดเวลาให้ penalty ลดลง
+# ไม่ละเมิด hard constraint (ใช้ในโหมด single)
+POLISH = {
+    "enabled": True,
+    # เวลาสูงสุด (วินาที)
+    "time": 5.0,
+    # จำนวนรอบสูงสุด (None = จำกัดด้วยเวลาอย่างเดียว; ตั้งค่าแล้วไม่ดูเวลา ผลลัพธ์จึงคงที่)
+    "iterations": None,
+    "seed": 0,
+}
+
+# จำนวนโดเมน (duration, calendar mask) ที่ domains.DomainCompiler จำไว้ต่อ process
+DOMAIN_CACHE_SIZE = 1024
+
+# สร้าง hard constraint กลุ่มพื้นฐาน (ห้อง/อาจารย์/ชนกันเอง/ความจุ/ครบห้อง) แบบขนาน
+# ปิดไว้เป็นค่าเริ่มต้น: กลุ่มนี้เป็นส่วนน้อยของเวลา build (soft constraint ยังสร้างแบบ sequential)
+# และ skeleton + merge ลง proto ใน process หลักกินเวลาใกล้เคียงกับสร้างแบบ sequential เอง
+# วัดบนข้อมูลจริงก่อนเปิด: python -m src.benchmark parallel_build
+PARALLEL_BUILD = {
+    "enabled": False,
+    # ใช้แบบขนานเมื่อจำนวนตัวแปรห้อง (กิจกรรม x ห้อง) ถึงค่านี้ (โมเดลเล็กไม่คุ้มค่า spawn process)
+    "min_room_vars": 50000,
+    # None = ใช้ทุก core ของเครื่อง
+    "max_processes": None,
+}
+
+# น้ำหนักของ penalty แต่ละกลุ่มใน objective แบบ weighted sum
+OBJECTIVE_WEIGHTS = {
+    "over_capacity": 5,
+    "capacity_waste": 1,
+    "room_balance": 10,
+    "day_balance": 5,
+    "day_compact": 1,
+    "same_room": 3,
+    "teacher_preference": 2,
+    # multi-week: กิจกรรมประจำสัปดาห์ย้ายเวลา/ห้องจากสัปดาห์ก่อนหน้า (horizon.py)
+    "week_consistency": 20,
+}
+
+# Staged (lexicographic) solving: หา feasible ก่อน แล้วค่อย optimize ทีละ tier
+# ค่าที่ดีที่สุดของแต่ละ tier จะถูกตรึงเป็น upper bound ให้ tier ถัดไป
+STAGED = {
+    # เวลาสำหรับหา feasible solution แรก (ไม่มี objective)
+    "feasibility_time": 60.0,
+    # ยอมให้ tier ก่อนหน้าแย่ลงได้ (สัดส่วน เช่น 0.02 = 2%) เมื่อ optimize tier ถัดไป
+    "tolerance": 0.0,
+    "stages": [
+        {"name": "capacity", "terms": ["over_capacity"], "time": 60.0},
+        {"name": "balance", "terms": ["room_balance", "day_balance"], "time": 120.0},
+        {
+            "name": "same_room",
+            "terms": ["same_room", "teacher_preference"],
+            "time": 120.0,
+        },
+        {
+            "name": "waste_compact",
+            "terms": ["capacity_waste", "day_compact"],
+            "time": 240.0,
+        },
+    ],
+}
+
+# Two-phase decomposition: เลือกเวลาก่อน (phase 1) แล้วเลือกห้องรายวัน (phase 2)
+DECOMPOSITION = {
+    "phase1_time": 300.0,
+    # เวลาต่อปัญหาย่อยรายวันของ phase 2
+    "phase2_time": 30.0,
+    # จำนวนรอบสูงสุดของ feedback loop เมื่อมีวันที่จัดห้องไม่ได้
+    "max_iterations": 5,
+    # None = ใช้ทุก core ของเครื่อง
+    "max_processes": None,
+}
+
+# ชุดพารามิเตอร์เพิ่มเติมที่ใช้สลับใน portfolio
+SOLVER_PROFILES = {
+    "default": {},
+    "lp_heavy": {"linearization_level": 2},
+    "light_presolve": {"cp_model_probing_level": 0, "symmetry_level": 1},
+}
+
+# Portfolio: รันหลาย solve แยก process แล้วเลือกผลที่ดีที่สุด
+PORTFOLIO = {
+    # เวลารวมทั้งหมด (วินาที) ของทุกรอบ
+    "time_budget": 600.0,
+    # แบ่งเวลาเป็นหลายรอบ เพื่อส่งต่อคำตอบที่ดีที่สุดเป็น hint ให้รอบถัดไป
+    "rounds": 3,
+    # None = ใช้ทุก core ของเครื่อง
+    "max_processes": None,
+    "members": [
+        {"name": "default", "seed": 1, "profile": "default", "model": {}},
+        {"name": "seed_7", "seed": 7, "profile": "default", "model": {}},
+        {"name": "lp_heavy", "seed": 3, "profile": "lp_heavy", "model": {}},
+        {
+            "name": "no_compact",
+            "seed": 5,
+            "profile": "default",
+            "model": {"use_compactness": False},
+        },
+        {
+            "name": "sparse_rooms",
+            "seed": 11,
+            "profile": "light_presolve",
+            "model": {"room_mode": "sparse"},
+        },
+    ],
+}
+
+# Scenario batch (what-if): รันหลาย scenario จากไฟล์ JSON แบบขนาน
+SCENARIOS = {
+    # ไฟล์ scenario เริ่มต้น (สัมพัทธ์กับโฟลเดอร์ data)
+    "file": "scenarios.json",
+    # เวลาต่อ scenario (วินาที) ถ้า scenario ไม่ได้กำหนด "time_budget" เอง
+    "time_budget": 120.0,
+    # None = ใช้ทุก core ของเครื่อง
+    "max_processes": None,
+}
+
+# Local scheduling service (service.py): HTTP/JSON บนเครื่องเดียว
+SERVICE = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    # จำนวน solve ที่รันพร้อมกัน (process pool)
+    "max_processes": 2,
+    # จำนวนชุดข้อมูล/โมเดลที่ cache ไว้ต่อ worker process
+    "cache_size": 4,
+    # เวลา solve เริ่มต้นต่อ job (วินาที) ถ้า request ไม่ได้ระบุ
+    "default_time": 60.0,
+}
@@ -1,13 +1,22 @@
 from ortools.sat.python import cp_model
+from src.config import OBJECTIVE_WEIGHTS, PARALLEL_BUILD
+from src.domains import day_key, day_label
+from src.naming import VarNames
+from src.parallel_build import build_core_records, build_skeleton, merge_records
 
 
 class Constraints:
-    def __init__(self, model, all_vars, data):
+    def __init__(self, model, all_vars, data, options=None, names=None):
         self.model = model
+        # ตั้งชื่อตัวแปรผ่าน VarNames (โหมด debug_names=False จะไม่ใส่ชื่อลง proto)
+        self.names = names or VarNames(model)
         self.all_vars = all_vars  # Decision Variable
         self.data = data
+        self.options = options or {}
         self.assumptions = {}
         self.assumption_details = {}
+        # penalty แต่ละกลุ่ม {ชื่อ: linear expression} สร้างใน add_soft_constraints
+        self.objective_terms = {}
 
     def add_hard_constraints(self):
         print("Adding Hard Constraints")
@@ -17,6 +26,26 @@ class Constraints:
         # time_slots = self.data.get("time_slots", [])
         # days = self.data.get("time_config", {}).get("days", [])
 
+        # 1) - 5) ห้อง/อาจารย์/ชนกันเอง/ความจุ/ครบห้อง
+        # โมเดลใหญ่สร้างแบบขนานใน worker process (ดู parallel_build.py)
+        if self._use_parallel_build():
+            self._add_core_families_parallel()
+        else:
+            self._add_core_families(courses, rooms)
+
+        # 6) Student Cohort No-Overlap:
+        # วิชาที่นักศึกษากลุ่มเดียวกัน (ชั้นปี/สาขา/stream) ต้องเรียน ห้ามเวลาชนกัน
+        if self.options.get("cohort_no_overlap", True):
+            self._add_cohort_no_overlap()
+
+        # 7) Teacher Availability: กิจกรรมที่อาจารย์ไม่มีช่วงว่างยาวพอเลย
+        self._add_teacher_availability(courses)
+
+        # Register assumptions
+        self.model.AddAssumptions(list(self.assumptions.values()))
+        self.data["assumption_details"] = self.assumption_details
+
+    def _add_core_families(self, courses, rooms):
         # 1) Room No-Overlap:
         # ห้องเดียวกันห้ามมีวิชาซ้อนทับกันในช่วงเวลาเดียวกัน
         for r in rooms:
@@ -27,9 +56,19 @@ class Constraints:
                 c_id = c["id"]
                 activities = self.all_vars[c_id]["activities"]
                 for act in activities.values():
-                    room_intervals.append(act["rooms"][r_id]["opt_interval"])
+                    # โหมด sparse อาจไม่มีตัวแปรของห้องนี้
+                    room_vars = act["rooms"].get(r_id)
+                    if room_vars:
+                        room_intervals.append(room_vars["opt_interval"])
             if room_intervals:
-                self.model.AddNoOverlap(room_intervals).OnlyEnforceIf(a_room)
+                pool_size = r.get("pool_size", 1)
+                if pool_size > 1:
+                    # โหมด pool: room class ใช้พร้อมกันได้ไม่เกินจำนวนห้องในกลุ่ม
+                    self.model.AddCumulative(
+                        room_intervals, [1] * len(room_intervals), pool_size
+                    ).OnlyEnforceIf(a_room)
+                else:
+                    self.model.AddNoOverlap(room_intervals).OnlyEnforceIf(a_room)
 
         # 2) Teacher No-Overlap:
         # อาจารย์คนเดียวกันห้ามสอนหลายวิชาในเวลาเดียวกัน
@@ -77,6 +116,8 @@ class Constraints:
             for act in activities.values():
                 for r in rooms:
                     r_id = r["id"]
+                    if r_id not in act["rooms"]:
+                        continue
                     capacity = self._to_int(r.get("จำนวนที่นั่ง", 0))
                     if capacity and enrollment and capacity < enrollment:
                         a_capacity = self._assumption(
@@ -126,20 +167,62 @@ class Constraints:
 
         # 5) Course Completion (L/P):
         # ทุกกิจกรรม (Lecture/Lab) ต้องถูกจัดลงห้องอย่างน้อย 1 ห้อง
+        # โหมด "none" (เลือกเวลาอย่างเดียว) ใช้ aggregate capacity แทน
+        if self.options.get("room_mode") == "none":
+            self._add_aggregate_room_capacity(courses, rooms)
+        else:
+            for c in courses:
+                c_id = c["id"]
+                activities = self.all_vars[c_id]["activities"]
+                for act_id, act in activities.items():
+                    a_complete = self._assumption(
+                        "course_completion",
+                        detail={"activity": f"interval_{act_id}"},
+                    )
+                    self.model.Add(
+                        sum(v["is_present"] for v in act["rooms"].values()) == 1
+                    ).OnlyEnforceIf(a_complete)
+
+    def _add_teacher_availability(self, courses):
+        """
+        ช่วงไม่ว่างถูกตัดออกจากโดเมนของ start ใน create_variables แล้ว
+        กิจกรรมที่ตัดแล้วไม่เหลือ start (teacher_unavailable) บังคับ start อยู่ในโดเมนว่าง
+        ภายใต้ assumption -> INFEASIBLE และ unsat core บอกกิจกรรม/อาจารย์ที่เป็นสาเหตุ
+        """
         for c in courses:
-            c_id = c["id"]
-            activities = self.all_vars[c_id]["activities"]
-            for act in activities.values():
-                a_complete = self._assumption(
-                    "course_completion", detail={"activity": act["interval"].Name()}
+            for act_id, act in self.all_vars[c["id"]]["activities"].items():
+                if not act.get("teacher_unavailable"):
+                    continue
+                a_available = self._assumption(
+                    "teacher_availability",
+                    detail={
+                        "activity": act_id,
+                        "teachers": "+".join(c.get("teacher_list", [])),
+                    },
                 )
-                self.model.Add(
-                    sum(v["is_present"] for v in act["rooms"].values()) == 1
-                ).OnlyEnforceIf(a_complete)
-
-        # Register assumptions
-        self.model.AddAssumptions(list(self.assumptions.values()))
-        self.data["assumption_details"] = self.assumption_details
+                self.model.AddLinearExpressionInDomain(
+                    act["start"], cp_model.Domain.FromValues([])
+                ).OnlyEnforceIf(a_available)
+
+    def _use_parallel_build(self):
+        if not PARALLEL_BUILD.get("enabled") or self.options.get("room_mode") == "none":
+            return False
+        num_room_vars = sum(
+            len(act["rooms"])
+            for c_vars in self.all_vars.values()
+            for act in c_vars["activities"].values()
+        )
+        return num_room_vars >= PARALLEL_BUILD.get("min_room_vars", 0)
+
+    def _add_core_families_parallel(self):
+        """
+        สร้าง constraint กลุ่มที่ไม่สร้างตัวแปรใหม่ใน worker process จาก index ของตัวแปร
+        แล้ว merge เข้า proto หลัก (assumption literal ยังสร้างใน process หลักตามลำดับเดิม)
+        """
+        skeleton = build_skeleton(self.all_vars, self.data)
+        records = build_core_records(skeleton, PARALLEL_BUILD.get("max_processes"))
+        merge_records(self.model, records, self._assumption)
+        print(f"[Parallel build] merged {len(records)} constraint records")
 
     def add_soft_constraints(self):
         print("Adding Soft Constraints")
@@ -147,9 +230,18 @@ class Constraints:
         courses = self.data["courses"]
         rooms = self.data["rooms"]
         time_slots = self.data.get("time_slots", [])
-        days = self.data.get("time_config", {}).get("days", [])
         horizon = len(time_slots) if time_slots else 0
 
+        # วันของคาบตาม (week, day) เรียงตาม time_slots
+        # (multi-week horizon: จันทร์ของแต่ละสัปดาห์นับเป็นคนละวัน)
+        days = []
+        day_index = {}
+        for s in time_slots:
+            key = day_key(s)
+            if key not in day_index:
+                day_index[key] = len(days)
+                days.append(day_label(s))
+
         # 1) Capacity Soft Constraint:
         # อนุญาตให้เกินได้เล็กน้อย แต่มี penalty ตามส่วนเกิน (ยิ่งเกินยิ่งโดนลงโทษมาก)
         over_capacity_terms = []
@@ -159,6 +251,8 @@ class Constraints:
             for act in activities.values():
                 for r in rooms:
                     r_id = r["id"]
+                    if r_id not in act["rooms"]:
+                        continue
                     capacity = self._to_int(r.get("จำนวนที่นั่ง", 0))
                     if capacity and enrollment and enrollment > capacity:
                         over = enrollment - capacity
@@ -171,6 +265,8 @@ class Constraints:
         # แนวคิด: ถ้าห้องใหญ่เกินจำนวนลงเรียน ให้มีโทษตามส่วนต่าง (capacity - enrollment)
         penalty_terms = []
         room_usage_counts = {}
+        # เฉพาะคู่ (กิจกรรม, ห้อง) ที่ความจุพอ ใช้กับ balance_mode "deviation"
+        eligible_usage = {}
         total_activities = 0
         for c in courses:
             c_id = c["id"]
@@ -180,6 +276,8 @@ class Constraints:
                 total_activities += 1
                 for r in rooms:
                     r_id = r["id"]
+                    if r_id not in act["rooms"]:
+                        continue
                     capacity = self._to_int(r.get("จำนวนที่นั่ง", 0))
                     if capacity and enrollment and capacity >= enrollment:
                         waste = capacity - enrollment
@@ -189,24 +287,33 @@ class Constraints:
                     room_usage_counts.setdefault(r_id, []).append(
                         act["rooms"][r_id]["is_present"]
                     )
+                    if not (capacity and enrollment and capacity < enrollment):
+                        eligible_usage.setdefault(r_id, []).append(
+                            act["rooms"][r_id]["is_present"]
+                        )
 
         # 3) Balanced Room Usage Count (Soft):
         # ลดความต่างของจำนวนครั้งที่ใช้ห้อง (ไม่ให้ห้องใดถูกใช้มากเกินไป)
         balance_terms = []
-        if rooms and total_activities > 0:
-            max_usage = self.model.NewIntVar(0, total_activities, "max_room_usage")
-            min_usage = self.model.NewIntVar(0, total_activities, "min_room_usage")
+        if self.options.get("balance_mode", "deviation") == "deviation":
+            # ใช้เฉพาะห้องที่มีวิชาใช้ได้จริง แยกตามกลุ่มความจุ (ดู _room_balance_terms)
+            balance_terms = self._room_balance_terms(rooms, eligible_usage)
+        elif rooms and total_activities > 0 and room_usage_counts:
+            max_usage = self.names.int_var(0, total_activities, "max_room_usage")
+            min_usage = self.names.int_var(0, total_activities, "min_room_usage")
 
             for r in rooms:
                 r_id = r["id"]
                 usage_list = room_usage_counts.get(r_id, [])
                 if usage_list:
-                    usage = self.model.NewIntVar(
-                        0, total_activities, f"room_usage_{r_id}"
+                    usage = self.names.int_var(
+                        0, total_activities, "room_usage_{}", r_id
                     )
                     self.model.Add(usage == sum(usage_list))
-                    self.model.Add(max_usage >= usage)
-                    self.model.Add(min_usage <= usage)
+                    # โหมด pool: เทียบเป็นจำนวนครั้งเฉลี่ยต่อห้องจริงในกลุ่ม
+                    pool_size = r.get("pool_size", 1)
+                    self.model.Add(max_usage * pool_size >= usage)
+                    self.model.Add(min_usage * pool_size <= usage)
 
             # เป้าหมาย: ลดช่องว่างระหว่างห้องที่ใช้มากที่สุดกับน้อยที่สุด
             balance_terms.append(max_usage - min_usage)
@@ -217,52 +324,50 @@ class Constraints:
         day_compact_terms = []
         if time_slots and days:
             # map slot -> day index
-            slot_day_idx = []
-            day_index = {d: i for i, d in enumerate(days)}
-            for s in time_slots:
-                slot_day_idx.append(day_index.get(s["day"], 0))
+            slot_day_idx = [day_index[day_key(s)] for s in time_slots]
 
             # สร้างตัวแปร day สำหรับแต่ละ activity และนับจำนวนกิจกรรมต่อวัน
             day_counts = [
-                self.model.NewIntVar(0, len(courses) * 2, f"day_count_{d}")
-                for d in days
+                self.names.int_var(0, len(courses) * 2, "day_count_{}", d) for d in days
             ]
             day_bools = [[] for _ in days]
+            # table (start_slot, day_idx) ใช้ร่วมกันทุกกิจกรรม (ไม่สร้าง list ใหม่ทุกครั้ง)
+            day_table = [(i, slot_day_idx[i]) for i in range(len(time_slots))]
 
             for c in courses:
                 c_id = c["id"]
                 for act_id, act in self.all_vars[c_id]["activities"].items():
                     start = act["start"]
-                    day_var = self.model.NewIntVar(0, len(days) - 1, f"day_{act_id}")
+                    day_var = self.names.int_var(0, len(days) - 1, "day_{}", act_id)
                     # table mapping: (start_slot, day_idx)
-                    tuples = [(i, slot_day_idx[i]) for i in range(len(time_slots))]
-                    self.model.AddAllowedAssignments([start, day_var], tuples)
+                    self.model.AddAllowedAssignments([start, day_var], day_table)
 
                     for d_idx, _ in enumerate(days):
-                        b = self.model.NewBoolVar(f"act_{act_id}_is_day_{d_idx}")
+                        b = self.names.bool_var("act_{}_is_day_{}", act_id, d_idx)
                         self.model.Add(day_var == d_idx).OnlyEnforceIf(b)
                         self.model.Add(day_var != d_idx).OnlyEnforceIf(b.Not())
-                        day_bools[d_idx].append((b, act))
+                        day_bools[d_idx].append((b, act_id, act))
 
             # นับจำนวนกิจกรรมต่อวัน
             for d_idx in range(len(days)):
                 if day_bools[d_idx]:
                     self.model.Add(
-                        day_counts[d_idx] == sum(b for b, _ in day_bools[d_idx])
+                        day_counts[d_idx] == sum(b for b, _, _ in day_bools[d_idx])
                     )
                 else:
                     self.model.Add(day_counts[d_idx] == 0)
 
             # สมดุลรายวัน: ลดช่องว่าง max-min ระหว่างวัน
-            max_day = self.model.NewIntVar(0, len(courses) * 2, "max_day_usage")
-            min_day = self.model.NewIntVar(0, len(courses) * 2, "min_day_usage")
+            max_day = self.names.int_var(0, len(courses) * 2, "max_day_usage")
+            min_day = self.names.int_var(0, len(courses) * 2, "min_day_usage")
             for d_idx in range(len(days)):
                 self.model.Add(max_day >= day_counts[d_idx])
                 self.model.Add(min_day <= day_counts[d_idx])
             day_balance_terms.append(max_day - min_day)
 
             # กระชับในแต่ละวัน: ลดช่วงเวลา (max_end - min_start)
-            if horizon > 0:
+            # ปิดได้ผ่าน options["use_compactness"] (เช่นใน portfolio)
+            if horizon > 0 and self.options.get("use_compactness", True):
                 for d_idx, d in enumerate(days):
                     bools_acts = day_bools[d_idx]
                     if not bools_acts:
@@ -271,12 +376,12 @@ class Constraints:
                     # สร้างตัวแปร start_if_day และ end_if_day
                     start_if_list = []
                     end_if_list = []
-                    for b, act in bools_acts:
-                        start_if = self.model.NewIntVar(
-                            0, horizon, f"start_if_{act['interval'].Name()}_{d}"
+                    for b, act_id, act in bools_acts:
+                        start_if = self.names.int_var(
+                            0, horizon, "start_if_interval_{}_{}", act_id, d
                         )
-                        end_if = self.model.NewIntVar(
-                            0, horizon, f"end_if_{act['interval'].Name()}_{d}"
+                        end_if = self.names.int_var(
+                            0, horizon, "end_if_interval_{}_{}", act_id, d
                         )
                         self.model.Add(start_if == act["start"]).OnlyEnforceIf(b)
                         self.model.Add(start_if == horizon).OnlyEnforceIf(b.Not())
@@ -285,104 +390,343 @@ class Constraints:
                         start_if_list.append(start_if)
                         end_if_list.append(end_if)
 
-                    has_day = self.model.NewBoolVar(f"has_day_{d}")
-                    self.model.Add(sum(b for b, _ in bools_acts) >= 1).OnlyEnforceIf(
+                    has_day = self.names.bool_var("has_day_{}", d)
+                    self.model.Add(sum(b for b, _, _ in bools_acts) >= 1).OnlyEnforceIf(
                         has_day
                     )
-                    self.model.Add(sum(b for b, _ in bools_acts) == 0).OnlyEnforceIf(
+                    self.model.Add(sum(b for b, _, _ in bools_acts) == 0).OnlyEnforceIf(
                         has_day.Not()
                     )
 
-                    start_dummy = self.model.NewIntVar(0, horizon, f"start_dummy_{d}")
+                    start_dummy = self.names.int_var(0, horizon, "start_dummy_{}", d)
                     self.model.Add(start_dummy == horizon).OnlyEnforceIf(has_day)
                     self.model.Add(start_dummy == 0).OnlyEnforceIf(has_day.Not())
                     start_if_list.append(start_dummy)
 
-                    min_start = self.model.NewIntVar(0, horizon, f"min_start_{d}")
-                    max_end = self.model.NewIntVar(0, horizon, f"max_end_{d}")
+                    min_start = self.names.int_var(0, horizon, "min_start_{}", d)
+                    max_end = self.names.int_var(0, horizon, "max_end_{}", d)
                     self.model.AddMinEquality(min_start, start_if_list)
                     self.model.AddMaxEquality(max_end, end_if_list)
 
-                    span = self.model.NewIntVar(0, horizon, f"day_span_{d}")
+                    span = self.names.int_var(0, horizon, "day_span_{}", d)
                     self.model.Add(span == max_end - min_start)
                     day_compact_terms.append(span)
 
         # 5) Same Room for Same Subject + Type (Soft):
         # รายวิชาเดียวกัน (ตามรหัสวิชา) และประเภทเดียวกัน ควรใช้ห้องเดียวกัน
-        same_room_terms = []
-        subject_groups = {}
+        # สร้างตัวแปรเฉพาะห้องที่สมาชิกในกลุ่มใช้ได้จริง (ดู _same_room_terms)
+        same_room_terms = self._same_room_terms(courses, rooms)
+
+        # 6) Teacher Unavailability (Hard):
+        # ช่วงที่อาจารย์ไม่ว่างถูกตัดออกจากโดเมนของ start ตั้งแต่ create_variables แล้ว
+        # (data["teacher_availability"]) กรณีไม่เหลือ start ดู _add_teacher_availability
+        # Teacher Preference (Soft): ช่วง "ไม่สะดวก" มี penalty ตามตาราง cost รายคาบ
+        preference_terms = self._teacher_preference_terms(courses)
+
+        # 7) Room Type Constraint (Hard) - COMMENT ONLY:
+        # วิธีใช้: หากมีข้อมูลประเภทห้อง เช่น "LAB", "LECTURE"
+        # ให้กำหนดประเภทห้องใน data_loader แล้วบังคับให้กิจกรรมเลือกห้องที่ type ตรงกัน
+        # ตัวอย่าง:
+        #   if act["type"] == "P" (Lab) ให้ปิดห้องที่ไม่ใช่ LAB:
+        #   model.Add(act["rooms"][r_id]["is_present"] == 0)  # ถ้า r.type != "LAB"
+
+        # เก็บแต่ละกลุ่ม penalty แยกไว้ (ใช้ต่อใน staged solving / รายงานผล)
+        families = {
+            "over_capacity": over_capacity_terms,
+            "capacity_waste": penalty_terms,
+            "room_balance": balance_terms,
+            "day_balance": day_balance_terms,
+            "day_compact": day_compact_terms,
+            "same_room": same_room_terms,
+            "teacher_preference": preference_terms,
+        }
+        for name, terms in families.items():
+            if terms:
+                self.objective_terms[name] = sum(terms)
+
+        # รวม Soft Constraints เป็น Objective เดียว (Weighted Sum)
+        if self.objective_terms:
+            self.model.Minimize(self.weighted_objective(self.objective_terms))
+
+    def _same_room_terms(self, courses, rooms):
+        """
+        penalty ของกลุ่ม (รหัสวิชา, ประเภท) ที่กระจายไปหลายห้อง
+        ห้องผู้สมัคร (candidate) ของกิจกรรม = ห้องที่มีตัวแปรและความจุพอ
+        - โหมด "used" (ค่าเริ่มต้น): used_r เฉพาะห้องใน union ของ candidate ของกลุ่ม
+          ใช้ implication (pres -> used) แทน AddMaxEquality เพราะ minimize ดัน used ลงเอง
+          penalty = จำนวนห้องที่ใช้ - 1
+        - โหมด "home": เลือก home room หนึ่งห้องจาก intersection ของ candidate
+          (AddExactlyOne) แล้ว channel: off_a >= pres_a_r - home_r
+          penalty = จำนวนกิจกรรมที่ไม่ได้อยู่ home room
+          (กลุ่มที่ intersection ว่างจะใช้โหมด "used" แทน)
+        """
+        mode = self.options.get("same_room_mode", "used")
+        capacity_of = {r["id"]: self._to_int(r.get("จำนวนที่นั่ง", 0)) for r in rooms}
+        room_order = [r["id"] for r in rooms]
+
+        groups = {}
         for c in courses:
             subject_code = str(c.get("รหัสวิชา", "")).strip()
             if not subject_code:
                 continue
-            c_id = c["id"]
-            for act_id, act in self.all_vars[c_id]["activities"].items():
-                act_type = act.get("type")
-                key = (subject_code, act_type)
-                subject_groups.setdefault(key, []).append(act)
+            enrollment = self._to_int(c.get("ลง", 0))
+            for act_id, act in self.all_vars[c["id"]]["activities"].items():
+                candidates = [
+                    r_id
+                    for r_id in act["rooms"]
+                    if not (
+                        capacity_of[r_id]
+                        and enrollment
+                        and capacity_of[r_id] < enrollment
+                    )
+                ]
+                # ไม่มีห้องที่ความจุพอเลย -> ใช้ทุกห้องที่มีตัวแปร (ให้ hard constraint รายงานเอง)
+                groups.setdefault((subject_code, act.get("type")), []).append(
+                    (act_id, act, candidates or list(act["rooms"]))
+                )
 
-        for (subject_code, act_type), acts in subject_groups.items():
-            if len(acts) <= 1:
+        terms = []
+        stats = {"groups": 0, "activities": 0, "max_size": 0, "vars": 0, "home": 0}
+        for (subject_code, act_type), members in groups.items():
+            if len(members) <= 1:
+                continue
+            stats["groups"] += 1
+            stats["activities"] += len(members)
+            stats["max_size"] = max(stats["max_size"], len(members))
+
+            candidate_sets = [set(candidates) for _, _, candidates in members]
+            common = set.intersection(*candidate_sets)
+            if mode == "home" and common:
+                home = {
+                    r_id: self.names.bool_var(
+                        "home_{}_{}_{}", subject_code, act_type, r_id
+                    )
+                    for r_id in room_order
+                    if r_id in common
+                }
+                self.model.AddExactlyOne(home.values())
+                for act_id, act, candidates in members:
+                    off = self.names.bool_var("off_home_{}", act_id)
+                    for r_id in candidates:
+                        pres = act["rooms"][r_id]["is_present"]
+                        if r_id in home:
+                            self.model.Add(off >= pres - home[r_id])
+                        else:
+                            self.model.AddImplication(pres, off)
+                    terms.append(off)
+                stats["vars"] += len(home) + len(members)
+                stats["home"] += 1
                 continue
+
+            union = set.union(*candidate_sets)
             used_rooms = []
-            for r in rooms:
-                r_id = r["id"]
-                bools = [a["rooms"][r_id]["is_present"] for a in acts]
-                used = self.model.NewBoolVar(f"used_{subject_code}_{act_type}_{r_id}")
-                self.model.AddMaxEquality(used, bools)
+            for r_id in room_order:
+                if r_id not in union:
+                    continue
+                used = self.names.bool_var(
+                    "used_{}_{}_{}", subject_code, act_type, r_id
+                )
+                for _, act, candidates in members:
+                    if r_id in candidates:
+                        self.model.AddImplication(
+                            act["rooms"][r_id]["is_present"], used
+                        )
                 used_rooms.append(used)
+            stats["vars"] += len(used_rooms)
             # ลดจำนวนห้องที่ถูกใช้ในกลุ่มนี้
             if used_rooms:
-                extra_rooms = self.model.NewIntVar(
-                    0, len(rooms), f"extra_rooms_{subject_code}_{act_type}"
-                )
-                self.model.Add(extra_rooms == sum(used_rooms) - 1)
-                same_room_terms.append(extra_rooms)
-
-        # 6) Teacher Unavailability (Hard) - COMMENT ONLY:
-        # วิธีใช้: หากมีข้อมูลเวลาที่อาจารย์ไม่ว่าง ให้สร้าง allowed slots ของแต่ละอาจารย์
-        # แล้วบังคับให้ start ของกิจกรรมอยู่ใน allowed slots นั้น
-        # ตัวอย่าง:
-        #   unavailable = {"Teacher A": [slot_index1, slot_index2, ...]}
-        #   allowed = [s for s in range(horizon) if s not in unavailable["Teacher A"]]
-        #   model.AddAllowedAssignments([act["start"]], [(s,) for s in allowed])
+                terms.append(sum(used_rooms) - 1)
+
+        # เทียบกับแบบเดิม: used ทุกกลุ่ม x ทุกห้อง + extra_rooms ต่อกลุ่ม
+        baseline = stats["groups"] * (len(rooms) + 1)
+        if stats["groups"]:
+            print(
+                f"[Same room] {stats['groups']} groups, "
+                f"avg size {stats['activities'] / stats['groups']:.1f}, "
+                f"max size {stats['max_size']}, {stats['home']} home-room groups; "
+                f"{stats['vars']} vars (saved {baseline - stats['vars']})"
+            )
+        return terms
+
+    def _room_balance_terms(self, rooms, eligible_usage):
+        """
+        สมดุลการใช้ห้องแบบ deviation-from-mean ภายในกลุ่มความจุเดียวกัน
+        - ข้ามห้องที่ไม่มีกิจกรรมไหนใช้ได้ (เช่นห้องเล็กเกินทุกวิชา) ไม่ให้ดึงค่า min เป็น 0
+        - กลุ่มความจุ k มีห้องจริง n ห้อง (นับ pool_size) ผลรวมการใช้ T:
+          n * dev_r >= |n * usage_r - pool_size_r * T|
+          (dev_r = ระยะห่างจากค่าเฉลี่ยปัดขึ้นเป็นจำนวนเต็ม ไม่โตตาม n จึงใช้น้ำหนักเดียวกันทุกกลุ่มได้)
+        ผลรวม dev เป็น linear จึงให้ LP bound ที่แน่นกว่า max - min ทั้งระบบ
+        """
+        classes = {}
+        for r in rooms:
+            if eligible_usage.get(r["id"]):
+                capacity = self._to_int(r.get("จำนวนที่นั่ง", 0))
+                classes.setdefault(capacity, []).append(r)
+
+        terms = []
+        balanced_rooms = 0
+        for capacity, class_rooms in classes.items():
+            if len(class_rooms) <= 1:
+                continue
+            num_rooms = sum(r.get("pool_size", 1) for r in class_rooms)
+            usages = {r["id"]: sum(eligible_usage[r["id"]]) for r in class_rooms}
+            total = sum(usages.values())
+            max_count = sum(len(eligible_usage[r["id"]]) for r in class_rooms)
+            for r in class_rooms:
+                r_id = r["id"]
+                diff = num_rooms * usages[r_id] - r.get("pool_size", 1) * total
+                dev = self.names.int_var(0, max_count, "room_dev_{}_{}", capacity, r_id)
+                self.model.Add(num_rooms * dev >= diff)
+                self.model.Add(num_rooms * dev >= -diff)
+                terms.append(dev)
+            balanced_rooms += len(class_rooms)
+
+        skipped = len(rooms) - sum(len(class_rooms) for class_rooms in classes.values())
+        print(
+            f"[Balance] {balanced_rooms} rooms in "
+            f"{sum(1 for c in classes.values() if len(c) > 1)} capacity classes "
+            f"({skipped} ineligible rooms skipped)"
+        )
+        return [sum(terms)] if terms else []
+
+    def _teacher_preference_terms(self, courses):
+        """
+        penalty ของการสอนในช่วงที่อาจารย์ "ไม่สะดวก"
+        ตาราง cost เป็นแบบ sparse: สร้าง BoolVar เฉพาะ start ที่มี cost > 0
+        """
+        preferences = self.data.get("teacher_preferences", {})
+        if not preferences:
+            return []
+
+        terms = []
+        for c in courses:
+            slot_costs = [
+                preferences[t] for t in c.get("teacher_list", []) if t in preferences
+            ]
+            if not slot_costs:
+                continue
+            for act_id, act in self.all_vars[c["id"]]["activities"].items():
+                duration = act["duration"]
+                # start ที่คาบใดคาบหนึ่งในช่วงสอนตรงกับช่วงไม่สะดวก
+                start_costs = {}
+                for costs in slot_costs:
+                    for slot, cost in costs.items():
+                        for s in range(slot - duration + 1, slot + 1):
+                            if s >= 0:
+                                start_costs[s] = start_costs.get(s, 0) + cost
+                valid_starts = set(act["valid_starts"])
+                for s, cost in start_costs.items():
+                    if s not in valid_starts:
+                        continue
+                    at_s = self.names.bool_var("pref_{}_{}", act_id, s)
+                    # ถ้า at_s = 0 ต้องไม่เริ่มที่ s (minimize จะดัน at_s เป็น 0 เอง)
+                    self.model.Add(act["start"] != s).OnlyEnforceIf(at_s.Not())
+                    terms.append(cost * at_s)
+        return terms
+
+    def _add_cohort_no_overlap(self):
+        """
+        สร้าง AddNoOverlap ต่อ cohort โดยตัดส่วนที่ซ้ำซ้อนออกก่อน
+        - interval ซ้ำภายใน cohort เดียวกันนับครั้งเดียว
+        - cohort ที่มีชุดกิจกรรมเหมือนกันรวมเป็น constraint เดียว
+        - cohort ที่ชุดกิจกรรมเป็น subset ของอีก cohort ไม่ต้องสร้าง (ถูกบังคับอยู่แล้ว)
+        - cohort ที่มีแค่วิชาเดียว ข้าม (course self-collision ครอบคลุมแล้ว)
+        """
+        cohorts = self.data.get("cohorts", {})
+        if not cohorts:
+            return
+
+        # cohort -> frozenset ของ (course_id, act_id)
+        merged = {}
+        for cohort_id, course_ids in cohorts.items():
+            keys = set()
+            for c_id in course_ids:
+                if c_id not in self.all_vars:
+                    continue
+                for act_id in self.all_vars[c_id]["activities"]:
+                    keys.add((c_id, act_id))
+            if len({c_id for c_id, _ in keys}) <= 1:
+                continue
+            merged.setdefault(frozenset(keys), []).append(cohort_id)
 
-        # 7) Room Type Constraint (Hard) - COMMENT ONLY:
-        # วิธีใช้: หากมีข้อมูลประเภทห้อง เช่น "LAB", "LECTURE"
-        # ให้กำหนดประเภทห้องใน data_loader แล้วบังคับให้กิจกรรมเลือกห้องที่ type ตรงกัน
-        # ตัวอย่าง:
-        #   if act["type"] == "P" (Lab) ให้ปิดห้องที่ไม่ใช่ LAB:
-        #   model.Add(act["rooms"][r_id]["is_present"] == 0)  # ถ้า r.type != "LAB"
+        # ตัดชุดที่เป็น subset ของชุดอื่น (เทียบกับชุดที่ใหญ่กว่าเท่านั้น)
+        key_sets = sorted(merged, key=len, reverse=True)
+        kept = []
+        for keys in key_sets:
+            if any(keys < bigger for bigger in kept):
+                continue
+            kept.append(keys)
 
-        # รวม Soft Constraints เป็น Objective เดียว (Weighted Sum)
-        if (
-            over_capacity_terms
-            or penalty_terms
-            or balance_terms
-            or day_balance_terms
-            or day_compact_terms
-            or same_room_terms
-        ):
-            weight_capacity = 1
-            weight_over_capacity = 5
-            weight_balance = 10
-            weight_day_balance = 5
-            weight_day_compact = 1
-            weight_same_room = 3
-            objective = []
-            if over_capacity_terms:
-                objective.append(weight_over_capacity * sum(over_capacity_terms))
-            if penalty_terms:
-                objective.append(weight_capacity * sum(penalty_terms))
-            if balance_terms:
-                objective.append(weight_balance * sum(balance_terms))
-            if day_balance_terms:
-                objective.append(weight_day_balance * sum(day_balance_terms))
-            if day_compact_terms:
-                objective.append(weight_day_compact * sum(day_compact_terms))
-            if same_room_terms:
-                objective.append(weight_same_room * sum(same_room_terms))
-            self.model.Minimize(sum(objective))
+        for keys in kept:
+            cohort_ids = merged[keys]
+            a_cohort = self._assumption(
+                "cohort_no_overlap", detail={"cohort": "+".join(sorted(cohort_ids))}
+            )
+            intervals = [
+                self.all_vars[c_id]["activities"][act_id]["interval"]
+                for c_id, act_id in sorted(keys)
+            ]
+            self.model.AddNoOverlap(intervals).OnlyEnforceIf(a_cohort)
+
+        print(
+            f"[Cohorts] {len(cohorts)} cohorts -> {len(merged)} distinct sets -> "
+            f"{len(kept)} no-overlap constraints"
+        )
+
+    def _add_aggregate_room_capacity(self, courses, rooms):
+        """
+        ใช้ในโหมดเลือกเวลาอย่างเดียว (ยังไม่เลือกห้อง):
+        ห้องที่รับได้ของแต่ละกิจกรรมคือ "ห้องที่ความจุ >= จำนวนลง" ซึ่งซ้อนกันเป็นชั้น (nested)
+        จึงใช้ cumulative ต่อ threshold ความจุ: ในแต่ละคาบ จำนวนกิจกรรมที่ต้องการห้อง
+        ความจุ >= c ต้องไม่เกินจำนวนห้องที่ความจุ >= c (เงื่อนไข Hall สำหรับเซตซ้อนกัน)
+        """
+        # ความจุ 0 (ไม่ทราบ) ถือว่ารับได้ทุกวิชา เหมือนใน capacity constraint
+        unlimited = float("inf")
+        capacities = [
+            self._to_int(r.get("จำนวนที่นั่ง", 0)) or unlimited for r in rooms
+        ]
+        thresholds = sorted(set(capacities))
+
+        demands = []
+        for c in courses:
+            enrollment = self._to_int(c.get("ลง", 0))
+            for act_id, act in self.all_vars[c["id"]]["activities"].items():
+                demands.append((enrollment, act_id, act["interval"]))
+
+        # threshold แรกรวมทุกกิจกรรม (รวมจำนวนลงที่ไม่ทราบ = 0) จำนวนกิจกรรมพร้อมกันต้องไม่เกินจำนวนห้อง
+        prev = -1
+        for cap in thresholds:
+            # กิจกรรมที่ห้องความจุ <= prev รับไม่ได้ -> ต้องใช้ห้องความจุ >= cap
+            intervals = [iv for enrollment, _, iv in demands if enrollment > prev]
+            num_rooms = sum(1 for x in capacities if x >= cap)
+            if intervals:
+                a_pool = self._assumption(
+                    "aggregate_room_capacity",
+                    detail={"min_capacity": cap, "rooms": num_rooms},
+                )
+                self.model.AddCumulative(
+                    intervals, [1] * len(intervals), num_rooms
+                ).OnlyEnforceIf(a_pool)
+            prev = cap
+
+        # กิจกรรมที่ไม่มีห้องไหนรับได้เลย
+        too_large = [act_id for enrollment, act_id, _ in demands if enrollment > prev]
+        for act_id in too_large:
+            a_capacity = self._assumption(
+                "capacity_constraint", detail={"activity": f"interval_{act_id}"}
+            )
+            self.model.AddBoolOr([]).OnlyEnforceIf(a_capacity)
+
+    def weighted_objective(self, names):
+        """
+        รวม penalty หลายกลุ่มตามน้ำหนักใน config.OBJECTIVE_WEIGHTS
+        """
+        objective = []
+        for name in names:
+            if name in self.objective_terms:
+                weight = OBJECTIVE_WEIGHTS.get(name, 1)
+                objective.append(weight * self.objective_terms[name])
+        return sum(objective)
 
     def _to_int(self, value):
         if value is None:
@@ -404,8 +748,8 @@ class Constraints:
             key = f"{name}__{detail_tag}"
         if key in self.assumptions:
             return self.assumptions[key]
-        a = self.model.NewBoolVar(f"assump_{key}")
+        a = self.names.bool_var("assump_{}", key)
         self.assumptions[key] = a
         if detail:
-            self.assumption_details[a.Name()] = {"type": name, **detail}
+            self.assumption_details[f"assump_{key}"] = {"type": name, **detail}
         return a
@@ -1,13 +1,20 @@
-import pandas as pd
 import os
 import re
 import difflib
 
+from src.config import COHORTS, TIME_GRID
+from src.records import course_record
+
 
 class DataLoader:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, interactive=True, time_grid=None, exclude_codes=None):
         # Variable for dataset
         self.data_dir = data_dir  # path data directory
+        # False = ไม่ถามผู้ใช้ทาง terminal (เช่น batch scenario / service)
+        self.interactive = interactive
+        # รหัสวิชาที่ตัดออก: กำหนดล่วงหน้าได้ (เช่น replay) แทนการถามทาง terminal
+        # หลัง load_data เก็บรายการที่ใช้จริงไว้ (บันทึกลง run log เพื่อ reproduce)
+        self.exclude_codes = exclude_codes
         self.courses = []
         self.rooms = []
         self.all_teachers = (
@@ -15,22 +22,29 @@ class DataLoader:
         )  # เก็บรายชื่ออาจารย์ทั้งหมด (ไม่ซ้ำ) เพื่อใช้ตอนวน Loop สร้าง Constraint
         self.teacher_aliases = {}  # เก็บ mapping ชื่อเดิม -> ชื่อมาตรฐาน (dedupe)
         self.teacher_typos = []  # เก็บรายการชื่อที่สงสัยว่าเป็นการพิมพ์ผิด
-
-        # Constant Data สำหรับวันเรียน (จันทร์ - ศุกร์)
-        self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-
-        # Time config (ใช้สำหรับสร้าง Time Slots)
-        self.slot_minutes = 30
-        self.day_start = "08:30"
-        self.day_end = "17:00"
-        self.lunch_start = "12:00"
-        self.lunch_end = "13:00"
+        # ตารางเวลาว่างของอาจารย์ (list ของ dict ไม่เก็บ DataFrame ไว้)
+        # เก็บไว้ compile ใหม่เมื่อ time slots เปลี่ยน
+        self.availability_table = None
+
+        # Time config (ใช้สำหรับสร้าง Time Slots) ค่าเริ่มต้นจาก config.TIME_GRID
+        grid = dict(TIME_GRID)
+        if time_grid:
+            grid.update(time_grid)
+        self.days = list(grid["days"])
+        self.slot_minutes = int(grid["slot_minutes"])
+        self.day_start = grid["day_start"]
+        self.day_end = grid["day_end"]
+        self.lunch_start = grid["lunch_start"]
+        self.lunch_end = grid["lunch_end"]
 
         # ถ้าไม่มีคอลัมน์ "ประเภท" สามารถกำหนด rule เองได้ที่นี่
         # ตัวอย่าง: {"default": {"lecture_sections": [1, 2], "lab_sections": [3, 4]}}
         self.section_type_rules = {}
 
     def load_data(self):
+        # import ตอนโหลดจริง (ไม่ให้ pandas ถ่วงเวลา import module นี้)
+        import pandas as pd
+
         print("--- Loading Data ---")
 
         # Load Courses
@@ -43,6 +57,8 @@ class DataLoader:
 
             # เรียกใช้ฟังก์ชันประมวลผลข้อมูล (สร้าง ID และ แยกชื่ออาจารย์)
             self.courses = self._process_courses(df_courses)
+            # ไม่เก็บ DataFrame ต่อ (ข้อมูลที่ใช้อยู่ใน CourseRecord แล้ว)
+            del df_courses
         else:
             print(f"Error: File not found at {courses_path}")
 
@@ -67,6 +83,7 @@ class DataLoader:
                 room_data["id"] = r_id
                 self.rooms.append(room_data)
 
+            del df_rooms
             print(f"Loaded {len(self.rooms)} rooms.")
         else:
             print(f"Error: File not found at {rooms_path}")
@@ -74,11 +91,52 @@ class DataLoader:
         # Generate Time Slots
         time_slots = self._generate_time_slots()
 
+        # Load Cohorts (ถ้ามีไฟล์รายชื่อ ใช้ไฟล์ ถ้าไม่มีอนุมานจาก ชั้นปี + สาขา เมื่อเปิด
+        # config.COHORTS["infer"] ไม่งั้นไม่มี cohort)
+        cohorts_path = os.path.join(self.data_dir, "Cohort.csv")
+        if os.path.exists(cohorts_path):
+            df_cohorts = pd.read_csv(cohorts_path, dtype=str)
+            cohorts = self._load_cohorts(df_cohorts, self.courses)
+            del df_cohorts
+            cohort_source = "file"
+        elif COHORTS.get("infer"):
+            cohorts = self._build_cohorts(self.courses)
+            cohort_source = "inferred"
+        else:
+            print(
+                "\n[Cohorts] No Cohort.csv: cohort no-overlap not applied "
+                '(set COHORTS["infer"] = True to infer from year/program)'
+            )
+            cohorts = {}
+            cohort_source = "none"
+        print(f"\n[Generated] Student Cohorts: {len(cohorts)} cohorts")
+
+        # Load Teacher Availability (ไม่บังคับ)
+        availability = {}
+        preferences = {}
+        availability_path = os.path.join(self.data_dir, "Teacher_Availability.csv")
+        if os.path.exists(availability_path):
+            df_availability = pd.read_csv(availability_path, dtype=str)
+            self.availability_table = df_availability.to_dict("records")
+            del df_availability
+            availability, preferences = self._compile_availability(
+                self.availability_table, time_slots
+            )
+            print(
+                f"\n[Loaded] Teacher Availability: {len(availability)} teachers "
+                f"with unavailable slots, {len(preferences)} with preferences"
+            )
+
         return {
             "courses": self.courses,
             "rooms": self.rooms,
-            "teachers": list(self.all_teachers),
+            # เรียงชื่อ: ลำดับ constraint ของอาจารย์คงที่ทุก run (set เรียงตาม hash ของ string)
+            "teachers": sorted(self.all_teachers),
             "time_slots": time_slots,
+            "cohorts": cohorts,
+            "cohort_source": cohort_source,
+            "teacher_availability": availability,
+            "teacher_preferences": preferences,
             "course_catalog": self._build_course_catalog(self.courses),
             "time_config": {
                 "slot_minutes": self.slot_minutes,
@@ -100,6 +158,8 @@ class DataLoader:
         lps_column = self._find_lps_column(df.columns)
         type_column = self._find_type_column(df.columns)
         pair_column = self._find_pair_column(df.columns)
+        week_column = self._find_week_column(df.columns)
+        program_column = self._find_program_column(df.columns)
         type_index = self._build_type_index(df, type_column)
 
         for index, row in df.iterrows():
@@ -141,8 +201,8 @@ class DataLoader:
                         if typo_info:
                             self.teacher_typos.append(typo_info)
 
-            # แปลง Row เป็น Dict และเพิ่ม field ใหม่เข้าไป
-            course_dict = row.to_dict()
+            # เก็บเฉพาะคอลัมน์ที่ใช้ (CourseRecord) แล้วเพิ่ม field ใหม่เข้าไป
+            course_dict = course_record(row, program_column)
             course_dict["id"] = uid  # ใช้ key 'id' เป็นหลักสำหรับ Solver
             course_dict["uid"] = uid  # เก็บ key 'uid' ไว้ด้วยเพื่อความชัดเจน
             course_dict["teacher_list"] = teacher_list
@@ -154,6 +214,11 @@ class DataLoader:
             course_dict["p_hours"] = p_hours
             course_dict["s_hours"] = s_hours
             course_dict["type_hint"] = type_hint
+            # รูปแบบสัปดาห์ (ทุกสัปดาห์/คี่/คู่/ช่วงสัปดาห์) ใช้กับ multi-week horizon
+            week_pattern = str(row.get(week_column, "")).strip() if week_column else ""
+            course_dict["week_pattern"] = (
+                "" if week_pattern.lower() == "nan" else week_pattern
+            )
             course_dict["components"] = self._build_components(
                 uid, l_hours, p_hours, type_hint
             )
@@ -224,13 +289,16 @@ class DataLoader:
             for item in zero_l[:10]:
                 print(item)
 
-        raw = input(
-            "\nEnter course codes to exclude (comma-separated), or press Enter to skip: "
-        ).strip()
-        if not raw:
-            return courses
-
-        exclude_codes = {x.strip() for x in raw.split(",") if x.strip()}
+        if self.exclude_codes is not None:
+            exclude_codes = set(self.exclude_codes)
+        elif self.interactive:
+            raw = input(
+                "\nEnter course codes to exclude (comma-separated), or press Enter to skip: "
+            ).strip()
+            exclude_codes = {x.strip() for x in raw.split(",") if x.strip()}
+        else:
+            exclude_codes = set()
+        self.exclude_codes = sorted(exclude_codes)
         if not exclude_codes:
             return courses
 
@@ -282,6 +350,190 @@ class DataLoader:
             )
         return catalog
 
+    def _build_cohorts(self, courses):
+        """
+        อนุมานกลุ่มนักศึกษา (cohort) จาก ชั้นปี + สาขา
+        วิชาที่มีหลายกลุ่มเรียน (ประเภทเดียวกัน) คือทางเลือกของนักศึกษาคนละกลุ่ม
+        จึงแบ่ง cohort เป็น stream: stream ที่ i เรียนกลุ่มเรียนลำดับที่ i ของแต่ละวิชา
+        วิชากลุ่มเดียวอยู่ในทุก stream, วิชาที่จำนวนกลุ่มเรียนไม่เท่าจำนวน stream ถูกข้าม
+        (จับคู่กลุ่มเรียนข้ามวิชาแบบนั้นไม่มีหลักฐาน) และแจ้งใน log
+        คืนค่า {cohort_id: [course uid, ...]}
+        """
+        program_column = self._find_program_column(
+            {k for c in courses for k in c.keys()}
+        )
+
+        # (ชั้นปี, สาขา) -> (รหัสวิชา, ประเภท) -> [uid ตามลำดับกลุ่มเรียน]
+        groups = {}
+        for c in courses:
+            year = str(c.get("ชั้นปี", "")).strip()
+            subject_code = str(c.get("รหัสวิชา", "")).strip()
+            if not year or year.lower() == "nan" or not subject_code:
+                continue
+            program = ""
+            if program_column:
+                program = str(c.get(program_column, "")).strip()
+                if program.lower() == "nan":
+                    program = ""
+            types = tuple(sorted(comp.get("type") for comp in c.get("components", [])))
+            sections = groups.setdefault((year, program), {})
+            sections.setdefault((subject_code, types), []).append(c)
+
+        cohorts = {}
+        skipped = []
+        for (year, program), subjects in groups.items():
+            streams = max(len(v) for v in subjects.values())
+            for key, section_list in list(subjects.items()):
+                if len(section_list) not in (1, streams):
+                    skipped.append(f"{key[0]} (Y{year})")
+                    del subjects[key]
+            for i in range(streams):
+                cohort_id = f"Y{year}"
+                if program:
+                    cohort_id = f"{cohort_id}_{program}"
+                if streams > 1:
+                    cohort_id = f"{cohort_id}_S{i + 1}"
+                members = []
+                for section_list in subjects.values():
+                    section_list = sorted(
+                        section_list, key=lambda c: self._to_int(c.get("กลุ่มเรียน"))
+                    )
+                    # กลุ่มเดียว -> ทุก stream, ไม่งั้นจำนวนกลุ่มเรียน = จำนวน stream
+                    members.append(section_list[i % len(section_list)]["id"])
+                cohorts[cohort_id] = members
+        if skipped:
+            print(
+                f"[Cohorts] {len(skipped)} subjects left out of inferred cohorts "
+                f"(section count differs from streams): {', '.join(skipped[:20])}"
+            )
+        return cohorts
+
+    def _load_cohorts(self, df, courses):
+        """
+        อ่านรายการลงทะเบียนของแต่ละกลุ่มนักศึกษาจาก Cohort.csv
+        คอลัมน์: กลุ่มนักศึกษา (หรือ Cohort), รหัสวิชา, กลุ่มเรียน (ไม่บังคับ), ชั้นปี (ไม่บังคับ)
+        ถ้าไม่ระบุกลุ่มเรียน จะนับทุกกลุ่มเรียนของวิชานั้น
+        """
+        cohort_column = None
+        for col in df.columns:
+            if str(col).strip() in ["กลุ่มนักศึกษา", "Cohort", "cohort"]:
+                cohort_column = col
+                break
+        if not cohort_column:
+            print("Warning: Cohort.csv has no cohort column, falling back to years.")
+            return self._build_cohorts(courses)
+
+        cohorts = {}
+        for _, row in df.iterrows():
+            cohort_id = str(row.get(cohort_column, "")).strip()
+            subject_code = str(row.get("รหัสวิชา", "")).strip()
+            section = str(row.get("กลุ่มเรียน", "")).strip()
+            year = str(row.get("ชั้นปี", "")).strip()
+            if not cohort_id or not subject_code:
+                continue
+            members = cohorts.setdefault(cohort_id, [])
+            for c in courses:
+                if str(c.get("รหัสวิชา", "")).strip() != subject_code:
+                    continue
+                if section and section.lower() != "nan":
+                    if str(c.get("กลุ่มเรียน", "")).strip() != section:
+                        continue
+                if year and year.lower() != "nan":
+                    if str(c.get("ชั้นปี", "")).strip() != year:
+                        continue
+                if c["id"] not in members:
+                    members.append(c["id"])
+        return cohorts
+
+    def _compile_availability(self, rows, time_slots):
+        """
+        แปลงตารางเวลาว่างของอาจารย์เป็น
+        - availability: {teacher: bitmask} bit ที่ i = 1 ถ้าคาบ time_slots[i] สอนได้
+          (เก็บเฉพาะอาจารย์ที่มีช่วงไม่ว่าง)
+        - preferences: {teacher: {slot_index: cost}} สำหรับช่วง "ไม่สะดวก" (soft)
+        rows: แถวของ Teacher_Availability.csv (list ของ dict)
+        คอลัมน์: อาจารย์ผู้สอน, วัน, เวลาเริ่ม, เวลาสิ้นสุด, สถานะ, น้ำหนัก (ไม่บังคับ)
+        สถานะ: ไม่ว่าง/unavailable = ห้ามสอน, ไม่สะดวก/avoid = สอนได้แต่มี penalty
+        """
+        columns = {}
+        for row in rows:
+            for c in row:
+                columns.setdefault(str(c).strip(), c)
+
+        def col(*names):
+            for n in names:
+                if n in columns:
+                    return columns[n]
+            return None
+
+        teacher_col = col("อาจารย์ผู้สอน", "อาจารย์", "Teacher")
+        day_col = col("วัน", "Day")
+        start_col = col("เวลาเริ่ม", "Start")
+        end_col = col("เวลาสิ้นสุด", "End")
+        status_col = col("สถานะ", "Status")
+        cost_col = col("น้ำหนัก", "Cost")
+        if not teacher_col or not day_col:
+            print("Warning: Teacher_Availability.csv needs teacher and day columns.")
+            return {}, {}
+
+        full_mask = (1 << len(time_slots)) - 1
+        availability = {}
+        preferences = {}
+        for row in rows:
+            raw_name = str(row.get(teacher_col, "")).strip()
+            if not raw_name or raw_name.lower() == "nan":
+                continue
+            cleaned = self._normalize_teacher_name(raw_name)
+            key = cleaned.lower().replace(" ", "")
+            teacher = self.teacher_aliases.get(key, cleaned)
+            if teacher not in self.all_teachers:
+                print(f"Warning: Unknown teacher in availability file: {raw_name}")
+
+            day = str(row.get(day_col, "")).strip()
+            start_raw = str(row.get(start_col, "")).strip() if start_col else ""
+            end_raw = str(row.get(end_col, "")).strip() if end_col else ""
+            # ไม่ระบุเวลา = ทั้งวัน
+            start_min = (
+                self._time_to_minutes(start_raw)
+                if ":" in start_raw
+                else self._time_to_minutes(self.day_start)
+            )
+            end_min = (
+                self._time_to_minutes(end_raw)
+                if ":" in end_raw
+                else self._time_to_minutes(self.day_end)
+            )
+
+            status = str(row.get(status_col, "")).strip().lower() if status_col else ""
+            soft = status in ("ไม่สะดวก", "avoid", "prefer_not")
+            cost = self._to_int(row.get(cost_col)) if cost_col else 0
+            cost = cost or 1
+
+            for i, slot in enumerate(time_slots):
+                if slot["day"] != day:
+                    continue
+                if slot["start_min"] >= end_min or slot["end_min"] <= start_min:
+                    continue
+                if soft:
+                    slot_costs = preferences.setdefault(teacher, {})
+                    slot_costs[i] = slot_costs.get(i, 0) + cost
+                else:
+                    mask = availability.get(teacher, full_mask)
+                    availability[teacher] = mask & ~(1 << i)
+
+        return availability, preferences
+
+    def _find_program_column(self, columns):
+        """
+        หา column ที่เก็บค่า "สาขา/หลักสูตร"
+        """
+        candidates = ["สาขา", "สาขาวิชา", "หลักสูตร", "Program", "Major"]
+        for col in columns:
+            col_str = str(col).strip()
+            if col_str in candidates:
+                return col_str
+        return None
+
     def _find_lps_column(self, columns):
         """
         หา column ที่เก็บค่า L-P-S หากมี
@@ -331,6 +583,17 @@ class DataLoader:
                 return col_str
         return None
 
+    def _find_week_column(self, columns):
+        """
+        หา column ที่เก็บค่า "สัปดาห์" (ทุกสัปดาห์/คี่/คู่/1-8)
+        """
+        candidates = ["สัปดาห์", "สัปดาห์เรียน", "Weeks", "Week Pattern"]
+        for col in columns:
+            col_str = str(col).strip()
+            if col_str in candidates:
+                return col_str
+        return None
+
     def _build_type_index(self, df, type_column):
         """
         สร้าง index: (รหัสวิชา, กลุ่มเรียน) -> ประเภท(L/P)
@@ -441,7 +704,7 @@ class DataLoader:
             return self.teacher_aliases[key], None
 
         # ลองหาใกล้เคียงในชื่อที่มีอยู่
-        for existing in self.all_teachers:
+        for existing in sorted(self.all_teachers):
             exist_key = self._normalize_teacher_name(existing).lower().replace(" ", "")
             ratio = difflib.SequenceMatcher(None, key, exist_key).ratio()
             if ratio >= 0.9 and key != exist_key:
@@ -482,7 +745,7 @@ class DataLoader:
                     "id": f"{uid}_L",
                     "type": "L",
                     "hours": l_hours,
-                    "duration_slots": self._hours_to_slots(l_hours),
+                    "duration_slots": self._hours_to_slots(l_hours, f"{uid}_L"),
                 }
             )
         elif type_hint == "P" and p_hours and p_hours > 0:
@@ -491,7 +754,7 @@ class DataLoader:
                     "id": f"{uid}_P",
                     "type": "P",
                     "hours": p_hours,
-                    "duration_slots": self._hours_to_slots(p_hours),
+                    "duration_slots": self._hours_to_slots(p_hours, f"{uid}_P"),
                 }
             )
         elif type_hint is None:
@@ -502,7 +765,7 @@ class DataLoader:
                         "id": f"{uid}_L",
                         "type": "L",
                         "hours": l_hours,
-                        "duration_slots": self._hours_to_slots(l_hours),
+                        "duration_slots": self._hours_to_slots(l_hours, f"{uid}_L"),
                     }
                 )
             if p_hours and p_hours > 0:
@@ -511,13 +774,24 @@ class DataLoader:
                         "id": f"{uid}_P",
                         "type": "P",
                         "hours": p_hours,
-                        "duration_slots": self._hours_to_slots(p_hours),
+                        "duration_slots": self._hours_to_slots(p_hours, f"{uid}_P"),
                     }
                 )
         return components
 
-    def _hours_to_slots(self, hours):
-        return int((hours * 60) / self.slot_minutes)
+    def _hours_to_slots(self, hours, comp_id):
+        """
+        จำนวนคาบของ component ยาว hours ชั่วโมง
+        grid ที่หารเวลาเรียนไม่ลงตัวถือว่าใช้ไม่ได้ (ไม่ปัดทิ้ง ไม่ให้เกิด component 0 คาบ)
+        """
+        minutes = round(hours * 60)
+        if minutes % self.slot_minutes:
+            raise ValueError(
+                f"{comp_id}: {hours} h is not a whole number of "
+                f"{self.slot_minutes}-minute slots (choose a slot_minutes that "
+                "divides every course duration)"
+            )
+        return minutes // self.slot_minutes
 
     def _to_int(self, value):
         if value is None:
@@ -529,8 +803,9 @@ class DataLoader:
 
     def _generate_time_slots(self):
         """
-        สร้าง Time Slots ตามเงื่อนไข:
+        สร้าง Time Slots ตามเงื่อนไข (ค่าเริ่มต้น):
         เรียน 08:30 - 17:00 พักเที่ยง 12:00 - 13:00
+        คาบที่คร่อมพักเที่ยงจะถูกข้าม แล้วเริ่มคาบถัดไปที่เวลาเลิกพัก
         """
         slots = []
 
@@ -544,17 +819,24 @@ class DataLoader:
             while current + self.slot_minutes <= end_min:
                 next_t = current + self.slot_minutes
 
-                # Skip lunch break
-                if not (current >= lunch_start and next_t <= lunch_end):
-                    slot_label = f"{day} {self._minutes_to_time(current)}-{self._minutes_to_time(next_t)}"
-                    slots.append(
-                        {
-                            "day": day,
-                            "start_min": current,
-                            "end_min": next_t,
-                            "label": slot_label,
-                        }
-                    )
+                # Skip lunch break (คาบยาว เช่น 60 นาที อาจคร่อมพักเที่ยง)
+                if (
+                    lunch_start < lunch_end
+                    and current < lunch_end
+                    and next_t > lunch_start
+                ):
+                    current = lunch_end
+                    continue
+
+                slot_label = f"{day} {self._minutes_to_time(current)}-{self._minutes_to_time(next_t)}"
+                slots.append(
+                    {
+                        "day": day,
+                        "start_min": current,
+                        "end_min": next_t,
+                        "label": slot_label,
+                    }
+                )
 
                 current = next_t
 
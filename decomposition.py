@@ -0,0 +1,323 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import DECOMPOSITION, OBJECTIVE_WEIGHTS
+from src.domains import day_label
+from src.model import TimetableModel
+from src.solver import TimetableSolver
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+def _solve_rooms(acts, rooms, time_limit, optimize=True):
+    """
+    เลือกห้องให้ชุดกิจกรรม (เวลาถูกตรึงแล้ว) คืนค่า {act_id: room_id} หรือ None ถ้าจัดไม่ได้
+    optimize=False: หาคำตอบที่เป็นไปได้อย่างเดียว (ใช้ตรวจหาชุดที่ขัดแย้ง)
+    """
+    model = cp_model.CpModel()
+    presence = {}
+    room_intervals = {r["id"]: [] for r in rooms}
+    waste_terms = []
+    group_rooms = {}
+    group_sizes = {}
+
+    for act in acts:
+        group_sizes[act["group"]] = group_sizes.get(act["group"], 0) + 1
+        choices = []
+        for r in rooms:
+            capacity = r["capacity"]
+            if capacity and act["enrollment"] and capacity < act["enrollment"]:
+                continue
+            b = model.NewBoolVar(f"pres_{act['id']}_{r['id']}")
+            presence[(act["id"], r["id"])] = b
+            choices.append(b)
+            room_intervals[r["id"]].append(
+                model.NewOptionalFixedSizeIntervalVar(
+                    act["start"], act["duration"], b, f"iv_{act['id']}_{r['id']}"
+                )
+            )
+            if capacity and act["enrollment"]:
+                waste_terms.append((capacity - act["enrollment"]) * b)
+            group_rooms.setdefault(act["group"], {}).setdefault(r["id"], []).append(b)
+        if not choices:
+            return None
+        model.AddExactlyOne(choices)
+
+    for intervals in room_intervals.values():
+        if len(intervals) > 1:
+            model.AddNoOverlap(intervals)
+
+    # ลดจำนวนห้องที่กลุ่มวิชาเดียวกันใช้ (เฉพาะภายในวันนี้)
+    # นิยามเดียวกับ Constraints._same_room_terms โหมด "used": used เฉพาะห้อง candidate
+    # ของกลุ่ม, pres -> used (minimize ดัน used ลงเอง), penalty = จำนวนห้องที่ใช้ - 1
+    same_room_terms = []
+    for group_key, by_room in group_rooms.items():
+        if group_sizes[group_key] <= 1:
+            continue
+        used = []
+        for r_id, bools in by_room.items():
+            u = model.NewBoolVar(f"used_{group_key}_{r_id}")
+            for b in bools:
+                model.AddImplication(b, u)
+            used.append(u)
+        same_room_terms.append(sum(used) - 1)
+
+    if optimize:
+        model.Minimize(
+            OBJECTIVE_WEIGHTS.get("capacity_waste", 1) * sum(waste_terms)
+            + OBJECTIVE_WEIGHTS.get("same_room", 1) * sum(same_room_terms)
+        )
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    assignment = {}
+    for (act_id, r_id), b in presence.items():
+        if solver.Value(b):
+            assignment[act_id] = r_id
+    return assignment
+
+
+def _overload_sets(acts, rooms):
+    """
+    ชุดกิจกรรมที่อยู่ในคาบเดียวกันและต้องใช้ห้องความจุ >= c มากกว่าจำนวนห้องความจุ >= c
+    (จัดห้องไม่ได้แน่นอน ไม่ว่ากิจกรรมอื่นจะอยู่ที่ไหน)
+    """
+    # ความจุ 0 (ไม่ทราบ) ถือว่ารับได้ทุกวิชา
+    unlimited = float("inf")
+    capacities = [r["capacity"] or unlimited for r in rooms]
+    thresholds = sorted(set(capacities))
+
+    by_slot = {}
+    for act in acts:
+        for slot in range(act["start"], act["start"] + act["duration"]):
+            by_slot.setdefault(slot, []).append(act)
+
+    sets = set()
+    for slot_acts in by_slot.values():
+        prev = -1
+        for cap in thresholds:
+            need = frozenset(a["id"] for a in slot_acts if a["enrollment"] > prev)
+            if len(need) > sum(1 for x in capacities if x >= cap):
+                sets.add(need)
+            prev = cap
+    # เก็บเฉพาะชุดที่เล็กที่สุด (ชุดที่มีชุดอื่นเป็น subset ให้ cut ที่อ่อนกว่า)
+    return [sorted(a) for a in sets if not any(b < a for b in sets)]
+
+
+def _overlap_clusters(acts):
+    """
+    แบ่งกิจกรรมเป็นกลุ่มที่เวลาคาบเกี่ยวกันต่อเนื่อง (ห้องของแต่ละกลุ่มเลือกได้อิสระต่อกัน)
+    """
+    clusters = []
+    end = None
+    for act in sorted(acts, key=lambda a: a["start"]):
+        if end is None or act["start"] >= end:
+            clusters.append([])
+            end = act["start"]
+        clusters[-1].append(act)
+        end = max(end, act["start"] + act["duration"])
+    return clusters
+
+
+def _assign_day_rooms(day, acts, rooms, time_limit):
+    """
+    Phase 2: เลือกห้องให้กิจกรรมของ 1 วัน (เวลาถูกตรึงจาก phase 1 แล้ว)
+    acts: [{"id", "start", "duration", "enrollment", "group"}]
+    rooms: [{"id", "capacity"}]
+    คืนค่า (day, {act_id: room_id} หรือ None ถ้าจัดห้องไม่ได้, conflicts)
+    conflicts: ชุดกิจกรรมย่อยที่จัดห้องไม่ได้ (ใช้สร้าง cut ใน phase 1)
+    """
+    assignment = _solve_rooms(acts, rooms, time_limit)
+    if assignment is not None:
+        return day, assignment, []
+
+    conflicts = _overload_sets(acts, rooms)
+    if not conflicts:
+        conflicts = [
+            [a["id"] for a in cluster]
+            for cluster in _overlap_clusters(acts)
+            if _solve_rooms(cluster, rooms, time_limit, optimize=False) is None
+        ]
+    if not conflicts:
+        # แต่ละกลุ่มจัดได้แต่ทั้งวันหมดเวลา -> ห้ามรูปแบบเวลาของทั้งวัน
+        conflicts = [[a["id"] for a in acts]]
+    return day, None, conflicts
+
+
+class TwoPhaseSolver:
+    """
+    Two-phase time-then-room decomposition
+    Phase 1: เลือกเวลาอย่างเดียว (ครูชนกัน, วิชาชนกันเอง, objective รายวัน,
+             และ cumulative ความจุห้องรวมต่อคาบ) -> โมเดลเล็กกว่ามากเพราะไม่มีตัวแปรห้อง
+    Phase 2: เลือกห้องแยกเป็นปัญหาย่อยรายวัน (กิจกรรมไม่ข้ามวัน) รันขนานใน process pool
+    ถ้าวันไหนจัดห้องไม่ได้ จะเพิ่ม cut ห้ามรูปแบบเวลานั้นใน phase 1 แล้ว solve ใหม่
+    """
+
+    def __init__(self, data, config=None):
+        self.data = data
+        self.config = dict(DECOMPOSITION)
+        if config:
+            self.config.update(config)
+
+        self.solution = None
+        self.iterations = []
+        # (act_id, start) -> literal "กิจกรรมเริ่มที่ start" ใช้ซ้ำข้าม cut
+        self._same_start = {}
+
+    def solve(self):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        phase1 = TimetableModel(self.data, options={"room_mode": "none"})
+        model, all_vars = phase1.build_model()
+        solver = TimetableSolver(
+            model,
+            all_vars,
+            self.data,
+            params={"max_time_in_seconds": float(self.config["phase1_time"])},
+        )
+
+        status = cp_model.UNKNOWN
+        max_iterations = int(self.config.get("max_iterations", 5))
+        for iteration in range(1, max_iterations + 1):
+            print(f"--- Two-Phase: iteration {iteration} / phase 1 (times) ---")
+            status = solver.run()
+            solver.analyze_status(status)
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if status == cp_model.INFEASIBLE:
+                    solver.report_infeasibility()
+                break
+
+            starts = solver.extract_solution()
+            print(f"--- Two-Phase: iteration {iteration} / phase 2 (rooms) ---")
+            rooms_by_act, failed_days, conflicts = self._assign_rooms(starts)
+            self.iterations.append(
+                {
+                    "iteration": iteration,
+                    "phase1_status": solver.solver.StatusName(status),
+                    "phase1_objective": solver.solver.ObjectiveValue(),
+                    "failed_days": failed_days,
+                }
+            )
+
+            if not failed_days:
+                self.solution = {
+                    act_id: {"start": sol["start"], "room": rooms_by_act[act_id]}
+                    for act_id, sol in starts.items()
+                }
+                break
+
+            # Feedback: ห้ามชุดเวลาที่จัดห้องไม่ได้ แล้วเริ่ม phase 1 ใหม่
+            print(
+                f"Room-infeasible days: {', '.join(failed_days)} -> "
+                f"adding {len(conflicts)} cuts"
+            )
+            self._add_nogood_cuts(model, all_vars, starts, conflicts)
+            # hint เฉพาะกิจกรรมที่ไม่อยู่ใน cut (ไม่ชี้ solver กลับไปที่รูปแบบที่ถูกห้าม)
+            banned = {act_id for ids in conflicts for act_id in ids}
+            model.ClearHints()
+            phase1.add_hints({k: v for k, v in starts.items() if k not in banned})
+
+        if self.solution:
+            solver.export_solution(self.solution)
+        else:
+            print("Two-phase decomposition found no complete timetable.")
+
+        lines = [
+            "## Two-Phase Iterations",
+            "| iteration | phase 1 status | phase 1 objective | room-infeasible days |",
+            "|---|---|---|---|",
+        ]
+        for it in self.iterations:
+            lines.append(
+                f"| {it['iteration']} | {it['phase1_status']} "
+                f"| {it['phase1_objective']} | {', '.join(it['failed_days']) or '-'} |"
+            )
+        solver._write_run_log(
+            status, start_dt, datetime.now(), time.time() - start_ts, lines
+        )
+        return self.solution
+
+    def _assign_rooms(self, starts):
+        time_slots = self.data["time_slots"]
+        rooms = [
+            {"id": r["id"], "capacity": _to_int(r.get("จำนวนที่นั่ง", 0))}
+            for r in self.data["rooms"]
+        ]
+
+        by_day = {}
+        for c in self.data["courses"]:
+            enrollment = _to_int(c.get("ลง", 0))
+            subject_code = str(c.get("รหัสวิชา", "")).strip()
+            for comp in c.get("components", []):
+                start = starts[comp["id"]]["start"]
+                by_day.setdefault(day_label(time_slots[start]), []).append(
+                    {
+                        "id": comp["id"],
+                        "start": start,
+                        "duration": comp.get("duration_slots", 1),
+                        "enrollment": enrollment,
+                        "group": f"{subject_code}_{comp.get('type')}",
+                    }
+                )
+
+        max_processes = self.config.get("max_processes") or os.cpu_count() or 1
+        time_limit = float(self.config["phase2_time"])
+        rooms_by_act = {}
+        failed_days = []
+        conflicts = []
+        with ProcessPoolExecutor(max_workers=max_processes) as pool:
+            futures = [
+                pool.submit(_assign_day_rooms, day, acts, rooms, time_limit)
+                for day, acts in by_day.items()
+            ]
+            for future in futures:
+                day, assignment, day_conflicts = future.result()
+                if assignment is None:
+                    failed_days.append(day)
+                    conflicts.extend(day_conflicts)
+                else:
+                    rooms_by_act.update(assignment)
+                print(f"[Phase 2] {day}: {'OK' if assignment else 'room-infeasible'}")
+        return rooms_by_act, failed_days, conflicts
+
+    def _add_nogood_cuts(self, model, all_vars, starts, conflicts):
+        """
+        ห้ามให้กิจกรรมในแต่ละชุดที่ขัดแย้ง (phase 2) กลับไปอยู่ที่เวลาเดิมพร้อมกันทั้งชุด
+        ชุดเป็นกิจกรรมที่ใช้ห้องเกินในคาบเดียว หรือกลุ่มที่เวลาคาบเกี่ยวกันที่จัดห้องไม่ได้
+        (เล็กกว่าทั้งวัน จึงตัดรูปแบบเวลาที่ผิดแบบเดียวกันได้มากกว่า)
+        """
+        acts = {
+            act_id: act
+            for c_vars in all_vars.values()
+            for act_id, act in c_vars["activities"].items()
+        }
+        for act_ids in conflicts:
+            literals = []
+            for act_id in act_ids:
+                start = starts[act_id]["start"]
+                same = self._same_start.get((act_id, start))
+                if same is None:
+                    same = model.NewBoolVar(f"nogood_{act_id}_{start}")
+                    model.Add(acts[act_id]["start"] == start).OnlyEnforceIf(same)
+                    model.Add(acts[act_id]["start"] != start).OnlyEnforceIf(same.Not())
+                    self._same_start[(act_id, start)] = same
+                literals.append(same.Not())
+            if literals:
+                model.AddBoolOr(literals)
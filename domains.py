@@ -0,0 +1,152 @@
+from collections import OrderedDict
+
+import numpy as np
+from src.config import DOMAIN_CACHE_SIZE
+
+
+def day_key(slot):
+    """
+    วันของคาบ (week, day) ใช้แยกวันเดียวกันของคนละสัปดาห์ใน multi-week horizon
+    (time slots สัปดาห์เดียวจาก DataLoader ไม่มี "week" -> week = 0)
+    """
+    return (slot.get("week", 0), slot["day"])
+
+
+def day_label(slot):
+    if "week" in slot:
+        return f"W{slot['week']} {slot['day']}"
+    return slot["day"]
+
+
+def horizon_slots(template, weeks):
+    """
+    ขยาย time slots ของสัปดาห์เดียว (template) เป็นหลายสัปดาห์ เรียงตาม weeks
+    คาบ i ของสัปดาห์ที่ k ใน weeks อยู่ที่ index k * len(template) + i
+    """
+    slots = []
+    for week in weeks:
+        for slot in template:
+            slots.append(dict(slot, week=week, label=f"W{week} {slot['label']}"))
+    return slots
+
+
+class TimeGrid:
+    """
+    ข้อมูลของ time_slots ที่ใช้คำนวณโดเมน (สร้างครั้งเดียวต่อชุด time_slots)
+    - key: ลายเซ็นของ grid ใช้เป็นส่วนหนึ่งของ cache key
+    - link[i]: คาบ i กับ i+1 ต่อเนื่องกันจริง (วันเดียวกัน และ end == start ถัดไป)
+    """
+
+    def __init__(self, time_slots, key=None):
+        self.size = len(time_slots)
+        self.key = key if key is not None else self.key_of(time_slots)
+        self.full_mask = (1 << self.size) - 1
+
+        link = np.zeros(self.size, dtype=bool)
+        for i in range(self.size - 1):
+            a = time_slots[i]
+            b = time_slots[i + 1]
+            link[i] = day_key(a) == day_key(b) and b["start_min"] == a["end_min"]
+        self.link = link
+
+    @staticmethod
+    def key_of(time_slots):
+        """
+        ลายเซ็นของ time_slots (คำนวณได้ถูกกว่าสร้าง grid ใช้หา grid เดิมใน cache)
+        """
+        return tuple(
+            (s.get("week", 0), s["day"], s["start_min"], s["end_min"])
+            for s in time_slots
+        )
+
+    def mask_array(self, mask):
+        """
+        แปลง bitmask (int) เป็น bool array ยาวเท่าจำนวนคาบ
+        """
+        if mask is None or mask == self.full_mask:
+            return np.ones(self.size, dtype=bool)
+        num_bytes = (self.size + 7) // 8
+        raw = np.frombuffer(mask.to_bytes(num_bytes, "little"), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little")[: self.size].astype(bool)
+
+
+class DomainCompiler:
+    """
+    คำนวณ "คาบที่เริ่มได้" ของกิจกรรมยาว duration คาบ บน calendar mask หนึ่งๆ
+    ใช้ NumPy run-length: หาช่วงคาบที่ต่อเนื่องและว่าง แล้วเริ่มได้ถ้าช่วงที่เหลือยาวพอ
+    ผลลัพธ์ถูก memoize ด้วย LRU (จำกัดจำนวน) ใช้ร่วมกันทั้ง process
+    (ทุก TimetableModel / decomposition / portfolio ที่รันใน process เดียวกัน)
+    """
+
+    def __init__(self, max_entries=DOMAIN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._grids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def grid(self, time_slots):
+        # ใช้ grid เดิมถ้าลายเซ็นตรงกัน (สร้าง grid / link array เฉพาะตอน cache miss)
+        key = TimeGrid.key_of(time_slots)
+        cached = self._grids.get(key)
+        if cached is not None:
+            self._grids.move_to_end(key)
+            return cached
+        grid = TimeGrid(time_slots, key)
+        self._grids[key] = grid
+        if len(self._grids) > self.max_entries:
+            self._grids.popitem(last=False)
+        return grid
+
+    def valid_starts(self, grid, duration, mask=None):
+        """
+        คืนค่า tuple ของคาบที่เริ่มได้ (คาบ s..s+duration-1 ต่อเนื่อง อยู่วันเดียวกัน และว่างทุกคาบ)
+        mask: bitmask ของคาบที่ใช้ได้ (None = ทุกคาบ)
+        """
+        if mask is not None and mask == grid.full_mask:
+            mask = None
+        key = (grid.key, duration, mask)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        result = self._compile(grid, duration, mask)
+        self._cache[key] = result
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+    def _compile(self, grid, duration, mask):
+        n = grid.size
+        if n == 0 or duration <= 0:
+            return ()
+        ok = grid.mask_array(mask)
+
+        # cont[i] = คาบ i ต่อไปคาบ i+1 ได้ (ต่อเนื่องและคาบถัดไปว่าง)
+        cont = np.zeros(n, dtype=bool)
+        cont[:-1] = grid.link[:-1] & ok[1:]
+
+        # run_end[i] = คาบสุดท้ายของช่วงต่อเนื่องที่มีคาบ i
+        ends = np.flatnonzero(~cont)
+        run_end = ends[np.searchsorted(ends, np.arange(n))]
+
+        valid = ok & (run_end - np.arange(n) + 1 >= duration)
+        return tuple(np.flatnonzero(valid).tolist())
+
+    def stats(self):
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# compiler กลางของ process (แชร์ cache ระหว่างทุกโมเดล)
+_compiler = DomainCompiler()
+
+
+def get_domain_compiler():
+    return _compiler
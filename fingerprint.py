@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+
+from src import config
+
+# ไฟล์ข้อมูลที่ DataLoader อ่าน (ไฟล์ที่ไม่มีจะถูกข้าม)
+DATA_FILES = ("Comsci_Test.csv", "Room.csv", "Cohort.csv", "Teacher_Availability.csv")
+# ไฟล์ที่ต้องมี (ไม่มีแล้ว solve ได้แต่ตารางว่าง)
+REQUIRED_DATA_FILES = ("Comsci_Test.csv", "Room.csv")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def data_fingerprint(data_dir):
+    """
+    sha256 ของไฟล์ข้อมูลแต่ละไฟล์ใน data_dir คืนค่า {ชื่อไฟล์: hex digest}
+    """
+    fingerprint = {}
+    for fname in DATA_FILES:
+        path = os.path.join(data_dir, fname)
+        if os.path.exists(path):
+            fingerprint[fname] = file_digest(path)
+    return fingerprint
+
+
+def missing_data_files(data_dir):
+    """
+    ไฟล์ใน REQUIRED_DATA_FILES ที่ไม่มีใน data_dir
+    """
+    return [
+        fname
+        for fname in REQUIRED_DATA_FILES
+        if not os.path.isfile(os.path.join(data_dir, fname))
+    ]
+
+
+def data_hash(data_dir):
+    """
+    hash รวมของไฟล์ข้อมูลทั้งหมดใน data_dir (ใช้เป็น key ของ cache)
+    """
+    return text_digest(json.dumps(data_fingerprint(data_dir), sort_keys=True))
+
+
+def config_snapshot():
+    """
+    ค่าทั้งหมดใน config.py (ตัวแปรชื่อตัวพิมพ์ใหญ่) ในรูปที่ dump เป็น JSON ได้
+    """
+    return {
+        name: getattr(config, name)
+        for name in sorted(dir(config))
+        if name.isupper() and not name.startswith("_")
+    }
+
+
+def config_fingerprint():
+    return text_digest(json.dumps(config_snapshot(), sort_keys=True, default=str))
+
+
+def model_fingerprint(model):
+    """
+    sha256 ของ CpModelProto (text format เรียงตามลำดับตัวแปร/constraint จึงคงที่
+    เมื่อสร้างโมเดลเดิมซ้ำ) รวม objective และ solution hint
+    """
+    return text_digest(str(model.Proto()))
+
+
+def run_fingerprints(data_dir, model=None):
+    """
+    fingerprint ของ input ทั้งหมดของ run: ข้อมูล, config และโมเดล (ถ้ามี)
+    "run" = hash รวม ใช้เป็น key ของ cache / เทียบว่าสอง run มี input เดียวกันหรือไม่
+    """
+    fingerprints = {
+        "data": data_fingerprint(data_dir),
+        "config": config_fingerprint(),
+    }
+    if model is not None:
+        fingerprints["model"] = model_fingerprint(model)
+    fingerprints["run"] = text_digest(json.dumps(fingerprints, sort_keys=True))
+    return fingerprints
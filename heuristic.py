@@ -0,0 +1,221 @@
+import time
+
+import numpy as np
+from src.domains import day_key, get_domain_compiler
+from src.occupancy import OccupancyIndex
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+class GreedyScheduler:
+    """
+    Greedy constructive heuristic (priority-ordered first-fit) สำหรับหา timetable เร็วๆ
+    - เรียงกิจกรรมจากยากไปง่าย: ห้องที่ใช้ได้น้อย, ยาวนาน, คนลงเยอะ, อาจารย์สอนเยอะ
+    - ตารางการใช้งาน (occupancy) เป็น bitmask ต่อห้อง/อาจารย์/cohort/วิชา (src.occupancy)
+    - เลือกห้องที่กลุ่มวิชาเคยใช้ก่อน แล้วห้องที่ความจุพอดีที่สุด
+      และเลือกเวลาในวันที่มีกิจกรรมน้อยที่สุด (กระจายรายวัน)
+    ผลลัพธ์ {act_id: {"start", "room"}} ใช้เป็น hint ของ CP-SAT หรือเป็นคำตอบสำรองเมื่อ solver หมดเวลา
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.solution = {}
+        self.unassigned = []
+
+    def run(self, passes=20, time_limit=None, patience=None):
+        """
+        จัดตามลำดับความยาก ถ้ามีกิจกรรมที่จัดไม่ได้ ให้ย้ายไปจัดก่อนในรอบถัดไป
+        (squeaky wheel สูงสุด passes รอบ) แล้วเก็บรอบที่จัดได้มากที่สุด
+        time_limit: หยุดเมื่อใช้เวลาเกินกี่วินาที (ตรวจระหว่างรอบ, None = ไม่จำกัด)
+        patience: หยุดเมื่อจำนวนที่จัดไม่ได้ไม่ลดลงติดต่อกันกี่รอบ (None = ไม่หยุดก่อน)
+        """
+        start_ts = time.time()
+        rooms = self.data["rooms"]
+        room_index = {r["id"]: i for i, r in enumerate(rooms)}
+        capacity = [_to_int(r.get("จำนวนที่นั่ง", 0)) for r in rooms]
+
+        acts = self._activities(room_index, capacity)
+        teacher_load = {}
+        for act in acts:
+            for t in act["teachers"]:
+                teacher_load[t] = teacher_load.get(t, 0) + act["duration"]
+        acts.sort(
+            key=lambda a: (
+                len(a["rooms"]),
+                -a["duration"],
+                -a["enrollment"],
+                -max([teacher_load[t] for t in a["teachers"]] + [0]),
+            )
+        )
+
+        best = None
+        stale = 0
+        for attempt in range(1, max(1, passes) + 1):
+            # รอบคี่กระจายรายวัน รอบคู่เลือกช่วงว่างที่สั้นที่สุดที่ใส่ได้ (best fit)
+            solution, unassigned = self._construct(acts, spread=attempt % 2 == 1)
+            if best is None or len(unassigned) < len(best[1]):
+                best = (solution, unassigned)
+                stale = 0
+            else:
+                stale += 1
+            if not unassigned:
+                break
+            if patience is not None and stale >= patience:
+                break
+            if time_limit is not None and time.time() - start_ts >= time_limit:
+                break
+            failed = set(unassigned)
+            acts = [a for a in acts if a["id"] in failed] + [
+                a for a in acts if a["id"] not in failed
+            ]
+
+        self.solution, self.unassigned = best
+        print(
+            f"[Greedy] assigned {len(self.solution)} / {len(acts)} activities "
+            f"in {time.time() - start_ts:.3f} s ({attempt} passes)"
+        )
+        if self.unassigned:
+            print(f"[Greedy] unassigned: {', '.join(self.unassigned[:20])}")
+        return self.solution
+
+    def _construct(self, acts, spread=True):
+        """
+        first-fit หนึ่งรอบตามลำดับ acts คืนค่า (solution, unassigned)
+        spread: เลือกเวลาในวันที่มีกิจกรรมน้อยที่สุด
+                (False = best fit: ช่วงว่างที่สั้นที่สุดที่ใส่ได้ เหลือช่วงยาวไว้ให้กิจกรรมอื่น)
+        """
+        time_slots = self.data.get("time_slots", [])
+        n = len(time_slots)
+        rooms = self.data["rooms"]
+
+        cohort_ids = list(self.data.get("cohorts", {}))
+        cohorts_of = {}
+        for cohort_id in cohort_ids:
+            for c_id in self.data["cohorts"][cohort_id]:
+                cohorts_of.setdefault(c_id, []).append(cohort_id)
+
+        occupancy = OccupancyIndex(n)
+        link = get_domain_compiler().grid(time_slots).link
+        day_of_slot = self._day_index(time_slots)
+        day_load = np.zeros(day_of_slot.max() + 1 if n else 0, dtype=np.int64)
+
+        solution = {}
+        unassigned = []
+        group_rooms = {}
+        for act in acts:
+            keys = [("course", act["course"])]
+            keys += [("teacher", t) for t in act["teachers"]]
+            keys += [("cohort", k) for k in cohorts_of.get(act["course"], [])]
+
+            starts = act["starts"]
+            duration = act["duration"]
+            free = occupancy.free_starts(keys, starts, duration)
+
+            preferred = group_rooms.get(act["group"], [])
+            order = [r for r in preferred if r in act["rooms"]]
+            order += [r for r in act["rooms"] if r not in order]
+
+            chosen = None
+            for r in order:
+                ok = free & occupancy.free_starts([("room", r)], starts, duration)
+                if ok.any():
+                    candidates = starts[ok]
+                    if spread:
+                        score = day_load[day_of_slot[candidates]]
+                    else:
+                        score = self._run_lengths(
+                            occupancy.free_array(keys + [("room", r)]), link
+                        )
+                        score = score[candidates]
+                    chosen = (int(candidates[np.argmin(score)]), r)
+                    break
+            if chosen is None:
+                unassigned.append(act["id"])
+                continue
+
+            s, r = chosen
+            for key in keys + [("room", r)]:
+                occupancy.assign(key, s, duration)
+            day_load[day_of_slot[s]] += 1
+            if r not in group_rooms.setdefault(act["group"], []):
+                group_rooms[act["group"]].append(r)
+            solution[act["id"]] = {"start": s, "room": rooms[r]["id"]}
+        return solution, unassigned
+
+    def is_complete(self):
+        return bool(self.solution) and not self.unassigned
+
+    def _activities(self, room_index, capacity):
+        """
+        รายการกิจกรรมพร้อมโดเมนเวลา (เหมือน TimetableModel.create_variables) และห้องที่ใช้ได้
+        """
+        time_slots = self.data.get("time_slots", [])
+        compiler = get_domain_compiler()
+        grid = compiler.grid(time_slots)
+        availability = self.data.get("teacher_availability", {})
+        preassigned = self.data.get("preassigned", {})
+        full_mask = (1 << len(time_slots)) - 1
+
+        acts = []
+        for c in self.data["courses"]:
+            enrollment = _to_int(c.get("ลง", 0))
+            teacher_list = list(dict.fromkeys(c.get("teacher_list", [])))
+            teacher_mask = full_mask
+            for t in teacher_list:
+                teacher_mask &= availability.get(t, full_mask)
+
+            # ห้องที่ความจุพอ เรียงจากเล็กไปใหญ่ (เปลืองที่นั่งน้อยสุดก่อน)
+            rooms = [
+                i
+                for i in sorted(range(len(capacity)), key=lambda i: capacity[i])
+                if not (capacity[i] and enrollment and capacity[i] < enrollment)
+            ]
+            subject_code = str(c.get("รหัสวิชา", "")).strip()
+            for comp in c.get("components", []):
+                duration = comp.get("duration_slots", 1)
+                starts = compiler.valid_starts(grid, duration)
+                # อาจารย์ไม่ว่างเลย -> ไม่มี start (ไม่จัดให้ ไม่วางทับช่วงไม่ว่าง)
+                if starts and teacher_mask != full_mask:
+                    starts = compiler.valid_starts(grid, duration, teacher_mask)
+                fixed = preassigned.get(comp.get("base_id", comp["id"]))
+                acts.append(
+                    {
+                        "id": comp["id"],
+                        "course": c["id"],
+                        "group": f"{subject_code}_{comp.get('type')}",
+                        "duration": duration,
+                        "enrollment": enrollment,
+                        "teachers": teacher_list,
+                        "starts": np.asarray(starts, dtype=np.int64),
+                        "rooms": [room_index[fixed]] if fixed in room_index else rooms,
+                    }
+                )
+        return acts
+
+    def _run_lengths(self, free, link):
+        """
+        ความยาวของช่วงคาบว่างต่อเนื่อง (วันเดียวกัน) ที่มีคาบ i อยู่ (คาบไม่ว่าง = 0)
+        """
+        cont = np.zeros(len(free), dtype=bool)
+        cont[1:] = free[:-1] & link[:-1]
+        run_id = np.cumsum(free & ~cont) - 1
+        lengths = np.zeros(len(free), dtype=np.int64)
+        if free.any():
+            counts = np.bincount(run_id[free])
+            lengths[free] = counts[run_id[free]]
+        return lengths
+
+    def _day_index(self, time_slots):
+        keys = {}
+        return np.array(
+            [keys.setdefault(day_key(s), len(keys)) for s in time_slots],
+            dtype=np.int64,
+        )
@@ -0,0 +1,305 @@
+import time
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import HORIZON
+from src.domains import horizon_slots
+from src.model import TimetableModel
+from src.solver import TimetableSolver
+
+# ค่าในคอลัมน์ "สัปดาห์" ที่รองรับ (นอกจากรายการสัปดาห์ เช่น "1-8,10")
+WEEK_ALIASES = {
+    "": "every",
+    "every": "every",
+    "all": "every",
+    "ทุกสัปดาห์": "every",
+    "odd": "odd",
+    "คี่": "odd",
+    "สัปดาห์คี่": "odd",
+    "even": "even",
+    "คู่": "even",
+    "สัปดาห์คู่": "even",
+}
+
+
+def parse_week_pattern(raw, num_weeks):
+    """
+    แปลงรูปแบบสัปดาห์ของวิชาเป็น tuple ของสัปดาห์ (1..num_weeks)
+    ทุกสัปดาห์ / คี่ / คู่ / รายการสัปดาห์ เช่น "1-8,10" (สัปดาห์สอบ = "17")
+    """
+    text = str(raw or "").strip().lower()
+    pattern = WEEK_ALIASES.get(text, text)
+    all_weeks = range(1, num_weeks + 1)
+    if pattern == "every":
+        return tuple(all_weeks)
+    if pattern == "odd":
+        return tuple(w for w in all_weeks if w % 2 == 1)
+    if pattern == "even":
+        return tuple(w for w in all_weeks if w % 2 == 0)
+
+    weeks = set()
+    for part in pattern.replace(";", ",").split(","):
+        lo, _, hi = part.strip().partition("-")
+        if lo.strip().isdigit() and (not hi or hi.strip().isdigit()):
+            weeks.update(range(int(lo), int(hi or lo) + 1))
+    if not weeks:
+        print(f"Warning: Unknown week pattern '{raw}' (using every week)")
+        return tuple(all_weeks)
+    return tuple(w for w in all_weeks if w in weeks)
+
+
+def week_windows(num_weeks, window_weeks):
+    window_weeks = max(1, int(window_weeks))
+    return [
+        list(range(start, min(start + window_weeks, num_weeks + 1)))
+        for start in range(1, num_weeks + 1, window_weeks)
+    ]
+
+
+def expand_window(data, weeks, num_weeks):
+    """
+    สร้างข้อมูลของ window (สัปดาห์ที่ติดกัน) จากข้อมูลสัปดาห์เดียวของ DataLoader
+    - time slots: template ต่อกันทีละสัปดาห์ (มี "week")
+    - กิจกรรม: 1 กิจกรรมต่อสัปดาห์ที่วิชามีเรียน id = {component}_W{week}
+      (เก็บ base_id / week ไว้ใช้ผูกสัปดาห์เข้าด้วยกัน)
+    - เวลาว่าง/ไม่สะดวกของอาจารย์: ซ้ำทุกสัปดาห์
+    """
+    template = data["time_slots"]
+    per_week = len(template)
+
+    courses = []
+    for c in data["courses"]:
+        active = set(parse_week_pattern(c.get("week_pattern"), num_weeks))
+        components = [
+            dict(comp, id=f"{comp['id']}_W{week}", base_id=comp["id"], week=week)
+            for week in weeks
+            if week in active
+            for comp in c.get("components", [])
+        ]
+        if components:
+            courses.append(dict(c, components=components))
+
+    availability = {
+        teacher: sum(mask << (k * per_week) for k in range(len(weeks)))
+        for teacher, mask in data.get("teacher_availability", {}).items()
+    }
+    preferences = {
+        teacher: {
+            k * per_week + i: cost
+            for k in range(len(weeks))
+            for i, cost in slot_costs.items()
+        }
+        for teacher, slot_costs in data.get("teacher_preferences", {}).items()
+    }
+    course_ids = {c["id"] for c in courses}
+    cohorts = {
+        cohort_id: [c_id for c_id in ids if c_id in course_ids]
+        for cohort_id, ids in data.get("cohorts", {}).items()
+    }
+    return dict(
+        data,
+        courses=courses,
+        time_slots=horizon_slots(template, weeks),
+        teacher_availability=availability,
+        teacher_preferences=preferences,
+        cohorts=cohorts,
+        time_config=dict(data.get("time_config", {}), weeks=list(weeks)),
+    )
+
+
+class RollingHorizonSolver:
+    """
+    Multi-week / multi-term planning แบบ rolling window
+    - แบ่ง horizon เป็น window ละ window_weeks สัปดาห์ แก้ทีละ window ตามลำดับ
+      (โมเดลมีเฉพาะคาบ/กิจกรรมของ window นั้น หน่วยความจำจึงไม่โตตามจำนวนสัปดาห์)
+    - window ที่แก้แล้วถูกตรึง ไม่ถูก optimize ใหม่
+    - กิจกรรมประจำสัปดาห์: ภายใน window ใช้เวลา/ห้องเดียวกันทุกสัปดาห์ (hard)
+      ข้าม window ใช้เวลา/ห้องเดิมจาก window ก่อน (carry = "soft" penalty / "fix" ตรึง)
+    รูปแบบสัปดาห์ของวิชามาจากคอลัมน์ "สัปดาห์" (ทุกสัปดาห์ / คี่ / คู่ / 1-8,10)
+    """
+
+    def __init__(self, data, config=None, options=None):
+        self.data = data
+        self.options = options
+        self.config = dict(HORIZON)
+        if config:
+            self.config.update(config)
+
+        self.solution = {}
+        # base_id -> {"offset": คาบในสัปดาห์, "room": ห้อง} ของ window ก่อนหน้า
+        self.placed = {}
+        self.windows = []
+
+    def solve(self):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        num_weeks = int(self.config["weeks"])
+        per_week = len(self.data["time_slots"])
+        windows = week_windows(num_weeks, self.config["window_weeks"])
+        print(f"--- Rolling horizon: {num_weeks} weeks in {len(windows)} windows ---")
+
+        status = cp_model.UNKNOWN
+        solver = None
+        for weeks in windows:
+            window_data = expand_window(self.data, weeks, num_weeks)
+            num_acts = sum(len(c["components"]) for c in window_data["courses"])
+            print(
+                f"--- Window weeks {weeks[0]}-{weeks[-1]}: "
+                f"{len(window_data['courses'])} courses, {num_acts} activities ---"
+            )
+            if not num_acts:
+                self.windows.append(self._record(weeks, 0, 0, "EMPTY", None, 0.0))
+                continue
+
+            # window ที่มีกิจกรรมยกมาจาก window ก่อน: ไม่ตัด symmetry
+            # (ห้อง/เวลาที่ตรึงไว้ทำให้ห้องหรือกลุ่มเรียนที่เหมือนกันสลับกันไม่ได้แล้ว
+            # ordering cut จะขัดกับค่าที่ตรึงจน INFEASIBLE)
+            options = dict(self.options or {})
+            if self.placed:
+                options["symmetry_breaking"] = False
+            timetable_model = TimetableModel(window_data, options=options)
+            model, all_vars = timetable_model.build_model()
+            carried = self._link_weeks(timetable_model, window_data, per_week)
+
+            solver = TimetableSolver(
+                model,
+                all_vars,
+                window_data,
+                params={"max_time_in_seconds": float(self.config["window_time"])},
+            )
+            status = solver.run()
+            solver.analyze_status(status)
+            objective = None
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                objective = solver.solver.ObjectiveValue()
+            self.windows.append(
+                self._record(
+                    weeks,
+                    num_acts,
+                    carried,
+                    solver.solver.StatusName(status),
+                    objective,
+                    solver.solver.WallTime(),
+                )
+            )
+            if objective is None:
+                if status == cp_model.INFEASIBLE:
+                    solver.report_infeasibility()
+                print(f"Window weeks {weeks[0]}-{weeks[-1]} has no solution -> stop")
+                break
+
+            # ตรึงผลของ window นี้ (index ของคาบเทียบกับต้น horizon)
+            offset = (weeks[0] - 1) * per_week
+            for act_id, sol in solver.extract_solution().items():
+                self.solution[act_id] = {
+                    "start": sol["start"] + offset,
+                    "room": sol["room"],
+                }
+            for c in window_data["courses"]:
+                for comp in c["components"]:
+                    sol = self.solution[comp["id"]]
+                    self.placed.setdefault(
+                        comp["base_id"],
+                        {"offset": sol["start"] % per_week, "room": sol["room"]},
+                    )
+
+        lines = [
+            "## Rolling Horizon Windows",
+            "| weeks | activities | carried | status | objective | wall time (s) |",
+            "|---|---|---|---|---|---|",
+        ]
+        for w in self.windows:
+            lines.append(
+                f"| {w['weeks']} | {w['activities']} | {w['carried']} | {w['status']} "
+                f"| {w['objective']} | {w['wall_time']} |"
+            )
+
+        if self.solution:
+            horizon_data = expand_window(self.data, range(1, num_weeks + 1), num_weeks)
+            exporter = TimetableSolver(None, {}, horizon_data)
+            exporter.export_solution(self.solution)
+            if solver is not None:
+                solver.last_output_path = exporter.last_output_path
+        else:
+            print("Rolling horizon found no timetable.")
+
+        if solver is not None:
+            solver._write_run_log(
+                status, start_dt, datetime.now(), time.time() - start_ts, lines
+            )
+        return self.solution
+
+    def _link_weeks(self, timetable_model, window_data, per_week):
+        """
+        - กิจกรรมต้องอยู่ในสัปดาห์ของตัวเอง
+        - กิจกรรมเดียวกันคนละสัปดาห์ใน window: คาบในสัปดาห์และห้องเหมือนกัน
+        - กิจกรรมที่เคยจัดใน window ก่อน: ใช้คาบ/ห้องเดิม (soft หรือ fix)
+        คืนค่าจำนวนกิจกรรมที่ยกมาจาก window ก่อนหน้า
+        """
+        model = timetable_model.model
+        names = timetable_model.names
+        first_week = window_data["time_config"]["weeks"][0]
+
+        occurrences = {}
+        for c in window_data["courses"]:
+            activities = timetable_model.all_vars[c["id"]]["activities"]
+            for comp in c["components"]:
+                act = activities[comp["id"]]
+                k = comp["week"] - first_week
+                model.Add(act["start"] >= k * per_week)
+                model.Add(act["start"] <= (k + 1) * per_week - 1)
+                occurrences.setdefault(comp["base_id"], []).append((k, comp["id"], act))
+
+        keep_terms = []
+        hints = {}
+        carry = self.config.get("carry", "soft")
+        for base_id, occ in occurrences.items():
+            k0, act_id0, act0 = occ[0]
+            for k, _, act in occ[1:]:
+                model.Add(act["start"] == act0["start"] + (k - k0) * per_week)
+                for r_id, room_vars in act["rooms"].items():
+                    if r_id in act0["rooms"]:
+                        model.Add(
+                            room_vars["is_present"] == act0["rooms"][r_id]["is_present"]
+                        )
+
+            placed = self.placed.get(base_id)
+            if not placed:
+                continue
+            target = k0 * per_week + placed["offset"]
+            room = timetable_model.pool_of_room.get(placed["room"], placed["room"])
+            conditions = [act0["start"] == target]
+            if room in act0["rooms"]:
+                conditions.append(act0["rooms"][room]["is_present"] == 1)
+            if carry == "fix":
+                for condition in conditions:
+                    model.Add(condition)
+            else:
+                keep = names.bool_var("keep_{}", act_id0)
+                for condition in conditions:
+                    model.Add(condition).OnlyEnforceIf(keep)
+                keep_terms.append(1 - keep)
+            for k, act_id, _ in occ:
+                hints[act_id] = {
+                    "start": target + (k - k0) * per_week,
+                    "room": placed["room"],
+                }
+
+        if keep_terms:
+            constraints = timetable_model.constraints
+            constraints.objective_terms["week_consistency"] = sum(keep_terms)
+            model.Minimize(constraints.weighted_objective(constraints.objective_terms))
+        if hints:
+            timetable_model.add_hints(hints)
+        return len(hints)
+
+    def _record(self, weeks, activities, carried, status, objective, wall_time):
+        return {
+            "weeks": f"{weeks[0]}-{weeks[-1]}",
+            "activities": activities,
+            "carried": carried,
+            "status": status,
+            "objective": objective,
+            "wall_time": round(wall_time, 2),
+        }
@@ -1,23 +1,47 @@
-import sys
+import gc
 import os
-
-# เพิ่ม path เพื่อให้ import modules ได้สะดวก
-sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
-
-from src.data_loader import DataLoader
-from src.model import TimetableModel
-from src.solver import TimetableSolver
+import sys
+import argparse
 from datetime import datetime
 
+from src.config import REPRODUCIBLE, SCENARIOS
+
 """
     Main execution flow:
     1. Load Data
     2. Build Model
     3. Solve & Export
+    หมายเหตุ: pandas / ortools ถูก import ภายในแต่ละขั้น เพื่อให้คำสั่งสั้นๆ (เช่น --help) เริ่มเร็ว
     """
 
 
-def main_program():
+def default_data_dir():
+    # โฟลเดอร์ data ข้าง package (editable install / รันจาก repo) ถ้าไม่มีใช้ ./data
+    package_data = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "data"
+    )
+    if os.path.isdir(package_data):
+        return package_data
+    return os.path.join(os.getcwd(), "data")
+
+
+def main_program(
+    mode="single",
+    scenario_file=None,
+    data_dir=None,
+    time_grid=None,
+    horizon=None,
+    reproducible=None,
+    exclude_codes=None,
+):
+    """
+    reproducible: ค่าแบบ config.REPRODUCIBLE (None = ปิด) ใช้ได้กับโหมด single
+    exclude_codes: รหัสวิชาที่ตัดออก (None = ถามทาง terminal)
+    คืนค่า path ของตารางที่ export (โหมด single) หรือ None
+    """
+    from src.data_loader import DataLoader
+    from src.memory import MemoryTracker
+
     # === Display Start Time Program ===
     start_time = datetime.now()
     print("\n================ PROGRAM STARTED ================")
@@ -25,23 +49,133 @@ def main_program():
     print("=================================================\n")
 
     # Setup paths & Load Data
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-    data = DataLoader(data_dir).load_data()
+    data_dir = data_dir or default_data_dir()
+    # โหมด scenarios รันแบบ batch จึงไม่ถามตัดรายวิชาทาง terminal
+    loader = DataLoader(
+        data_dir,
+        interactive=(mode != "scenarios"),
+        time_grid=time_grid,
+        exclude_codes=exclude_codes,
+    )
+    data = loader.load_data()
+    # DataFrame ถูกทิ้งใน load_data แล้ว เก็บกวาด reference วนของ pandas ก่อนวัด
+    gc.collect()
+    memory = MemoryTracker()
+    memory.record("load")
 
     # Check Data Loaded
     if not data["courses"] and not data["rooms"]:
         print("Error: No data loaded. Exiting.")
-        return
+        return None
+
+    if reproducible and mode != "single":
+        # โหมดอื่นแบ่งเวลาตามนาฬิกา/รันหลาย process จึงรับประกันผลเดิมไม่ได้
+        print(f"[Reproducible] not supported for --mode {mode}; running normally.")
+        reproducible = None
+
+    # ลดขนาดข้อมูลก่อนสร้างโมเดล (ดู presolve.py / config.PRESOLVE)
+    # โหมด scenarios ทำต่อ scenario หลังใส่ delta แล้ว
+    if mode != "scenarios":
+        from src.presolve import reduce_data
+
+        data = reduce_data(data)
+        memory.record("presolve")
+    # RSS ต่อขั้นถูกเขียนลง run log (TimetableSolver._write_run_log)
+    data["memory"] = memory
 
-    # Initialize Model
-    timetable_model = TimetableModel(data)
+    result_path = None
+    if mode == "portfolio":
+        from src.portfolio import PortfolioSolver
 
-    # Build Model
-    model, all_vars = timetable_model.build_model()
+        # รันหลาย solve แบบขนาน (ดู config.PORTFOLIO)
+        PortfolioSolver(data).solve()
+    elif mode == "staged":
+        from src.model import TimetableModel
+        from src.staged import StagedSolver
 
-    # Solve & Output
-    solver = TimetableSolver(model, all_vars, data)
-    solver.solve()
+        # หา feasible ก่อน แล้ว optimize ทีละ tier (ดู config.STAGED)
+        timetable_model = TimetableModel(data)
+        timetable_model.build_model()
+        StagedSolver(timetable_model, data).solve()
+    elif mode == "scenarios":
+        from src.scenarios import ScenarioRunner
+
+        # what-if หลาย scenario จากไฟล์ JSON (ดู scenarios.py / config.SCENARIOS)
+        runner = ScenarioRunner(loader, data)
+        scenarios = runner.load_file(
+            scenario_file or os.path.join(data_dir, SCENARIOS["file"])
+        )
+        runner.run(scenarios)
+    elif mode == "two_phase":
+        from src.decomposition import TwoPhaseSolver
+
+        # เลือกเวลาก่อน แล้วเลือกห้องรายวันแบบขนาน (ดู config.DECOMPOSITION)
+        TwoPhaseSolver(data).solve()
+    elif mode == "coarse_to_fine":
+        from src.coarse_to_fine import CoarseToFineSolver
+
+        # solve บนคาบหยาบก่อน แล้ว refine บนคาบละเอียด (ดู config.COARSE_TO_FINE)
+        CoarseToFineSolver(data).solve()
+    elif mode == "horizon":
+        from src.horizon import RollingHorizonSolver
+
+        # หลายสัปดาห์ แก้ทีละ window (ดู config.HORIZON)
+        RollingHorizonSolver(data, config=horizon).solve()
+    else:
+        from src.config import HEURISTIC
+        from src.heuristic import GreedyScheduler
+        from src.model import TimetableModel
+        from src.solver import TimetableSolver
+
+        # Initialize Model
+        timetable_model = TimetableModel(data)
+
+        # Build Model
+        model, all_vars = timetable_model.build_model()
+        memory.record("build")
+
+        # Greedy: hint ให้ solver และเป็นคำตอบสำรองถ้าหมดเวลา (ดู config.HEURISTIC)
+        fallback = None
+        if HEURISTIC["hint"] or HEURISTIC["fallback"]:
+            greedy = GreedyScheduler(data)
+            # โหมด reproducible ไม่จำกัดเวลา (จำนวนรอบที่ได้ต้องไม่ขึ้นกับความเร็วเครื่อง)
+            greedy.run(
+                passes=HEURISTIC["passes"],
+                time_limit=None if reproducible else HEURISTIC["time_limit"],
+                patience=HEURISTIC["patience"],
+            )
+            if HEURISTIC["hint"]:
+                timetable_model.add_hints(greedy.solution)
+            if HEURISTIC["fallback"] and greedy.is_complete():
+                fallback = greedy.solution
+            memory.record("heuristic")
+
+        params = None
+        if reproducible:
+            from src.fingerprint import run_fingerprints
+
+            # ทุกอย่างที่ต้องใช้ replay run นี้ (ดู replay.py) บันทึกลง run log / telemetry
+            params = dict(reproducible["params"])
+            data["reproducibility"] = {
+                "data_dir": os.path.abspath(data_dir),
+                "time_grid": data["time_config"],
+                "exclude_codes": loader.exclude_codes,
+                "params": params,
+                "polish_iterations": reproducible["polish_iterations"],
+                # fingerprint หลังใส่ hint (hint เป็นส่วนหนึ่งของ input ของ solver)
+                "fingerprints": run_fingerprints(data_dir, model),
+            }
+
+        # Solve & Output
+        solver = TimetableSolver(
+            model,
+            all_vars,
+            data,
+            params=params,
+            objective_terms=timetable_model.constraints.objective_terms,
+        )
+        solver.solve(fallback=fallback, options=timetable_model.options)
+        result_path = solver.last_output_path
 
     # === Display End Time Program ===
     end_time = datetime.now()
@@ -49,7 +183,83 @@ def main_program():
     print("Program Finished at:", end_time.strftime("%Y-%m-%d %H:%M:%S"))
     print("Total Elapsed:", (end_time - start_time))
     print("====================================================\n")
+    return result_path
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Classroom timetable scheduler")
+    parser.add_argument(
+        "--mode",
+        choices=[
+            "single",
+            "portfolio",
+            "staged",
+            "two_phase",
+            "coarse_to_fine",
+            "horizon",
+            "scenarios",
+        ],
+        default="single",
+        help=(
+            "single = solve ครั้งเดียว, portfolio = หลาย solve แบบขนาน, "
+            "staged = optimize ทีละ tier, two_phase = เลือกเวลาก่อนแล้วค่อยเลือกห้อง, "
+            "coarse_to_fine = solve คาบหยาบก่อนแล้ว refine, "
+            "horizon = หลายสัปดาห์แบบ rolling window, "
+            "scenarios = รัน what-if หลาย scenario"
+        ),
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=None,
+        help="ไฟล์ scenario (JSON) สำหรับ --mode scenarios (ค่าเริ่มต้น data/scenarios.json)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="โฟลเดอร์ข้อมูล CSV (ค่าเริ่มต้น data ข้าง package หรือ ./data)",
+    )
+    parser.add_argument(
+        "--slot-minutes",
+        type=int,
+        default=None,
+        help="ความยาวคาบ (นาที) แทนค่าใน config.TIME_GRID",
+    )
+    parser.add_argument(
+        "--weeks",
+        type=int,
+        default=None,
+        help="จำนวนสัปดาห์ของ horizon สำหรับ --mode horizon (แทนค่าใน config.HORIZON)",
+    )
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help=(
+            "ผลลัพธ์คงที่ทุกครั้ง (seed / deterministic time ตาม config.REPRODUCIBLE) "
+            "และบันทึก fingerprint ของข้อมูล/config/โมเดลลง run log (โหมด single)"
+        ),
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        metavar="RUN",
+        help="solve run ที่บันทึกไว้ซ้ำ (เช่น V.12 หรือ path ของ run) แล้วเทียบกับผลเดิม",
+    )
+    args = parser.parse_args(argv)
+    if args.replay:
+        from src.replay import replay
+
+        sys.exit(replay(args.replay, data_dir=args.data_dir))
+    time_grid = {"slot_minutes": args.slot_minutes} if args.slot_minutes else None
+    horizon = {"weeks": args.weeks} if args.weeks else None
+    main_program(
+        mode=args.mode,
+        scenario_file=args.scenarios,
+        data_dir=args.data_dir,
+        time_grid=time_grid,
+        horizon=horizon,
+        reproducible=dict(REPRODUCIBLE) if args.reproducible else None,
+    )
 
 
 if __name__ == "__main__":
-    main_program()
+    cli()
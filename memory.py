@@ -0,0 +1,55 @@
+import os
+import sys
+
+
+def peak_rss_mb():
+    """
+    peak RSS ของ process นี้ (MB) หรือ None ถ้าวัดไม่ได้ (เช่น Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB, macOS เป็น byte
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def current_rss_mb():
+    """
+    RSS ปัจจุบัน (MB) จาก /proc (Linux) หรือ None
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryTracker:
+    """
+    บันทึก RSS / peak RSS หลังแต่ละขั้น (load, presolve, build, solve, ...)
+    เก็บไว้ใน data["memory"] แล้ว TimetableSolver เขียนลง run log
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def record(self, stage):
+        row = {"stage": stage, "rss_mb": current_rss_mb(), "peak_rss_mb": peak_rss_mb()}
+        self.stages.append(row)
+        print(f"[Memory] {stage}: rss {row['rss_mb']} MB, peak {row['peak_rss_mb']} MB")
+        return row
+
+    def lines(self):
+        lines = [
+            "## Memory (RSS per stage)",
+            "| stage | rss (MB) | peak rss (MB) |",
+            "|---|---|---|",
+        ]
+        for row in self.stages:
+            lines.append(f"| {row['stage']} | {row['rss_mb']} | {row['peak_rss_mb']} |")
+        return lines
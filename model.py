@@ -1,56 +1,83 @@
 from ortools.sat.python import cp_model
+from src.config import MODEL_OPTIONS
 from src.constraints import Constraints
+from src.symmetry import SymmetryBreaker
+from src.room_pools import build_room_pools
+from src.domains import get_domain_compiler
+from src.naming import VarNames
 
 
 class TimetableModel:
-    def __init__(self, data):
+    def __init__(self, data, options=None):
         self.data = data
         self.model = cp_model.CpModel()
 
+        # ตัวเลือกการสร้างโมเดล (ดูค่าเริ่มต้นที่ config.MODEL_OPTIONS)
+        self.options = dict(MODEL_OPTIONS)
+        if options:
+            self.options.update(options)
+
         # all_vars จะเปลี่ยนโครงสร้างเป็น Dictionary ที่ซับซ้อนขึ้นแต่มีประสิทธิภาพสูง
         self.all_vars = {}
+        # Constraints Manager (เก็บ objective_terms ไว้ใช้ต่อหลัง build)
+        self.constraints = None
+        # สรุปผลการตัด symmetry (ถ้าเปิดใช้)
+        self.symmetry_report = {}
+        self.symmetry = None
+        # ชื่อตัวแปร (debug_names=False จะไม่ใส่ชื่อลง proto เก็บไว้ใน side index แทน)
+        self.names = VarNames(self.model, debug=self.options.get("debug_names", True))
+
+        # โหมด pool: รวมห้องที่เหมือนกันเป็น room class แล้วใช้ห้องเสมือนแทนห้องจริง
+        # ห้องจริงจะถูกเลือกทีหลังใน TimetableSolver.extract_solution
+        self.model_data = self.data
+        self.pool_of_room = {}
+        if self.options.get("room_mode") == "pool":
+            pool_rooms, members = build_room_pools(self.data["rooms"])
+            self.model_data = dict(self.data, rooms=pool_rooms)
+            self.data["room_pools"] = members
+            for pool_id, room_ids in members.items():
+                for r_id in room_ids:
+                    self.pool_of_room[r_id] = pool_id
+            print(
+                f"Room pools: {len(self.data['rooms'])} rooms -> "
+                f"{len(pool_rooms)} room classes"
+            )
 
     def create_variables(self):
         print("Creating Variables (Interval-based)...")
 
         courses = self.data["courses"]
-        rooms = self.data["rooms"]
+        rooms = self.model_data["rooms"]
         time_slots = self.data.get("time_slots", [])
 
         # จำนวนคาบทั้งหมด (Time Slots)
         # ถ้าไม่มีข้อมูล ให้ใช้ fallback เพื่อไม่ให้ crash
         horizon = len(time_slots) if time_slots else 50
         slot_minutes = self.data.get("time_config", {}).get("slot_minutes", 30)
+        sparse_rooms = self.options.get("room_mode") == "sparse"
+        names = self.names
 
-        # Precompute valid start slots for each duration
-        valid_starts_cache = {}
-        if time_slots:
-            for c in courses:
-                for comp in c.get("components", []):
-                    duration = comp.get("duration_slots", 1)
-                    if duration in valid_starts_cache:
-                        continue
-                    valid_starts = []
-                    for i in range(0, len(time_slots) - duration + 1):
-                        ok = True
-                        base_day = time_slots[i]["day"]
-                        for k in range(duration - 1):
-                            a = time_slots[i + k]
-                            b = time_slots[i + k + 1]
-                            # ต้องต่อเนื่องกันจริงและอยู่วันเดียวกัน
-                            if a["day"] != base_day or b["day"] != base_day:
-                                ok = False
-                                break
-                            if b["start_min"] != a["end_min"]:
-                                ok = False
-                                break
-                        if ok:
-                            valid_starts.append(i)
-                    valid_starts_cache[duration] = valid_starts
+        # โดเมนของ start ต่อ (duration, calendar mask) คำนวณผ่าน DomainCompiler
+        # (memoize ไว้ทั้ง process จึงไม่ต้องสแกน time_slots ใหม่ทุกครั้งที่สร้างโมเดล)
+        compiler = get_domain_compiler()
+        grid = compiler.grid(time_slots) if time_slots else None
+
+        # เวลาว่างของอาจารย์ (bitmask ต่อคาบ) -> ตัดโดเมนของ start ตรงๆ ไม่ต้องเพิ่ม constraint
+        availability = self.data.get("teacher_availability", {})
+        full_mask = (1 << len(time_slots)) - 1
+        # กิจกรรมที่มีห้องใช้ได้ห้องเดียว (presolve.py) สร้างตัวแปรห้องเดียว
+        preassigned = self.data.get("preassigned", {})
+        unavailable_acts = []
 
         for c in courses:
             c_id = c["id"]
             components = c.get("components", [])
+            enrollment = self._to_int(c.get("ลง", 0))
+
+            # รวมเวลาว่างของอาจารย์ทุกคนในวิชา (AND ของ bitmask)
+            teacher_mask = full_mask
+            for teacher in c.get("teacher_list", []):
+                teacher_mask &= availability.get(teacher, full_mask)
 
             self.all_vars[c_id] = {
                 "course_id": c_id,
@@ -62,27 +89,42 @@ class TimetableModel:
                 duration = comp.get("duration_slots", 1)
 
                 # 1. สร้างตัวแปร Start Time (เริ่มสอนคาบไหน)
-                # โดเมนคือ [0, horizon - duration] เพื่อไม่ให้สอนเลยเวลาจบวัน
-                if time_slots and duration in valid_starts_cache:
-                    valid = valid_starts_cache.get(duration, [])
-                    if valid:
-                        start_var = self.model.NewIntVarFromDomain(
-                            cp_model.Domain.FromValues(valid),
-                            f"start_{act_id}",
-                        )
-                    else:
-                        start_var = self.model.NewIntVar(
-                            0, horizon - duration, f"start_{act_id}"
-                        )
-                else:
-                    start_var = self.model.NewIntVar(
-                        0, horizon - duration, f"start_{act_id}"
+                # โดเมนคือคาบที่ต่อเนื่องครบ duration ในวันเดียวกัน (และอาจารย์ว่าง)
+                valid = ()
+                # อาจารย์ไม่ว่างพอสำหรับกิจกรรมนี้เลย: โดเมนไม่ถูกตัด แต่ Constraints ใส่ constraint
+                # ที่ทำให้ INFEASIBLE พร้อม assumption (ให้ขึ้นใน unsat core แทนการข้ามเงียบๆ)
+                unavailable = False
+                if grid is not None:
+                    valid = compiler.valid_starts(grid, duration)
+                    if valid and teacher_mask != full_mask:
+                        available = compiler.valid_starts(grid, duration, teacher_mask)
+                        if available:
+                            valid = available
+                        else:
+                            unavailable = True
+                            unavailable_acts.append(
+                                {
+                                    "activity": act_id,
+                                    "teachers": list(c.get("teacher_list", [])),
+                                }
+                            )
+                            print(
+                                f"Warning: No available slot for {act_id} "
+                                "(teacher availability cannot be met)"
+                            )
+                if valid:
+                    start_var = names.domain_var(
+                        cp_model.Domain.FromValues(valid), "start_{}", act_id
                     )
-                end_var = self.model.NewIntVar(0, horizon, f"end_{act_id}")
+                else:
+                    # ถ้าไม่มีข้อมูล ให้ใช้ fallback เพื่อไม่ให้ crash
+                    valid = range(0, horizon - duration + 1)
+                    start_var = names.int_var(0, horizon - duration, "start_{}", act_id)
+                end_var = names.int_var(0, horizon, "end_{}", act_id)
 
                 # สร้าง Interval หลักของกิจกรรมนี้ (ใช้เช็คเวลาครูชนกัน)
-                main_interval = self.model.NewIntervalVar(
-                    start_var, duration, end_var, f"interval_{act_id}"
+                main_interval = names.interval(
+                    start_var, duration, end_var, "interval_{}", act_id
                 )
 
                 self.all_vars[c_id]["activities"][act_id] = {
@@ -90,25 +132,42 @@ class TimetableModel:
                     "end": end_var,
                     "interval": main_interval,
                     "duration": duration,
+                    "valid_starts": valid,  # โดเมนของ start (ใช้ต่อใน soft constraint)
                     "type": comp.get("type"),
+                    "teacher_unavailable": unavailable,
                     "rooms": {},  # เก็บข้อมูลแยกตามห้อง
                 }
 
                 # 2. สร้างตัวแปรเลือกห้อง (Optional Intervals)
+                # โหมด "none": เลือกเวลาอย่างเดียว ห้องเลือกทีหลัง (ดู decomposition.py)
+                if self.options.get("room_mode") == "none":
+                    continue
+                fixed_room = preassigned.get(comp.get("base_id", act_id))
+                fixed_room = self.pool_of_room.get(fixed_room, fixed_room)
                 for r in rooms:
                     r_id = r["id"]
+                    if fixed_room and r_id != fixed_room:
+                        continue
+
+                    # โหมด sparse: ข้ามห้องที่ความจุไม่พอ (hard constraint ห้ามอยู่แล้ว)
+                    if sparse_rooms:
+                        capacity = self._to_int(r.get("จำนวนที่นั่ง", 0))
+                        if capacity and enrollment and capacity < enrollment:
+                            continue
 
                     # ตัวแปร Boolean: กิจกรรมนี้สอนที่ห้องนี้หรือไม่? (1=ใช่, 0=ไม่)
-                    is_in_room = self.model.NewBoolVar(f"pres_{act_id}_{r_id}")
+                    is_in_room = names.bool_var("pres_{}_{}", act_id, r_id)
 
                     # ตัวแปร Optional Interval: ช่วงเวลาที่จะเกิดขึ้นจริง ก็ต่อเมื่อ is_in_room = 1
                     # ใช้สำหรับตรวจสอบห้องซ้อนทับกัน (Room Conflict)
-                    opt_interval = self.model.NewOptionalIntervalVar(
+                    opt_interval = names.optional_interval(
                         start_var,
                         duration,
                         end_var,
                         is_in_room,
-                        f"opt_interval_{act_id}_{r_id}",
+                        "opt_interval_{}_{}",
+                        act_id,
+                        r_id,
                     )
 
                     self.all_vars[c_id]["activities"][act_id]["rooms"][r_id] = {
@@ -116,14 +175,83 @@ class TimetableModel:
                         "opt_interval": opt_interval,
                     }
 
-        print(f"Created variables for {len(courses)} courses.")
+        # รายงานใน run log (solver.py)
+        self.data["teacher_unavailable"] = unavailable_acts
+
+        stats = compiler.stats()
+        print(
+            f"Created variables for {len(courses)} courses. "
+            f"(domain cache: {stats['hits']} hits, {stats['misses']} misses)"
+        )
 
     def build_model(self):
         self.create_variables()
 
         # ส่งต่อให้ Constraints Manager
-        constraints_manager = Constraints(self.model, self.all_vars, self.data)
+        constraints_manager = Constraints(
+            self.model,
+            self.all_vars,
+            self.model_data,
+            options=self.options,
+            names=self.names,
+        )
         constraints_manager.add_hard_constraints()
         constraints_manager.add_soft_constraints()
+        self.constraints = constraints_manager
+        self.data["assumption_details"] = constraints_manager.assumption_details
+        self.data["var_names"] = self.names
+
+        # ตัด symmetry ของห้อง/กลุ่มเรียนที่สลับกันได้
+        # (โหมด pool รวมห้องที่เหมือนกันไปแล้ว จึงเหลือแค่ symmetry ของกลุ่มเรียน)
+        if self.options.get("symmetry_breaking"):
+            breaker = SymmetryBreaker(
+                self.model,
+                self.all_vars,
+                self.model_data,
+                assumption=constraints_manager._assumption,
+            )
+            self.symmetry_report = breaker.apply()
+            self.symmetry = breaker
 
         return self.model, self.all_vars
+
+    def add_hints(self, solution):
+        """
+        ใส่คำตอบเดิม (เช่นจากรอบก่อนหน้า) เป็น hint ให้ solver
+        solution: {act_id: {"start": slot, "room": room_id}}
+        ถ้าตัด symmetry ไว้ จะสลับคำตอบให้ตรงกับลำดับของ cut ก่อน (ไม่งั้น hint ขัดกับ cut)
+        """
+        # โหมด pool: แปลงห้องจริงเป็น room class ของห้องนั้น
+        solution = {
+            act_id: dict(
+                sol, room=self.pool_of_room.get(sol.get("room"), sol.get("room"))
+            )
+            for act_id, sol in solution.items()
+            if sol
+        }
+        if self.symmetry is not None:
+            solution = self.symmetry.canonical_hint(solution)
+
+        hinted = 0
+        for c_vars in self.all_vars.values():
+            for act_id, act in c_vars["activities"].items():
+                sol = solution.get(act_id)
+                if not sol:
+                    continue
+                self.model.AddHint(act["start"], sol["start"])
+                room = sol["room"]
+                for r_id, room_vars in act["rooms"].items():
+                    self.model.AddHint(
+                        room_vars["is_present"], 1 if r_id == room else 0
+                    )
+                hinted += 1
+        print(f"Added hints for {hinted} activities.")
+
+    def _to_int(self, value):
+        if value is None:
+            return 0
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            digits = "".join([c for c in str(value) if c.isdigit()])
+            return int(digits) if digits else 0
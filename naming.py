@@ -0,0 +1,76 @@
+class VarNames:
+    """
+    ตั้งชื่อตัวแปร/interval แบบ lazy
+    - debug=True: ตั้งชื่อตาม template ทันที (เหมือนเดิม อ่าน proto/log ได้ง่าย)
+    - debug=False: ไม่ใส่ชื่อลง proto เก็บแค่ (template, parts) ไว้ใน side index
+      แล้วค่อยสร้างชื่อเมื่อจำเป็น (เช่น รายงาน unsat core)
+    template ใช้รูปแบบ str.format เช่น "pres_{}_{}"
+    """
+
+    def __init__(self, model, debug=True):
+        self.model = model
+        self.debug = debug
+        # index ใน proto -> (template, parts)
+        self.var_parts = {}
+        self.interval_parts = {}
+
+    def int_var(self, lb, ub, template, *parts):
+        var = self.model.NewIntVar(lb, ub, self._label(template, parts))
+        return self._remember_var(var, template, parts)
+
+    def domain_var(self, domain, template, *parts):
+        var = self.model.NewIntVarFromDomain(domain, self._label(template, parts))
+        return self._remember_var(var, template, parts)
+
+    def bool_var(self, template, *parts):
+        var = self.model.NewBoolVar(self._label(template, parts))
+        return self._remember_var(var, template, parts)
+
+    def interval(self, start, size, end, template, *parts):
+        interval = self.model.NewIntervalVar(
+            start, size, end, self._label(template, parts)
+        )
+        return self._remember_interval(interval, template, parts)
+
+    def optional_interval(self, start, size, end, presence, template, *parts):
+        interval = self.model.NewOptionalIntervalVar(
+            start, size, end, presence, self._label(template, parts)
+        )
+        return self._remember_interval(interval, template, parts)
+
+    def name_of(self, var):
+        """
+        ชื่อของตัวแปร (สร้างจาก side index ถ้าตอน build ไม่ได้ใส่ชื่อไว้)
+        """
+        return var.Name() or self.name_of_index(var.Index())
+
+    def name_of_index(self, index):
+        """
+        ชื่อของตัวแปรจาก index ใน proto (เช่นผลจาก SufficientAssumptionsForInfeasibility)
+        """
+        if index in self.var_parts:
+            template, parts = self.var_parts[index]
+            return template.format(*parts)
+        name = self.model.Proto().variables[index].name
+        return name or f"var_{index}"
+
+    def interval_name(self, interval):
+        if interval.Name():
+            return interval.Name()
+        template, parts = self.interval_parts.get(
+            interval.Index(), ("interval_{}", (interval.Index(),))
+        )
+        return template.format(*parts)
+
+    def _label(self, template, parts):
+        return template.format(*parts) if self.debug else ""
+
+    def _remember_var(self, var, template, parts):
+        if not self.debug:
+            self.var_parts[var.Index()] = (template, parts)
+        return var
+
+    def _remember_interval(self, interval, template, parts):
+        if not self.debug:
+            self.interval_parts[interval.Index()] = (template, parts)
+        return interval
@@ -0,0 +1,387 @@
+from src.config import OBJECTIVE_WEIGHTS
+from src.domains import day_key
+
+# กลุ่ม penalty ที่คำนวณจากคำตอบได้ (ตรงกับ Constraints.add_soft_constraints)
+FAMILIES = (
+    "over_capacity",
+    "capacity_waste",
+    "room_balance",
+    "day_balance",
+    "day_compact",
+    "same_room",
+    "teacher_preference",
+)
+
+
+def flatten_terms(objective_terms):
+    """
+    แปลง {family: linear expression} (Constraints.objective_terms) เป็น
+    {family: (index ของตัวแปร, สัมประสิทธิ์, ค่าคงที่)} ทำครั้งเดียวหลัง build
+    คืนค่า None ถ้า ortools ไม่มี FlatIntExpr (ก่อน 9.12) ให้ผู้เรียกใช้ solver.Value แทน
+    """
+    import numpy as np
+
+    try:
+        from ortools.sat.python.cp_model_helper import FlatIntExpr
+    except ImportError:
+        return None
+
+    flat = {}
+    for family, expr in objective_terms.items():
+        if isinstance(expr, int):
+            flat[family] = (
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.int64),
+                expr,
+            )
+            continue
+        expr = FlatIntExpr(expr)
+        flat[family] = (
+            np.array([v.index for v in expr.vars], dtype=np.int64),
+            np.array(expr.coeffs, dtype=np.int64),
+            expr.offset,
+        )
+    return flat
+
+
+def term_values(flat_terms, solution_values):
+    """
+    ค่าของแต่ละ family จาก solution vector (CpSolverResponse.solution เรียงตาม index)
+    โดยไม่ต้องเรียก solver.Value ทีละตัวแปร
+    """
+    import numpy as np
+
+    values = np.asarray(solution_values, dtype=np.int64)
+    return {
+        family: int(values[indices] @ coeffs) + offset
+        for family, (indices, coeffs, offset) in flat_terms.items()
+    }
+
+
+def weighted_breakdown(values):
+    """
+    {family: ค่า} -> {family: {"value", "weight", "weighted"}} ตามน้ำหนักใน OBJECTIVE_WEIGHTS
+    """
+    breakdown = {}
+    for family, value in values.items():
+        weight = OBJECTIVE_WEIGHTS.get(family, 1)
+        breakdown[family] = {
+            "value": value,
+            "weight": weight,
+            "weighted": weight * value,
+        }
+    return breakdown
+
+
+def breakdown_lines(breakdown, title="## Objective Breakdown"):
+    """
+    ตาราง markdown สำหรับ run log
+    """
+    lines = [title, "| family | value | weight | weighted |", "|---|---|---|---|"]
+    for family, row in breakdown.items():
+        lines.append(
+            f"| {family} | {row['value']} | {row['weight']} | {row['weighted']} |"
+        )
+    total = sum(row["weighted"] for row in breakdown.values())
+    lines.append(f"| total | | | {total} |")
+    return lines
+
+
+def breakdown_from_schedule(rows, data, options=None):
+    """
+    คำนวณ breakdown จากผลลัพธ์ที่เป็น CSV อย่างเดียว (validator / scenario ที่ไม่มี solver)
+    rows: iterable ของ dict ที่มี Activity_ID, Start_Slot, Room_ID (เช่น df.to_dict("records"))
+    """
+    solution = {
+        str(row["Activity_ID"]): {
+            "start": int(row["Start_Slot"]),
+            "room": str(row["Room_ID"]),
+        }
+        for row in rows
+    }
+    evaluator = ObjectiveEvaluator(data, options)
+    evaluator.load(solution)
+    return evaluator.breakdown()
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+class ObjectiveEvaluator:
+    """
+    คำนวณค่า penalty แต่ละกลุ่มจากคำตอบ {act_id: {"start", "room"}} โดยไม่ต้อง solve
+    นิยามเหมือน Constraints.add_soft_constraints แต่ใช้ห้องจริงเสมอ (โหมด pool เทียบรายห้อง)
+    - evaluate(solution): ค่าของทุกกลุ่ม
+    - load(solution) แล้ว move(act_id, start, room): ปรับค่าแบบ incremental
+      (คำนวณใหม่เฉพาะวัน/ห้อง/กลุ่มวิชาที่กิจกรรมนั้นเกี่ยวข้อง) ใช้ใน polish.py
+    """
+
+    def __init__(self, data, options=None):
+        self.data = data
+        self.options = options or {}
+        self.weights = {name: OBJECTIVE_WEIGHTS.get(name, 1) for name in FAMILIES}
+
+        time_slots = data.get("time_slots", [])
+        self.horizon = len(time_slots)
+        days = {}
+        self.day_of_slot = [days.setdefault(day_key(s), len(days)) for s in time_slots]
+        self.num_days = len(days)
+
+        rooms = data["rooms"]
+        self.capacity = {r["id"]: _to_int(r.get("จำนวนที่นั่ง", 0)) for r in rooms}
+        preassigned = data.get("preassigned", {})
+        preferences = data.get("teacher_preferences", {})
+
+        # ข้อมูลของแต่ละกิจกรรมที่ใช้คำนวณ penalty
+        self.activities = {}
+        for c in data["courses"]:
+            enrollment = _to_int(c.get("ลง", 0))
+            subject_code = str(c.get("รหัสวิชา", "")).strip()
+            fits = [
+                r["id"]
+                for r in rooms
+                if not (
+                    self.capacity[r["id"]]
+                    and enrollment
+                    and self.capacity[r["id"]] < enrollment
+                )
+            ]
+            slot_costs = [
+                preferences[t] for t in c.get("teacher_list", []) if t in preferences
+            ]
+            for comp in c.get("components", []):
+                fixed = preassigned.get(comp.get("base_id", comp["id"]))
+                candidates = [fixed] if fixed in self.capacity else fits
+                self.activities[comp["id"]] = {
+                    "course": c["id"],
+                    "enrollment": enrollment,
+                    "duration": comp.get("duration_slots", 1),
+                    "group": (subject_code, comp.get("type")) if subject_code else None,
+                    "candidates": candidates,
+                    "slot_costs": slot_costs,
+                }
+
+        # กลุ่ม (รหัสวิชา, ประเภท) ที่มีมากกว่า 1 กิจกรรม และห้องที่ทุกกิจกรรมในกลุ่มใช้ได้
+        members = {}
+        for act_id, act in self.activities.items():
+            if act["group"] is not None:
+                members.setdefault(act["group"], []).append(act_id)
+        self.groups = {g: ids for g, ids in members.items() if len(ids) > 1}
+        self.group_common = {
+            g: set.intersection(*[set(self.activities[a]["candidates"]) for a in ids])
+            for g, ids in self.groups.items()
+        }
+
+        # กลุ่มความจุสำหรับสมดุลการใช้ห้อง (เฉพาะห้องที่มีกิจกรรมใช้ได้)
+        eligible = set()
+        for act in self.activities.values():
+            eligible.update(act["candidates"])
+        classes = {}
+        for r in rooms:
+            if r["id"] in eligible:
+                classes.setdefault(self.capacity[r["id"]], []).append(r["id"])
+        self.room_class = {}
+        self.classes = {}
+        for capacity, room_ids in classes.items():
+            if len(room_ids) > 1:
+                self.classes[capacity] = room_ids
+                for r_id in room_ids:
+                    self.room_class[r_id] = capacity
+
+        self.solution = {}
+        self.values = {}
+
+    # ---------- ค่าต่อกิจกรรม ----------
+
+    def room_cost(self, act_id, room):
+        """
+        (over_capacity, capacity_waste) ของกิจกรรมเมื่ออยู่ห้อง room
+        """
+        enrollment = self.activities[act_id]["enrollment"]
+        capacity = self.capacity.get(room, 0)
+        if not (capacity and enrollment):
+            return 0, 0
+        if enrollment > capacity:
+            return enrollment - capacity, 0
+        return 0, capacity - enrollment
+
+    def preference_cost(self, act_id, start):
+        act = self.activities[act_id]
+        cost = 0
+        for costs in act["slot_costs"]:
+            for i in range(start, start + act["duration"]):
+                cost += costs.get(i, 0)
+        return cost
+
+    # ---------- คำนวณทั้งหมด ----------
+
+    def evaluate(self, solution):
+        self.load(solution)
+        return dict(self.values)
+
+    def load(self, solution):
+        self.solution = {
+            act_id: {"start": sol["start"], "room": sol["room"]}
+            for act_id, sol in solution.items()
+            if act_id in self.activities
+        }
+        self.usage = {}
+        self.day_acts = [set() for _ in range(self.num_days)]
+        self.group_rooms = {g: {} for g in self.groups}
+        over = waste = preference = 0
+        for act_id, sol in self.solution.items():
+            o, w = self.room_cost(act_id, sol["room"])
+            over += o
+            waste += w
+            preference += self.preference_cost(act_id, sol["start"])
+            self._add(act_id, sol)
+
+        self.class_dev = {k: self._class_dev(k) for k in self.classes}
+        self.day_span = [self._day_span(d) for d in range(self.num_days)]
+        self.group_value = {g: self._group_value(g) for g in self.groups}
+        self.values = {
+            "over_capacity": over,
+            "capacity_waste": waste,
+            "room_balance": self._room_balance(),
+            "day_balance": self._day_balance(),
+            "day_compact": sum(self.day_span) if self._use_compactness() else 0,
+            "same_room": sum(self.group_value.values()),
+            "teacher_preference": preference,
+        }
+
+    def total(self, values=None):
+        values = self.values if values is None else values
+        return sum(self.weights[name] * values.get(name, 0) for name in FAMILIES)
+
+    # ---------- incremental ----------
+
+    def move(self, act_id, start, room):
+        """
+        ย้ายกิจกรรมไป (start, room) แล้วปรับค่าเฉพาะส่วนที่เปลี่ยน
+        คืนค่าผลต่างของ objective (ถ่วงน้ำหนักแล้ว) ติดลบ = ดีขึ้น
+        ย้อนกลับได้ด้วย move(act_id, start เดิม, room เดิม)
+        """
+        old = self.solution[act_id]
+        new = {"start": start, "room": room}
+        before = self.total()
+        values = self.values
+
+        o_old, w_old = self.room_cost(act_id, old["room"])
+        o_new, w_new = self.room_cost(act_id, room)
+        values["over_capacity"] += o_new - o_old
+        values["capacity_waste"] += w_new - w_old
+        values["teacher_preference"] += self.preference_cost(
+            act_id, start
+        ) - self.preference_cost(act_id, old["start"])
+
+        self._remove(act_id, old)
+        self.solution[act_id] = new
+        self._add(act_id, new)
+
+        if room != old["room"]:
+            for k in {self.room_class.get(old["room"]), self.room_class.get(room)}:
+                if k is not None:
+                    self.class_dev[k] = self._class_dev(k)
+            values["room_balance"] = self._room_balance()
+            group = self.activities[act_id]["group"]
+            if group in self.group_value:
+                values["same_room"] -= self.group_value[group]
+                self.group_value[group] = self._group_value(group)
+                values["same_room"] += self.group_value[group]
+
+        if start != old["start"]:
+            days = {self.day_of_slot[old["start"]], self.day_of_slot[start]}
+            if self._use_compactness():
+                for d in days:
+                    values["day_compact"] -= self.day_span[d]
+                    self.day_span[d] = self._day_span(d)
+                    values["day_compact"] += self.day_span[d]
+            if len(days) > 1:
+                values["day_balance"] = self._day_balance()
+
+        return self.total() - before
+
+    def breakdown(self, values=None):
+        """
+        {family: {"value", "weight", "weighted"}} ของทุกกลุ่ม
+        """
+        values = self.values if values is None else values
+        return weighted_breakdown({name: values.get(name, 0) for name in FAMILIES})
+
+    # ---------- helpers ----------
+
+    def _use_compactness(self):
+        return self.options.get("use_compactness", True)
+
+    def _add(self, act_id, sol):
+        if sol["room"] in self.activities[act_id]["candidates"]:
+            self.usage[sol["room"]] = self.usage.get(sol["room"], 0) + 1
+        if sol["start"] < self.horizon:
+            self.day_acts[self.day_of_slot[sol["start"]]].add(act_id)
+        group = self.activities[act_id]["group"]
+        if group in self.group_rooms:
+            rooms = self.group_rooms[group]
+            rooms[sol["room"]] = rooms.get(sol["room"], 0) + 1
+
+    def _remove(self, act_id, sol):
+        if sol["room"] in self.activities[act_id]["candidates"]:
+            self.usage[sol["room"]] -= 1
+        if sol["start"] < self.horizon:
+            self.day_acts[self.day_of_slot[sol["start"]]].discard(act_id)
+        group = self.activities[act_id]["group"]
+        if group in self.group_rooms:
+            rooms = self.group_rooms[group]
+            rooms[sol["room"]] -= 1
+            if not rooms[sol["room"]]:
+                del rooms[sol["room"]]
+
+    def _class_dev(self, capacity):
+        room_ids = self.classes[capacity]
+        total = sum(self.usage.get(r_id, 0) for r_id in room_ids)
+        n = len(room_ids)
+        # ระยะห่างจากค่าเฉลี่ยปัดขึ้น (ตรงกับ Constraints._room_balance_terms)
+        return sum(
+            -(-abs(n * self.usage.get(r_id, 0) - total) // n) for r_id in room_ids
+        )
+
+    def _room_balance(self):
+        if self.options.get("balance_mode", "deviation") == "deviation":
+            return sum(self.class_dev.values())
+        counts = [self.usage.get(r["id"], 0) for r in self.data["rooms"]]
+        return max(counts) - min(counts) if counts else 0
+
+    def _day_balance(self):
+        if not self.num_days:
+            return 0
+        counts = [len(acts) for acts in self.day_acts]
+        return max(counts) - min(counts)
+
+    def _day_span(self, d):
+        acts = self.day_acts[d]
+        if not acts:
+            return 0
+        starts = [self.solution[a]["start"] for a in acts]
+        ends = [
+            self.solution[a]["start"] + self.activities[a]["duration"] for a in acts
+        ]
+        return max(ends) - min(starts)
+
+    def _group_value(self, group):
+        rooms = self.group_rooms[group]
+        if not rooms:
+            return 0
+        if (
+            self.options.get("same_room_mode", "used") == "home"
+            and self.group_common[group]
+        ):
+            # home room ที่ดีที่สุด = ห้องร่วมที่มีกิจกรรมในกลุ่มอยู่มากที่สุด
+            best = max(rooms.get(r_id, 0) for r_id in self.group_common[group])
+            return sum(rooms.values()) - best
+        return len(rooms) - 1
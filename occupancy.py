@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class OccupancyIndex:
+    """
+    ตารางการใช้งานของทรัพยากร (ห้อง/อาจารย์/cohort/...) บน time slots
+    - เก็บคาบที่ไม่ว่างของแต่ละ key เป็น bitmask (int) bit ที่ i = คาบ i ถูกใช้แล้ว
+    - ถามว่า "key ว่างช่วง [start, start+duration) ไหม" ได้ใน O(1)
+      ด้วย mask ของช่วงที่คำนวณไว้ล่วงหน้าต่อ duration
+    - assign / unassign แบบ incremental (ใช้ได้ทั้ง greedy, validator และ repair)
+    - track_owners=True: จำว่ากิจกรรมไหนใช้คาบไหน (ใช้รายงานว่าชนกับใคร)
+    key เป็นอะไรก็ได้ที่ hash ได้ เช่น ("room", room_id), ("teacher", name)
+    """
+
+    def __init__(self, num_slots, track_owners=False):
+        self.num_slots = num_slots
+        self.track_owners = track_owners
+        self._busy = {}
+        self._owners = {}
+        # duration -> [mask ของช่วง [s, s+duration) สำหรับทุก s]
+        self._spans = {}
+
+    def span_mask(self, start, duration):
+        spans = self._spans.get(duration)
+        if spans is None:
+            block = (1 << duration) - 1
+            spans = [block << s for s in range(max(0, self.num_slots - duration + 1))]
+            self._spans[duration] = spans
+        return spans[start]
+
+    def busy_mask(self, key):
+        return self._busy.get(key, 0)
+
+    def is_free(self, key, start, duration):
+        return not self._busy.get(key, 0) & self.span_mask(start, duration)
+
+    def all_free(self, keys, start, duration):
+        span = self.span_mask(start, duration)
+        busy = self._busy
+        for key in keys:
+            if busy.get(key, 0) & span:
+                return False
+        return True
+
+    def assign(self, key, start, duration, owner=None):
+        self._busy[key] = self._busy.get(key, 0) | self.span_mask(start, duration)
+        if self.track_owners and owner is not None:
+            slots = self._owners.setdefault(key, {})
+            for i in range(start, start + duration):
+                slots.setdefault(i, []).append(owner)
+
+    def unassign(self, key, start, duration, owner=None):
+        span = self.span_mask(start, duration)
+        if self.track_owners and owner is not None:
+            slots = self._owners.get(key, {})
+            for i in range(start, start + duration):
+                owners = slots.get(i, [])
+                if owner in owners:
+                    owners.remove(owner)
+                if owners:
+                    # คาบนี้ยังมีกิจกรรมอื่นใช้อยู่ (ชนกัน) ไม่ล้าง bit
+                    span &= ~(1 << i)
+        self._busy[key] = self._busy.get(key, 0) & ~span
+
+    def owners(self, key, start, duration):
+        """
+        กิจกรรมที่ใช้ key ในช่วง [start, start+duration) (ต้องเปิด track_owners)
+        """
+        if not self.is_free(key, start, duration):
+            slots = self._owners.get(key, {})
+            found = []
+            for i in range(start, start + duration):
+                for owner in slots.get(i, ()):
+                    if owner not in found:
+                        found.append(owner)
+            return found
+        return []
+
+    def free_array(self, keys):
+        """
+        bool array ยาว num_slots: True = คาบที่ทุก key ว่าง
+        """
+        busy = 0
+        for key in keys:
+            busy |= self._busy.get(key, 0)
+        if not busy:
+            return np.ones(self.num_slots, dtype=bool)
+        num_bytes = (self.num_slots + 7) // 8
+        raw = np.frombuffer(busy.to_bytes(num_bytes, "little"), dtype=np.uint8)
+        return ~np.unpackbits(raw, bitorder="little")[: self.num_slots].astype(bool)
+
+    def free_starts(self, keys, starts, duration, free=None):
+        """
+        ถามหลาย start พร้อมกัน (NumPy): คืน bool array ขนานกับ starts
+        free: ผลของ free_array(keys) ถ้ามีอยู่แล้ว
+        """
+        if free is None:
+            free = self.free_array(keys)
+        prefix = np.concatenate(([0], np.cumsum(~free, dtype=np.int64)))
+        return prefix[starts + duration] - prefix[starts] == 0
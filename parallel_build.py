@@ -0,0 +1,216 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+def build_skeleton(all_vars, data):
+    """
+    แปลง all_vars เป็นโครงสร้างที่มีแต่ index ของตัวแปรใน proto (ส่งข้าม process ได้ถูก)
+    courses: [(c_id, teacher_list, enrollment, [(act_id, interval_idx, {r_id: (pres_idx, opt_interval_idx)})])]
+    rooms:   [(r_id, capacity, pool_size)]
+    """
+    courses = []
+    for c in data["courses"]:
+        acts = []
+        for act_id, act in all_vars[c["id"]]["activities"].items():
+            acts.append(
+                (
+                    act_id,
+                    act["interval"].Index(),
+                    {
+                        r_id: (
+                            room_vars["is_present"].Index(),
+                            room_vars["opt_interval"].Index(),
+                        )
+                        for r_id, room_vars in act["rooms"].items()
+                    },
+                )
+            )
+        courses.append(
+            (
+                c["id"],
+                list(c.get("teacher_list", [])),
+                _to_int(c.get("ลง", 0)),
+                acts,
+            )
+        )
+
+    rooms = [
+        (r["id"], _to_int(r.get("จำนวนที่นั่ง", 0)), r.get("pool_size", 1))
+        for r in data["rooms"]
+    ]
+    return {
+        "courses": courses,
+        "rooms": rooms,
+        "teachers": list(data.get("teachers", [])),
+    }
+
+
+def _slice_records(courses, rooms):
+    """
+    งานของ worker 1 งาน: วิชาช่วงหนึ่ง (ส่งมาเฉพาะ slice นั้น ไม่ใช่ skeleton ทั้งก้อน)
+    rooms: [(r_id, capacity)] ตามลำดับใน data
+    คืนค่า interval ต่อห้อง / กิจกรรมต่ออาจารย์ของ slice นี้ และ record ของ 3) - 5)
+    แยกตาม family เพื่อให้ process หลักต่อกันตามลำดับเดียวกับการสร้างแบบ sequential
+    """
+    capacity_of = dict(rooms)
+    room_intervals = {}
+    teacher_acts = {}
+    self_records = []
+    capacity_records = []
+    completion_records = []
+
+    for c_id, teacher_list, enrollment, acts in courses:
+        for act_id, interval_idx, act_rooms in acts:
+            for r_id, (_, opt_idx) in act_rooms.items():
+                room_intervals.setdefault(r_id, []).append(opt_idx)
+            for teacher in teacher_list:
+                teacher_acts.setdefault(teacher, []).append(
+                    (c_id, act_id, interval_idx)
+                )
+
+        detail = {"course": c_id}
+        if len(acts) > 1:
+            self_records.append(
+                (
+                    "course_self_collision",
+                    detail,
+                    "no_overlap",
+                    [interval_idx for _, interval_idx, _ in acts],
+                )
+            )
+        else:
+            self_records.append(("course_self_collision", detail, None, None))
+
+        for _, _, act_rooms in acts:
+            for r_id, capacity in rooms:
+                if r_id not in act_rooms:
+                    continue
+                if capacity and enrollment and capacity < enrollment:
+                    capacity_records.append(
+                        (
+                            "capacity_constraint",
+                            {
+                                "course": c_id,
+                                "room_id": r_id,
+                                "enrollment": enrollment,
+                                "capacity": capacity,
+                            },
+                            "linear",
+                            ([act_rooms[r_id][0]], [1], 0, 0),
+                        )
+                    )
+
+        for act_id, _, act_rooms in acts:
+            pres = [pres_idx for pres_idx, _ in act_rooms.values()]
+            completion_records.append(
+                (
+                    "course_completion",
+                    {"activity": f"interval_{act_id}"},
+                    "linear",
+                    (pres, [1] * len(pres), 1, 1),
+                )
+            )
+
+    return {
+        "room_intervals": room_intervals,
+        "teacher_acts": teacher_acts,
+        "course_self_collision": self_records,
+        "capacity_constraint": capacity_records,
+        "course_completion": completion_records,
+    }
+
+
+def _chunks(items, parts):
+    size = max(1, -(-len(items) // parts))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def build_core_records(skeleton, max_processes=None):
+    """
+    สร้าง record ของ hard constraint 5 กลุ่มแรกแบบขนาน (1 งานต่อช่วงวิชา)
+    process หลักต่อ interval ของห้อง/อาจารย์จากทุกช่วง (แค่ต่อ list) แล้วเรียง record
+    ตามลำดับ family เดียวกับ Constraints.add_hard_constraints
+    """
+    processes = max_processes or os.cpu_count() or 1
+    rooms = [(r_id, capacity) for r_id, capacity, _ in skeleton["rooms"]]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_slice_records, chunk, rooms)
+            for chunk in _chunks(skeleton["courses"], processes)
+        ]
+        parts = [future.result() for future in futures]
+
+    # 1) Room No-Overlap
+    records = []
+    for r_id, _, pool_size in skeleton["rooms"]:
+        intervals = []
+        for part in parts:
+            intervals.extend(part["room_intervals"].get(r_id, ()))
+        detail = {"room_id": r_id}
+        if not intervals:
+            records.append(("room_no_overlap", detail, None, None))
+        elif pool_size > 1:
+            records.append(
+                ("room_no_overlap", detail, "cumulative", (intervals, pool_size))
+            )
+        else:
+            records.append(("room_no_overlap", detail, "no_overlap", intervals))
+
+    # 2) Teacher No-Overlap (กิจกรรมเดียวกันนับครั้งเดียว)
+    for teacher in skeleton["teachers"]:
+        seen = set()
+        intervals = []
+        for part in parts:
+            for c_id, act_id, interval_idx in part["teacher_acts"].get(teacher, ()):
+                if (c_id, act_id) in seen:
+                    continue
+                seen.add((c_id, act_id))
+                intervals.append(interval_idx)
+        detail = {"teacher": teacher}
+        if intervals:
+            records.append(("teacher_no_overlap", detail, "no_overlap", intervals))
+        else:
+            records.append(("teacher_no_overlap", detail, None, None))
+
+    # 3) - 5)
+    for family in ("course_self_collision", "capacity_constraint", "course_completion"):
+        for part in parts:
+            records.extend(part[family])
+    return records
+
+
+def merge_records(model, records, assumption):
+    """
+    เขียน record ลง proto ของ model ตรงๆ (ไม่ผ่าน wrapper ของ CpModel)
+    assumption(name, detail) คืน BoolVar ของ assumption (สร้างใน process หลัก)
+    """
+    proto = model.Proto()
+    for name, detail, kind, payload in records:
+        literal = assumption(name, detail).Index()
+        if kind is None:
+            continue
+        ct = proto.constraints.add()
+        ct.enforcement_literal.append(literal)
+        if kind == "no_overlap":
+            ct.no_overlap.intervals.extend(payload)
+        elif kind == "cumulative":
+            intervals, capacity = payload
+            ct.cumulative.intervals.extend(intervals)
+            for _ in intervals:
+                ct.cumulative.demands.add().offset = 1
+            ct.cumulative.capacity.offset = capacity
+        elif kind == "linear":
+            var_indices, coeffs, lb, ub = payload
+            ct.linear.vars.extend(var_indices)
+            ct.linear.coeffs.extend(coeffs)
+            ct.linear.domain.extend([lb, ub])
@@ -0,0 +1,229 @@
+import random
+import time
+
+from src.config import POLISH
+from src.domains import day_key, get_domain_compiler
+from src.objectives import ObjectiveEvaluator
+from src.occupancy import OccupancyIndex
+
+
+class SolutionPolisher:
+    """
+    Local search หลัง solve (ใช้กับคำตอบ FEASIBLE ที่หมดเวลา) ลด soft penalty ที่ยังเหลือ
+    neighbourhood:
+    - move: เลื่อนเวลากิจกรรม (ส่วนใหญ่ภายในวันเดิม เพื่อลด day span)
+    - room: ย้ายไปห้องอื่นที่ว่างและความจุพอ
+    - swap: สลับห้องของสองกิจกรรม (เช่นลดความเปลืองความจุ)
+    ตรวจ hard constraint ด้วย OccupancyIndex (ห้อง/อาจารย์/วิชา/cohort ไม่ชน,
+    start อยู่ในโดเมน, ห้องความจุพอ) และคำนวณผลต่าง objective แบบ incremental
+    ด้วย ObjectiveEvaluator.move รับเฉพาะ move ที่ไม่ทำให้แย่ลง
+    """
+
+    def __init__(self, data, solution, config=None, options=None):
+        self.data = data
+        self.config = dict(POLISH)
+        if config:
+            self.config.update(config)
+        self.evaluator = ObjectiveEvaluator(data, options)
+        self.solution = {
+            act_id: dict(sol)
+            for act_id, sol in solution.items()
+            if act_id in self.evaluator.activities
+        }
+        self.report = {}
+
+    def run(self):
+        time_limit = float(self.config["time"])
+        max_iterations = self.config.get("iterations")
+        rng = random.Random(self.config.get("seed", 0))
+        start_ts = time.time()
+
+        evaluator = self.evaluator
+        evaluator.load(self.solution)
+        before = evaluator.total()
+        act_ids = sorted(self.solution)
+        if not act_ids:
+            return self.solution
+
+        self._build_index()
+        counts = {"move": [0, 0], "room": [0, 0], "swap": [0, 0]}
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            iterations += 1
+            # จำกัดด้วยจำนวนรอบ -> ไม่ดูเวลา (ผลลัพธ์ไม่ขึ้นกับความเร็วเครื่อง)
+            timed = max_iterations is None and iterations % 256 == 0
+            if timed and time.time() - start_ts >= time_limit:
+                break
+            kind = rng.choice(("move", "room", "swap"))
+            act_id = rng.choice(act_ids)
+            if kind == "move":
+                delta = self._try_move(act_id, rng)
+            elif kind == "room":
+                delta = self._try_room(act_id, rng)
+            else:
+                delta = self._try_swap(act_id, rng.choice(act_ids))
+            if delta is not None:
+                counts[kind][0] += 1
+                if delta < 0:
+                    counts[kind][1] += 1
+
+        after = evaluator.total()
+        self.report = {
+            "objective_before": before,
+            "objective_after": after,
+            "improvement": before - after,
+            "iterations": iterations,
+            "time (s)": round(time.time() - start_ts, 2),
+        }
+        for kind, (accepted, improved) in counts.items():
+            self.report[f"{kind} accepted / improving"] = f"{accepted} / {improved}"
+        print(
+            f"[Polish] objective {before} -> {after} "
+            f"({iterations} iterations in {self.report['time (s)']} s)"
+        )
+        return self.solution
+
+    def breakdown(self):
+        return self.evaluator.breakdown()
+
+    def _build_index(self):
+        time_slots = self.data.get("time_slots", [])
+        compiler = get_domain_compiler()
+        grid = compiler.grid(time_slots)
+        availability = self.data.get("teacher_availability", {})
+        full_mask = (1 << len(time_slots)) - 1
+        cohorts_of = {}
+        for cohort_id, course_ids in self.data.get("cohorts", {}).items():
+            for c_id in course_ids:
+                cohorts_of.setdefault(c_id, []).append(cohort_id)
+
+        # โดเมนของ start (เหมือน TimetableModel.create_variables) และ key ของทรัพยากรที่ใช้
+        self.starts = {}
+        self.day_starts = {}
+        self.keys = {}
+        for c in self.data["courses"]:
+            teacher_mask = full_mask
+            for t in c.get("teacher_list", []):
+                teacher_mask &= availability.get(t, full_mask)
+            keys = [("course", c["id"])]
+            keys += [("teacher", t) for t in dict.fromkeys(c.get("teacher_list", []))]
+            keys += [("cohort", k) for k in cohorts_of.get(c["id"], [])]
+            for comp in c.get("components", []):
+                if comp["id"] not in self.solution:
+                    continue
+                duration = comp.get("duration_slots", 1)
+                starts = compiler.valid_starts(grid, duration)
+                # อาจารย์ไม่ว่างเลย -> ไม่ย้ายเวลา (ไม่ย้ายไปช่วงไม่ว่าง)
+                if starts and teacher_mask != full_mask:
+                    starts = compiler.valid_starts(grid, duration, teacher_mask)
+                self.starts[comp["id"]] = list(starts)
+                by_day = {}
+                for s in starts:
+                    by_day.setdefault(day_key(time_slots[s]), []).append(s)
+                self.day_starts[comp["id"]] = by_day
+                self.keys[comp["id"]] = keys
+
+        self.index = OccupancyIndex(len(time_slots))
+        for act_id, sol in self.solution.items():
+            self._assign(act_id, sol["start"], sol["room"])
+
+    def _assign(self, act_id, start, room):
+        duration = self.evaluator.activities[act_id]["duration"]
+        for key in self.keys[act_id] + [("room", room)]:
+            self.index.assign(key, start, duration)
+
+    def _unassign(self, act_id, start, room):
+        duration = self.evaluator.activities[act_id]["duration"]
+        for key in self.keys[act_id] + [("room", room)]:
+            self.index.unassign(key, start, duration)
+
+    def _apply(self, act_id, start, room):
+        """
+        ลองย้าย act_id (ต้อง unassign ออกจาก index แล้ว) คืนค่า delta ถ้ารับ หรือ None
+        """
+        duration = self.evaluator.activities[act_id]["duration"]
+        if not self.index.all_free(
+            self.keys[act_id] + [("room", room)], start, duration
+        ):
+            return None
+        old = self.solution[act_id]
+        delta = self.evaluator.move(act_id, start, room)
+        if delta > 0:
+            self.evaluator.move(act_id, old["start"], old["room"])
+            return None
+        self.solution[act_id] = {"start": start, "room": room}
+        return delta
+
+    def _try_move(self, act_id, rng):
+        sol = self.solution[act_id]
+        if rng.random() < 0.8:
+            day = day_key(self.data["time_slots"][sol["start"]])
+            starts = self.day_starts[act_id].get(day) or self.starts[act_id]
+        else:
+            starts = self.starts[act_id]
+        if not starts:
+            return None
+        start = rng.choice(starts)
+        if start == sol["start"]:
+            return None
+        self._unassign(act_id, sol["start"], sol["room"])
+        delta = self._apply(act_id, start, sol["room"])
+        sol = self.solution[act_id]
+        self._assign(act_id, sol["start"], sol["room"])
+        return delta
+
+    def _try_room(self, act_id, rng):
+        sol = self.solution[act_id]
+        candidates = self.evaluator.activities[act_id]["candidates"]
+        if not candidates:
+            return None
+        room = rng.choice(candidates)
+        if room == sol["room"]:
+            return None
+        self._unassign(act_id, sol["start"], sol["room"])
+        delta = self._apply(act_id, sol["start"], room)
+        sol = self.solution[act_id]
+        self._assign(act_id, sol["start"], sol["room"])
+        return delta
+
+    def _try_swap(self, a, b):
+        sol_a, sol_b = self.solution[a], self.solution[b]
+        room_a, room_b = sol_a["room"], sol_b["room"]
+        if a == b or room_a == room_b:
+            return None
+        if room_b not in self.evaluator.activities[a]["candidates"]:
+            return None
+        if room_a not in self.evaluator.activities[b]["candidates"]:
+            return None
+
+        duration_a = self.evaluator.activities[a]["duration"]
+        duration_b = self.evaluator.activities[b]["duration"]
+        self._unassign(a, sol_a["start"], room_a)
+        self._unassign(b, sol_b["start"], room_b)
+        ok = self.index.all_free(
+            self.keys[a] + [("room", room_b)], sol_a["start"], duration_a
+        )
+        if ok:
+            # a อยู่ห้อง room_b แล้ว ต้องจองไว้ก่อนตรวจ b (สองกิจกรรมอาจเวลาทับกัน)
+            self._assign(a, sol_a["start"], room_b)
+            ok = self.index.all_free(
+                self.keys[b] + [("room", room_a)], sol_b["start"], duration_b
+            )
+            self._unassign(a, sol_a["start"], room_b)
+
+        delta = None
+        if ok:
+            # ประเมินผลรวมของทั้งสองขั้น (ขั้นแรกอย่างเดียวอาจแย่ลง)
+            delta = self.evaluator.move(a, sol_a["start"], room_b)
+            delta += self.evaluator.move(b, sol_b["start"], room_a)
+            if delta > 0:
+                self.evaluator.move(b, sol_b["start"], room_b)
+                self.evaluator.move(a, sol_a["start"], room_a)
+                delta = None
+            else:
+                self.solution[a] = {"start": sol_a["start"], "room": room_b}
+                self.solution[b] = {"start": sol_b["start"], "room": room_a}
+        for act_id in (a, b):
+            sol = self.solution[act_id]
+            self._assign(act_id, sol["start"], sol["room"])
+        return delta
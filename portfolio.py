@@ -0,0 +1,203 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import MODEL_OPTIONS, PORTFOLIO, SOLVER_PROFILES
+from src.model import TimetableModel
+from src.objectives import ObjectiveEvaluator
+from src.runs import RunArchive, atomic_write_text
+from src.solver import TimetableSolver
+
+
+def _solve_member(data, member, params, hint, deadline=None):
+    """
+    รัน 1 สมาชิกของ portfolio (ทำงานใน process แยก)
+    คืนค่าเป็น dict ธรรมดาเพื่อส่งกลับ process หลักได้
+    deadline: เวลา (time.time()) ที่ต้องจบ budget รวม เวลา solve ถูกตัดให้ไม่เกิน
+    """
+    start_ts = time.time()
+    result = {
+        "name": member["name"],
+        "status": cp_model.UNKNOWN,
+        "status_name": "UNKNOWN",
+        "objective": None,
+        "score": None,
+        "solution": None,
+        "wall_time": 0.0,
+    }
+    if deadline is not None and deadline - start_ts <= 0:
+        # รอคิวจนหมด budget แล้ว ไม่ต้อง build
+        return result
+
+    timetable_model = TimetableModel(data, options=member.get("model"))
+    model, all_vars = timetable_model.build_model()
+    if hint:
+        timetable_model.add_hints(hint)
+    if deadline is not None:
+        # เวลา build ของสมาชิกนับรวมใน budget
+        params = dict(params)
+        params["max_time_in_seconds"] = max(
+            0.1, min(params["max_time_in_seconds"], deadline - time.time())
+        )
+
+    solver = TimetableSolver(model, all_vars, data, params=params)
+    status = solver.run()
+    result["status"] = status
+    result["status_name"] = solver.solver.StatusName(status)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.solver.ObjectiveValue()
+        result["solution"] = solver.extract_solution()
+        # แต่ละ formulation มี objective ต่างกัน จึงต้องวัดผลด้วยโมเดลอ้างอิงเดียวกัน
+        result["score"] = _score_solution(data, result["solution"])
+    # รวมเวลา build / extract / score (ไม่ใช่เฉพาะเวลา solve)
+    result["wall_time"] = time.time() - start_ts
+    return result
+
+
+def _score_solution(data, solution):
+    """
+    objective ของคำตอบตามนิยามของโมเดลอ้างอิง (MODEL_OPTIONS ค่าเริ่มต้น)
+    คำนวณจากคำตอบโดยตรงด้วย ObjectiveEvaluator (ไม่ build / solve โมเดลซ้ำ จึงแทบไม่กินเวลา)
+    """
+    evaluator = ObjectiveEvaluator(data, dict(MODEL_OPTIONS))
+    evaluator.load(solution)
+    return evaluator.total()
+
+
+class PortfolioSolver:
+    """
+    Portfolio mode: รันหลาย solve พร้อมกันใน process pool
+    แต่ละสมาชิกต่างกันที่ random seed / profile ของพารามิเตอร์ / formulation
+    แบ่งเวลารวมเป็นหลายรอบ และส่งคำตอบที่ดีที่สุดเป็น hint ให้รอบถัดไป
+    """
+
+    def __init__(self, data, config=None):
+        self.data = data
+        self.config = dict(PORTFOLIO)
+        if config:
+            self.config.update(config)
+
+        self.best = None
+        self.history = []
+
+    def solve(self):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        members = self.config["members"]
+        rounds = max(1, int(self.config.get("rounds", 1)))
+        budget = float(self.config["time_budget"])
+        deadline = start_ts + budget
+
+        num_cores = os.cpu_count() or 1
+        max_processes = self.config.get("max_processes") or num_cores
+        num_processes = max(1, min(len(members), max_processes))
+        # แบ่ง core ให้ CP-SAT ภายในแต่ละ process
+        workers_per_member = max(1, num_cores // num_processes)
+        waves = -(-len(members) // num_processes)
+
+        print("--- Portfolio Solving ---")
+        print(
+            f"Members: {len(members)}, Processes: {num_processes}, "
+            f"Workers/member: {workers_per_member}, Budget: {budget}s"
+        )
+
+        with ProcessPoolExecutor(max_workers=num_processes) as pool:
+            for round_idx in range(rounds):
+                remaining = deadline - time.time()
+                if remaining <= 1.0:
+                    break
+                # เวลาที่เหลือหารด้วยจำนวนรอบที่เหลือ และจำนวนชุด (wave) ต่อรอบ
+                # (ถ้าสมาชิกมากกว่าจำนวน process จะต้องรอคิวกันหลายชุด)
+                round_limit = remaining / (rounds - round_idx) / waves
+                hint = self.best["solution"] if self.best else None
+
+                futures = []
+                for member in members:
+                    params = self._member_params(
+                        member, round_limit, workers_per_member
+                    )
+                    futures.append(
+                        pool.submit(
+                            _solve_member, self.data, member, params, hint, deadline
+                        )
+                    )
+
+                for future in futures:
+                    result = future.result()
+                    result["round"] = round_idx + 1
+                    self.history.append(result)
+                    self._print_result(result)
+                    if result["score"] is None:
+                        continue
+                    if self.best is None or result["score"] < self.best["score"]:
+                        self.best = result
+
+                if self.best:
+                    print(
+                        f"[Round {round_idx + 1}] Best so far: "
+                        f"{self.best['name']} (score={self.best['score']})"
+                    )
+
+        end_dt = datetime.now()
+        elapsed = time.time() - start_ts
+
+        exporter = TimetableSolver(None, None, self.data)
+        if self.best:
+            exporter.export_solution(self.best["solution"])
+        else:
+            print("Portfolio found no feasible solution.")
+        self._write_run_log(exporter, start_dt, end_dt, elapsed)
+        return self.best
+
+    def _member_params(self, member, time_limit, num_workers):
+        params = {
+            "max_time_in_seconds": time_limit,
+            "log_search_progress": False,
+            "num_search_workers": num_workers,
+            "random_seed": member.get("seed", 0),
+        }
+        params.update(SOLVER_PROFILES.get(member.get("profile", "default"), {}))
+        return params
+
+    def _print_result(self, result):
+        print(
+            f"- [{result['name']}] status={result['status_name']} "
+            f"objective={result['objective']} score={result['score']} "
+            f"time={result['wall_time']:.2f}s"
+        )
+
+    def _write_run_log(self, exporter, start_dt, end_dt, elapsed_sec):
+        log_path = exporter._run_log_path()
+        lines = [
+            "# Portfolio Run Log",
+            "",
+            f"- Start: {start_dt.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"- End: {end_dt.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"- Elapsed (s): {elapsed_sec:.6f}",
+            f"- time_budget: {self.config['time_budget']}",
+            f"- rounds: {self.config['rounds']}",
+            "",
+            "## Best",
+        ]
+        if self.best:
+            lines.append(f"- member: {self.best['name']} (round {self.best['round']})")
+            lines.append(f"- score: {self.best['score']}")
+        else:
+            lines.append("- none")
+
+        lines.append("")
+        lines.append("## Members")
+        lines.append("| round | member | status | objective | score | time (s) |")
+        lines.append("|---|---|---|---|---|---|")
+        for r in self.history:
+            lines.append(
+                f"| {r['round']} | {r['name']} "
+                f"| {r['status_name']} "
+                f"| {r['objective']} | {r['score']} | {r['wall_time']:.2f} |"
+            )
+
+        atomic_write_text(log_path, "\n".join(lines))
+        RunArchive("output").record("log", log_path, mode="portfolio")
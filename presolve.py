@@ -0,0 +1,165 @@
+from src.config import PRESOLVE
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+class DataReducer:
+    """
+    ลดขนาดข้อมูลก่อนสร้างตัวแปร CP (ทำงานกับผลลัพธ์ของ DataLoader.load_data)
+    1. รวมแถวที่ซ้ำกันทุกคอลัมน์ใน Comsci_Test.csv (uid เดียวกัน -> ตัวแปรชนกัน)
+    2. ตัดวิชาที่ไม่มีกิจกรรม (เช่น L = 0 แต่ประเภท L)
+    3. กิจกรรมที่มีห้องที่ความจุพอเพียงห้องเดียว -> จัดห้องล่วงหน้า (data["preassigned"])
+    4. ตัดห้องที่ไม่มีกิจกรรมไหนใช้ได้เลย (ความจุน้อยกว่าทุกวิชา) และอาจารย์ที่ไม่มีวิชาเหลือ
+    ไม่แก้ data เดิม คืนค่า dict ใหม่ และเก็บสรุปไว้ใน data["presolve_report"]
+    """
+
+    def __init__(self, data, config=None):
+        self.data = data
+        self.config = dict(PRESOLVE)
+        if config:
+            self.config.update(config)
+        self.report = {}
+
+    def reduce(self):
+        print("--- Presolve (data reduction) ---")
+        courses = list(self.data["courses"])
+        rooms = list(self.data["rooms"])
+
+        if self.config.get("merge_duplicates", True):
+            courses = self._merge_duplicates(courses)
+        if self.config.get("drop_empty_courses", True):
+            courses = self._drop_empty_courses(courses)
+
+        candidates = {c["id"]: self._candidate_rooms(c, rooms) for c in courses}
+
+        preassigned = dict(self.data.get("preassigned", {}))
+        if self.config.get("preassign_single_room", True):
+            preassigned.update(self._preassign(courses, candidates))
+        if self.config.get("drop_unusable_rooms", True):
+            rooms = self._drop_unusable_rooms(rooms, candidates)
+
+        teachers = self._used_teachers(courses)
+        self.report["teachers_removed"] = len(self.data.get("teachers", [])) - len(
+            teachers
+        )
+
+        course_ids = {c["id"] for c in courses}
+        cohorts = {
+            cohort_id: [c_id for c_id in ids if c_id in course_ids]
+            for cohort_id, ids in self.data.get("cohorts", {}).items()
+        }
+
+        self.report.update(
+            {
+                "courses": f"{len(self.data['courses'])} -> {len(courses)}",
+                "rooms": f"{len(self.data['rooms'])} -> {len(rooms)}",
+                "preassigned_activities": len(preassigned),
+            }
+        )
+        for key, value in self.report.items():
+            print(f"[Presolve] {key}: {value}")
+
+        return dict(
+            self.data,
+            courses=courses,
+            rooms=rooms,
+            teachers=teachers,
+            cohorts=cohorts,
+            preassigned=preassigned,
+            presolve_report=dict(self.report),
+        )
+
+    def _merge_duplicates(self, courses):
+        seen = {}
+        merged = []
+        removed = 0
+        for c in courses:
+            key = tuple(
+                sorted((str(k), str(v)) for k, v in c.items() if k != "components")
+            )
+            if key in seen:
+                removed += 1
+                continue
+            seen[key] = c["id"]
+            merged.append(c)
+
+        # uid ซ้ำแต่ข้อมูลไม่เหมือนกัน: รวมให้ไม่ได้ แจ้งเตือนไว้
+        counts = {}
+        for c in merged:
+            counts[c["id"]] = counts.get(c["id"], 0) + 1
+        clashes = sorted(c_id for c_id, n in counts.items() if n > 1)
+        if clashes:
+            print(f"Warning: Different rows share the same uid: {', '.join(clashes)}")
+
+        self.report["duplicate_rows_merged"] = removed
+        return merged
+
+    def _drop_empty_courses(self, courses):
+        kept = [c for c in courses if c.get("components")]
+        dropped = [c["id"] for c in courses if not c.get("components")]
+        if dropped:
+            print(f"[Presolve] Courses without activities: {', '.join(dropped[:20])}")
+        self.report["empty_courses_dropped"] = len(dropped)
+        return kept
+
+    def _candidate_rooms(self, course, rooms):
+        # ห้องที่ผ่าน hard constraint ความจุ (ไม่รู้ความจุ/จำนวนลง = ใช้ได้)
+        enrollment = _to_int(course.get("ลง", 0))
+        result = []
+        for r in rooms:
+            capacity = _to_int(r.get("จำนวนที่นั่ง", 0))
+            if capacity and enrollment and capacity < enrollment:
+                continue
+            result.append(r["id"])
+        return result
+
+    def _preassign(self, courses, candidates):
+        preassigned = {}
+        no_room = []
+        for c in courses:
+            room_ids = candidates[c["id"]]
+            if not room_ids:
+                no_room.append(c["id"])
+            elif len(room_ids) == 1:
+                for comp in c.get("components", []):
+                    preassigned[comp["id"]] = room_ids[0]
+        if no_room:
+            print(f"Warning: No room is large enough for: {', '.join(no_room[:20])}")
+        return preassigned
+
+    def _drop_unusable_rooms(self, rooms, candidates):
+        usable = set()
+        for room_ids in candidates.values():
+            usable.update(room_ids)
+        kept = [r for r in rooms if r["id"] in usable]
+        dropped = [r["id"] for r in rooms if r["id"] not in usable]
+        if dropped:
+            print(f"[Presolve] Rooms no activity can use: {', '.join(dropped[:20])}")
+        self.report["unusable_rooms_dropped"] = len(dropped)
+        return kept
+
+    def _used_teachers(self, courses):
+        used = set()
+        for c in courses:
+            used.update(c.get("teacher_list", []))
+        return [t for t in self.data.get("teachers", []) if t in used]
+
+
+def reduce_data(data, config=None):
+    """
+    รัน DataReducer ถ้าเปิดใช้ใน config.PRESOLVE (ปิดอยู่คืน data เดิม)
+    """
+    settings = dict(PRESOLVE)
+    if config:
+        settings.update(config)
+    if not settings.get("enabled", True):
+        return data
+    return DataReducer(data, settings).reduce()
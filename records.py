@@ -0,0 +1,92 @@
+from collections.abc import MutableMapping
+
+# key ของข้อมูลวิชา (ชื่อคอลัมน์ใน CSV / field ที่ DataLoader เพิ่ม) -> ชื่อ attribute
+COURSE_FIELDS = {
+    "id": "id",
+    "uid": "uid",
+    "รหัสวิชา": "code",
+    "กลุ่มเรียน": "section",
+    "ชั้นปี": "year",
+    "ชื่อวิชาภาษาอังกฤษ": "name",
+    "ลง": "enrollment",
+    "สาขา": "program",
+    "teacher_list": "teacher_list",
+    "l_hours": "l_hours",
+    "p_hours": "p_hours",
+    "s_hours": "s_hours",
+    "type_hint": "type_hint",
+    "week_pattern": "week_pattern",
+    "components": "components",
+}
+
+
+class CourseRecord(MutableMapping):
+    """
+    ข้อมูลวิชา 1 กลุ่มเรียน เก็บเฉพาะ field ที่โมเดลใช้ (ไม่เก็บทั้งแถว CSV แบบ row.to_dict())
+    ใช้ __slots__ จึงไม่มี __dict__ ต่อ object (ประหยัดหน่วยความจำเมื่อมีวิชาเป็นหมื่นกลุ่มเรียน)
+    ใช้แบบ dict ได้เหมือนเดิม: c["id"], c.get("ลง"), dict(c, components=...), c.items()
+    key ที่ไม่อยู่ใน COURSE_FIELDS ใช้ไม่ได้ (KeyError)
+    """
+
+    __slots__ = tuple(COURSE_FIELDS.values())
+
+    def __init__(self, values=None, **kwargs):
+        for key, value in dict(values or {}, **kwargs).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        attr = COURSE_FIELDS.get(key)
+        if attr is None:
+            raise KeyError(key)
+        try:
+            return getattr(self, attr)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        attr = COURSE_FIELDS.get(key)
+        if attr is None:
+            raise KeyError(key)
+        setattr(self, attr, value)
+
+    def __delitem__(self, key):
+        attr = COURSE_FIELDS.get(key)
+        if attr is None or not hasattr(self, attr):
+            raise KeyError(key)
+        delattr(self, attr)
+
+    def __iter__(self):
+        for key, attr in COURSE_FIELDS.items():
+            if hasattr(self, attr):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"CourseRecord({dict(self)!r})"
+
+    # pickle (ส่งข้าม process) / copy.deepcopy
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            self[key] = value
+
+
+def course_record(row, program_column=None):
+    """
+    สร้าง CourseRecord จากแถวข้อมูล (pandas row / dict) เก็บเฉพาะคอลัมน์ที่ใช้
+    program_column: ชื่อคอลัมน์สาขา/หลักสูตรใน CSV (เก็บไว้ใต้ key "สาขา")
+    """
+    record = CourseRecord()
+    for key in ("รหัสวิชา", "กลุ่มเรียน", "ชั้นปี", "ชื่อวิชาภาษาอังกฤษ", "ลง"):
+        value = row.get(key)
+        if value is not None:
+            record[key] = value
+    if program_column:
+        value = row.get(program_column)
+        if value is not None:
+            record["สาขา"] = value
+    return record
@@ -0,0 +1,192 @@
+"""
+Regression checks บนข้อมูลสังเคราะห์ขนาดเล็ก (สร้าง CSV ชั่วคราว ไม่ใช้โฟลเดอร์ data)
+วิธีใช้: python -m src.regression                 (ทุก check)
+         python -m src.regression horizon_carry   (เฉพาะบาง check)
+exit code: 0 = ผ่านทุก check, 1 = มี check ที่ไม่ผ่าน
+"""
+
+import os
+import io
+import sys
+import csv
+import argparse
+import tempfile
+import contextlib
+
+COURSE_COLUMNS = (
+    "รหัสวิชา",
+    "กลุ่มเรียน",
+    "ชั้นปี",
+    "ชื่อวิชาภาษาอังกฤษ",
+    "ลง",
+    "อาจารย์ผู้สอน",
+    "L-P-S",
+    "ประเภท",
+    "สัปดาห์",
+)
+ROOM_COLUMNS = ("อาคาร", "ห้อง", "จำนวนที่นั่ง")
+
+
+@contextlib.contextmanager
+def _workspace(courses, rooms):
+    """
+    โฟลเดอร์ชั่วคราวที่มี data/ (CSV จาก rows) และเป็น cwd ระหว่าง check
+    (ผลลัพธ์/run log ที่ solver เขียนลง output/ จึงไม่ปนกับของจริง)
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "data")
+        os.makedirs(data_dir)
+        for fname, columns, rows in (
+            ("Comsci_Test.csv", COURSE_COLUMNS, courses),
+            ("Room.csv", ROOM_COLUMNS, rooms),
+        ):
+            with open(os.path.join(data_dir, fname), "w", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        os.chdir(tmp_dir)
+        try:
+            yield data_dir
+        finally:
+            os.chdir(cwd)
+
+
+def _load(data_dir):
+    from src.data_loader import DataLoader
+    from src.presolve import reduce_data
+
+    return reduce_data(DataLoader(data_dir, interactive=False).load_data())
+
+
+def check_horizon_carry():
+    """
+    ห้องเหมือนกัน 2 ห้อง, X เรียนสัปดาห์คี่ / Y ทุกสัปดาห์, 2 สัปดาห์ (carry = "fix")
+    window 2 ตรึงห้องของ Y จาก window 1 -> symmetry cut ของห้องต้องไม่ทำให้ INFEASIBLE
+    """
+    from src.horizon import RollingHorizonSolver
+
+    courses = [
+        ("11", "1", "1", "X", "30", "A", "2-0-4", "ทฤษฎี", "คี่"),
+        ("12", "1", "2", "Y", "30", "B", "2-0-4", "ทฤษฎี", "ทุกสัปดาห์"),
+    ]
+    rooms = [("SC", "101", "40"), ("SC", "102", "40")]
+    with _workspace(courses, rooms) as data_dir:
+        data = _load(data_dir)
+        solver = RollingHorizonSolver(
+            data, config={"weeks": 2, "window_weeks": 1, "window_time": 10.0}
+        )
+        solver.config["carry"] = "fix"
+        solution = solver.solve()
+    statuses = [w["status"] for w in solver.windows]
+    ok = len(solution) == 3 and all(s in ("OPTIMAL", "FEASIBLE") for s in statuses)
+    return ok, f"windows {statuses}, {len(solution)}/3 activities"
+
+
+def check_objective_evaluator():
+    """
+    solve จนได้ OPTIMAL (relative_gap_limit = 0) แล้วเทียบค่ารายตระกูลของ objective
+    ที่ solver รายงาน (objective_breakdown) กับ ObjectiveEvaluator ที่คิดจาก solution
+    """
+    from src.model import TimetableModel
+    from src.solver import TimetableSolver
+    from src.objectives import ObjectiveEvaluator
+
+    courses = [
+        ("21", "1", "1", "A", "30", "A", "2-2-5", "ทฤษฎี", "ทุกสัปดาห์"),
+        ("21", "2", "1", "A", "30", "A", "2-2-5", "ทฤษฎี", "ทุกสัปดาห์"),
+        ("22", "1", "1", "B", "30", "B", "3-0-6", "ทฤษฎี", "ทุกสัปดาห์"),
+        ("23", "1", "2", "C", "45", "B", "2-0-4", "ทฤษฎี", "ทุกสัปดาห์"),
+    ]
+    rooms = [("SC", "101", "40"), ("SC", "102", "40"), ("SC", "201", "60")]
+    with _workspace(courses, rooms) as data_dir:
+        data = _load(data_dir)
+        timetable = TimetableModel(data)
+        model, all_vars = timetable.build_model()
+        solver = TimetableSolver(
+            model,
+            all_vars,
+            data,
+            params={"max_time_in_seconds": 60.0, "relative_gap_limit": 0.0},
+            objective_terms=timetable.constraints.objective_terms,
+        )
+        status = solver.run()
+        status_name = solver.solver.StatusName(status)
+        if status_name != "OPTIMAL":
+            return False, f"status {status_name}"
+        reported = {f: r["value"] for f, r in solver.objective_breakdown().items()}
+        evaluator = ObjectiveEvaluator(data, timetable.options)
+        evaluated = evaluator.evaluate(solver.extract_solution())
+    diffs = [
+        f"{family} {value} != {evaluated.get(family)}"
+        for family, value in reported.items()
+        if value != evaluated.get(family)
+    ]
+    return not diffs, "; ".join(diffs) or f"{len(reported)} families match"
+
+
+def check_two_phase_unknown_enrollment():
+    """
+    วิชาไม่ระบุจำนวนผู้ลง 14 วิชา แต่มีห้อง 2 ห้อง: capacity ใน phase 1 ต้องนับวิชาเหล่านี้ด้วย
+    ไม่งั้น phase 2 จัดห้องไม่ได้และต้องวน feedback -> ต้องสำเร็จตั้งแต่ iteration แรก
+    """
+    from src.decomposition import TwoPhaseSolver
+
+    courses = [
+        (str(10 + i), "1", str(i % 4 + 1), f"C{i}", "", f"T{i}", "3-0-6", "ทฤษฎี", "")
+        for i in range(14)
+    ]
+    rooms = [("SC", "101", "40"), ("SC", "102", "40")]
+    with _workspace(courses, rooms) as data_dir:
+        data = _load(data_dir)
+        solver = TwoPhaseSolver(
+            data, config={"phase1_time": 10.0, "phase2_time": 5.0, "max_processes": 1}
+        )
+        solver.solve()
+    iterations = len(solver.iterations)
+    ok = solver.solution is not None and iterations == 1
+    return (
+        ok,
+        f"{iterations} iteration(s), solution {'found' if solver.solution else 'missing'}",
+    )
+
+
+CHECKS = {
+    "horizon_carry": check_horizon_carry,
+    "objective_evaluator": check_objective_evaluator,
+    "two_phase_unknown_enrollment": check_two_phase_unknown_enrollment,
+}
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Timetable regression checks")
+    parser.add_argument("names", nargs="*", help=f"check ที่รัน: {', '.join(CHECKS)}")
+    parser.add_argument(
+        "--verbose", action="store_true", help="แสดง output ของ solver ระหว่าง check"
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check: {', '.join(unknown)}")
+    from src.config import SOLVER_PARAMS
+
+    # log ของ CP-SAT เขียนจาก C++ ตรงไปที่ stdout (redirect ของ Python ไม่ครอบคลุม)
+    SOLVER_PARAMS["log_search_progress"] = args.verbose
+
+    failed = 0
+    for name in args.names or sorted(CHECKS):
+        output = io.StringIO()
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(output))
+            try:
+                ok, detail = CHECKS[name]()
+            except Exception as exc:
+                ok, detail = False, f"{type(exc).__name__}: {exc}"
+        failed += not ok
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}: {detail}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,132 @@
+"""
+Replay: solve run ที่บันทึกไว้ (timetable --reproducible) ซ้ำด้วยข้อมูล/พารามิเตอร์เดิม
+แล้วเทียบ fingerprint และตารางกับผลเดิม
+วิธีใช้: timetable --replay V.12  (หรือ path ของโฟลเดอร์ run / ไฟล์ .csv / .md / .json)
+exit code: 0 = ได้ผลเดิม, 1 = ผลต่างจากเดิม, 2 = replay ไม่ได้
+"""
+
+import json
+import os
+
+from src.fingerprint import config_fingerprint, data_fingerprint
+from src.runs import RunArchive
+
+# คอลัมน์ที่เทียบระหว่างตารางเดิมกับตารางใหม่ (key = Activity_ID)
+COMPARE_COLUMNS = ("Start_Slot", "Room_ID")
+
+
+def find_telemetry(run, output_dir="output"):
+    """
+    path ของ telemetry (.json) ของ run: ชื่อ run (V.<n>), โฟลเดอร์ run หรือไฟล์ใน run
+    """
+    if os.path.isfile(run):
+        return os.path.splitext(run)[0] + ".json"
+    if not os.path.exists(run):
+        run = os.path.join(output_dir, "runs", run)
+    name = os.path.basename(os.path.normpath(run))
+    return os.path.join(run, f"Schdule_Result_{name}.json")
+
+
+def diff_schedules(old_path, new_path):
+    """
+    กิจกรรมที่เวลา/ห้องต่างกัน คืนค่า list ของ (Activity_ID, ค่าเดิม, ค่าใหม่)
+    ค่าเป็น dict ของ COMPARE_COLUMNS (None = ไม่มีกิจกรรมนี้ในตารางนั้น)
+    """
+    import pandas as pd
+
+    def rows(path):
+        df = pd.read_csv(path, dtype=str)
+        return {
+            row["Activity_ID"]: {col: row[col] for col in COMPARE_COLUMNS}
+            for row in df.to_dict("records")
+        }
+
+    old_rows = rows(old_path)
+    new_rows = rows(new_path)
+    diffs = []
+    for act_id in sorted(set(old_rows) | set(new_rows)):
+        old = old_rows.get(act_id)
+        new = new_rows.get(act_id)
+        if old != new:
+            diffs.append((act_id, old, new))
+    return diffs
+
+
+def replay(run, data_dir=None, output_dir="output"):
+    from src.main import main_program
+
+    telemetry_path = find_telemetry(run, output_dir)
+    if not os.path.exists(telemetry_path):
+        print(f"[Replay] Telemetry not found: {telemetry_path}")
+        return 2
+    with open(telemetry_path, encoding="utf-8") as f:
+        original = json.load(f)
+    repro = original.get("reproducibility")
+    if not repro:
+        print(
+            f"[Replay] {telemetry_path} was not a reproducible run "
+            "(re-run with --reproducible first)."
+        )
+        return 2
+
+    # input ปัจจุบันต่างจากตอน run เดิม -> แจ้งเตือน (ผลลัพธ์อาจต่างเพราะ input ไม่ใช่เพราะ solver)
+    data_dir = data_dir or repro["data_dir"]
+    fingerprints = repro["fingerprints"]
+    current = data_fingerprint(data_dir)
+    for fname in sorted(set(current) | set(fingerprints["data"])):
+        if current.get(fname) != fingerprints["data"].get(fname):
+            print(f"[Replay] WARNING: data file changed since the run: {fname}")
+    if config_fingerprint() != fingerprints["config"]:
+        print("[Replay] WARNING: config.py changed since the run.")
+
+    new_path = main_program(
+        mode="single",
+        data_dir=data_dir,
+        time_grid=repro["time_grid"],
+        exclude_codes=repro["exclude_codes"],
+        reproducible={
+            "params": repro["params"],
+            "polish_iterations": repro["polish_iterations"],
+        },
+    )
+
+    old_path = original.get("output_path")
+    checks = {}
+    new_repro = {}
+    if new_path:
+        with open(new_path[: -len(".csv")] + ".json", encoding="utf-8") as f:
+            new_repro = json.load(f).get("reproducibility", {})
+        checks["model fingerprint"] = new_repro["fingerprints"].get(
+            "model"
+        ) == fingerprints.get("model")
+    checks["schedule exported"] = bool(old_path) == bool(new_path)
+    diffs = []
+    if old_path and new_path:
+        if os.path.exists(old_path):
+            diffs = diff_schedules(old_path, new_path)
+            checks["schedule"] = new_repro.get("schedule") == repro.get("schedule")
+        else:
+            print(f"[Replay] Archived schedule missing: {old_path}")
+            checks["schedule"] = False
+
+    print("\n--- Replay ---")
+    print(f"Original: {telemetry_path}")
+    print(f"Replayed: {new_path or '-'}")
+    for name, ok in checks.items():
+        print(f"- {name}: {'same' if ok else 'DIFFERENT'}")
+    if diffs:
+        print(f"{len(diffs)} activities differ (Activity_ID: original -> replayed):")
+        for act_id, old, new in diffs[:20]:
+            print(f"  {act_id}: {old} -> {new}")
+
+    identical = all(checks.values()) and not diffs
+    print("Result: IDENTICAL" if identical else "Result: DIFFERENT")
+    if new_path:
+        RunArchive(output_dir).record(
+            "replay",
+            new_path,
+            source=telemetry_path,
+            identical=identical,
+            differing_activities=len(diffs),
+        )
+    return 0 if identical else 1
@@ -0,0 +1,67 @@
+import heapq
+
+from src.symmetry import group_identical_rooms
+
+
+def build_room_pools(rooms):
+    """
+    รวมห้องที่เหมือนกัน (ความจุ + feature) เป็น "room class" หนึ่งก้อน
+    คืนค่า (pool_rooms, members)
+    - pool_rooms: list ของห้องเสมือน ใช้แทน data["rooms"] ตอนสร้างโมเดล
+      (มี key "pool_size" = จำนวนห้องจริงในกลุ่ม)
+    - members: {pool_id: [room_id, ...]}
+    """
+    room_by_id = {r["id"]: r for r in rooms}
+    pool_rooms = []
+    members = {}
+    for idx, group in enumerate(group_identical_rooms(rooms)):
+        room_ids = group["rooms"]
+        if len(room_ids) == 1:
+            # ห้องเดี่ยวไม่ต้องรวม ใช้ id เดิม
+            pool_rooms.append(room_by_id[room_ids[0]])
+            continue
+        pool_id = f"POOL{idx}_cap{group['capacity']}"
+        pool = dict(room_by_id[room_ids[0]])
+        pool["id"] = pool_id
+        pool["ห้อง"] = pool_id
+        pool["pool_size"] = len(room_ids)
+        pool_rooms.append(pool)
+        members[pool_id] = room_ids
+    return pool_rooms, members
+
+
+def assign_pool_rooms(solution, members, durations, groups=None):
+    """
+    Post-pass: เลือกห้องจริงให้กิจกรรมที่ถูกจัดลง room class
+    ใช้ interval-graph colouring (เรียงตามเวลาเริ่ม แล้วหยิบห้องที่ว่าง)
+    ซึ่งใช้ห้องไม่เกินจำนวนที่ cumulative constraint รับประกันไว้
+    groups: {act_id: group_key} ถ้าห้องที่กลุ่มเดียวกันเคยใช้ยังว่าง จะเลือกห้องนั้นก่อน
+    """
+    groups = groups or {}
+    by_pool = {}
+    for act_id, sol in solution.items():
+        if sol["room"] in members:
+            by_pool.setdefault(sol["room"], []).append(act_id)
+
+    assigned = dict(solution)
+    for pool_id, act_ids in by_pool.items():
+        act_ids.sort(key=lambda a: solution[a]["start"])
+        free = list(members[pool_id])
+        busy = []  # heap ของ (end_slot, room_id)
+        last_room = {}
+        for act_id in act_ids:
+            start = solution[act_id]["start"]
+            while busy and busy[0][0] <= start:
+                free.append(heapq.heappop(busy)[1])
+            if not free:
+                # ไม่ควรเกิดถ้าคำตอบผ่าน cumulative constraint
+                raise ValueError(f"Room pool {pool_id} over capacity at slot {start}")
+
+            preferred = last_room.get(groups.get(act_id))
+            room_id = preferred if preferred in free else min(free)
+            free.remove(room_id)
+            heapq.heappush(busy, (start + durations[act_id], room_id))
+            if act_id in groups:
+                last_room[groups[act_id]] = room_id
+            assigned[act_id] = dict(solution[act_id], room=room_id)
+    return assigned
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# ชื่อไฟล์ผลลัพธ์แบบเดิม (output/Schdule_Result_V.<n>.csv) ใช้หาเลขเวอร์ชันเริ่มต้นครั้งแรก
+LEGACY_PREFIX = "Schdule_Result_V."
+
+
+@contextmanager
+def file_lock(path, timeout=30.0):
+    """
+    exclusive lock ข้าม process: flock (POSIX) หรือ lock file แบบ O_EXCL (Windows)
+    """
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    if fcntl is not None:
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        lock_path = path + ".excl"
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock: {lock_path}")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+
+def atomic_write_text(path, text):
+    """
+    เขียนไฟล์ชั่วคราวในโฟลเดอร์เดียวกันแล้ว os.replace (ผู้อ่านไม่เห็นไฟล์ที่เขียนไม่ครบ)
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class RunArchive:
+    """
+    ที่เก็บผลลัพธ์แบบมีเวอร์ชัน ใช้พร้อมกันหลาย process ได้
+    output/
+      manifest.jsonl   index ของ artifact ทุกไฟล์ (1 บรรทัด/ไฟล์) append ภายใต้ lock
+      runs/V.<n>/      artifact ของ run n (csv, run log .md, telemetry .json)
+    จองเลข run ด้วย os.mkdir (สร้างใหม่เท่านั้น) -> สอง run ไม่มีทางได้โฟลเดอร์เดียวกัน
+    เลขล่าสุดเก็บใน runs/.last_version จึงไม่ต้อง list โฟลเดอร์ทุกครั้ง
+    """
+
+    def __init__(self, root="output"):
+        self.root = root
+        self.runs_dir = os.path.join(root, "runs")
+        self.manifest_path = os.path.join(root, "manifest.jsonl")
+        self.lock_path = os.path.join(root, ".manifest.lock")
+        self.counter_path = os.path.join(self.runs_dir, ".last_version")
+
+    def allocate(self):
+        """
+        จอง run ใหม่ คืนค่า (version, run_dir)
+        """
+        os.makedirs(self.runs_dir, exist_ok=True)
+        with file_lock(self.lock_path):
+            version = self._last_version() + 1
+            while True:
+                run_dir = os.path.join(self.runs_dir, f"V.{version}")
+                try:
+                    os.mkdir(run_dir)
+                    break
+                except FileExistsError:
+                    version += 1
+            atomic_write_text(self.counter_path, str(version))
+        return version, run_dir
+
+    def record(self, kind, path, **fields):
+        """
+        เพิ่ม artifact ลง manifest (kind เช่น "schedule", "log", "scenario_batch")
+        """
+        entry = {
+            "run": os.path.basename(os.path.dirname(path)),
+            "kind": kind,
+            "path": path,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return entry
+
+    def entries(self, kind=None):
+        if not os.path.exists(self.manifest_path):
+            return []
+        entries = []
+        with open(self.manifest_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # บรรทัดที่เขียนไม่ครบ (process ถูก kill) ข้ามไป
+                    continue
+                if kind is None or entry.get("kind") == kind:
+                    entries.append(entry)
+        return entries
+
+    def latest(self, kind="schedule"):
+        """
+        path ของ artifact ล่าสุดตามชนิดที่ยังมีไฟล์อยู่ (None ถ้าไม่มี)
+        """
+        for entry in reversed(self.entries(kind)):
+            if os.path.exists(entry["path"]):
+                return entry["path"]
+        return None
+
+    def _last_version(self):
+        try:
+            with open(self.counter_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            pass
+        # ครั้งแรก: ต่อเลขจากไฟล์แบบเดิมใน output/ (list โฟลเดอร์ครั้งเดียว)
+        versions = [0]
+        if os.path.isdir(self.root):
+            for fname in os.listdir(self.root):
+                if fname.startswith(LEGACY_PREFIX) and fname.endswith(".csv"):
+                    num_str = fname[len(LEGACY_PREFIX) : -4]
+                    if num_str.isdigit():
+                        versions.append(int(num_str))
+        return max(versions)
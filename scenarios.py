@@ -0,0 +1,300 @@
+import copy
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import SCENARIOS
+from src.model import TimetableModel
+from src.presolve import reduce_data
+from src.runs import RunArchive, atomic_write_text
+from src.solver import TimetableSolver
+
+
+def _solve_scenario(name, data, options, params):
+    """
+    solve scenario เดียวใน worker process
+    คืนค่า status, objective และค่าของ objective แต่ละกลุ่ม (TimetableSolver.objective_breakdown)
+    """
+    start_ts = time.time()
+    data = reduce_data(data)
+    timetable_model = TimetableModel(data, options=options)
+    model, all_vars = timetable_model.build_model()
+    solver = TimetableSolver(
+        model,
+        all_vars,
+        data,
+        params=params,
+        objective_terms=timetable_model.constraints.objective_terms,
+    )
+    status = solver.run()
+
+    result = {
+        "name": name,
+        "status": solver.solver.StatusName(status),
+        "objective": None,
+        "bound": None,
+        "components": {},
+        "courses": len(data["courses"]),
+        "rooms": len(data["rooms"]),
+        "activities": sum(len(c.get("components", [])) for c in data["courses"]),
+        "wall_time": round(time.time() - start_ts, 2),
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.solver.ObjectiveValue()
+        result["bound"] = solver.solver.BestObjectiveBound()
+        for family, row in solver.objective_breakdown().items():
+            result["components"][family] = row["value"]
+    return result
+
+
+class ScenarioRunner:
+    """
+    What-if planning: รันหลาย scenario ที่เป็น "delta" จากข้อมูลฐานชุดเดียว
+    โหลดข้อมูลฐานครั้งเดียว แล้วแก้ใน memory (ไม่อ่าน CSV ใหม่) ต่อ scenario
+    แล้ว solve แบบขนานใน process pool และเขียนตารางเปรียบเทียบ objective แต่ละกลุ่ม
+
+    รูปแบบไฟล์ scenario (JSON):
+    {
+      "time_budget": 120,
+      "scenarios": [
+        {"name": "close_SC08", "remove_buildings": ["SC08"]},
+        {"name": "more_sections", "add_sections": [{"subject": "05506003", "count": 2}]},
+        {"name": "bigger_201", "room_capacity": {"SC08_201": 80}},
+        {"name": "hour_slots", "slot_minutes": 60, "time_budget": 60}
+      ]
+    }
+    scenario ที่ไม่มี delta (เช่น {"name": "base"}) ใช้เป็นตัวเทียบในตาราง
+    delta ที่รองรับ: remove_rooms, remove_buildings, room_capacity, add_rooms,
+    remove_courses (รหัสวิชา), add_sections, slot_minutes, model (MODEL_OPTIONS)
+    """
+
+    def __init__(self, loader, base_data, config=None):
+        # loader ต้องเป็นตัวที่ใช้โหลด base_data (ใช้ alias ชื่ออาจารย์/ตารางเวลาว่างเดิม)
+        self.loader = loader
+        self.base_data = base_data
+        self.config = dict(SCENARIOS)
+        if config:
+            self.config.update(config)
+        self.results = []
+
+    def load_file(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        if isinstance(spec, list):
+            return spec
+        if "time_budget" in spec:
+            self.config["time_budget"] = spec["time_budget"]
+        return spec.get("scenarios", [])
+
+    def apply(self, scenario):
+        """
+        สร้างข้อมูลของ scenario จาก base_data + delta
+        """
+        data = copy.deepcopy(self.base_data)
+        loader = copy.copy(self.loader)
+        courses_changed = False
+
+        if scenario.get("slot_minutes"):
+            self._apply_slot_minutes(data, loader, int(scenario["slot_minutes"]))
+
+        # ----- ห้อง -----
+        removed_rooms = set(scenario.get("remove_rooms", []))
+        buildings = {str(b).strip() for b in scenario.get("remove_buildings", [])}
+        data["rooms"] = [
+            r
+            for r in data["rooms"]
+            if r["id"] not in removed_rooms
+            and str(r.get("อาคาร", "")).strip() not in buildings
+        ]
+        for r in data["rooms"]:
+            if r["id"] in scenario.get("room_capacity", {}):
+                r["จำนวนที่นั่ง"] = str(scenario["room_capacity"][r["id"]])
+        for new_room in scenario.get("add_rooms", []):
+            room = dict(new_room)
+            if "id" not in room:
+                building = str(room.get("อาคาร", "")).strip()
+                room_no = str(room.get("ห้อง", "")).strip()
+                room["id"] = f"{building}_{room_no}" if building else room_no
+            room["จำนวนที่นั่ง"] = str(room.get("จำนวนที่นั่ง", 0))
+            data["rooms"].append(room)
+
+        # ----- วิชา -----
+        removed_codes = {str(x).strip() for x in scenario.get("remove_courses", [])}
+        if removed_codes:
+            data["courses"] = [
+                c
+                for c in data["courses"]
+                if str(c.get("รหัสวิชา", "")).strip() not in removed_codes
+            ]
+            courses_changed = True
+        for spec in scenario.get("add_sections", []):
+            self._add_sections(data, loader, spec)
+            courses_changed = True
+
+        if courses_changed:
+            course_ids = {c["id"] for c in data["courses"]}
+            if data.get("cohort_source") == "inferred":
+                data["cohorts"] = loader._build_cohorts(data["courses"])
+            else:
+                data["cohorts"] = {
+                    cohort_id: [c_id for c_id in ids if c_id in course_ids]
+                    for cohort_id, ids in data.get("cohorts", {}).items()
+                }
+            data["course_catalog"] = loader._build_course_catalog(data["courses"])
+        return data
+
+    def run(self, scenarios):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        max_processes = self.config.get("max_processes") or os.cpu_count() or 1
+        processes = max(1, min(max_processes, len(scenarios)))
+        # แบ่ง core ให้แต่ละ scenario (รวมแล้วไม่เกินจำนวน core)
+        workers = max(1, (os.cpu_count() or 1) // processes)
+
+        jobs = []
+        for idx, scenario in enumerate(scenarios):
+            name = scenario.get("name", f"scenario_{idx + 1}")
+            print(f"[Scenario] preparing {name}")
+            data = self.apply(scenario)
+            params = {
+                "max_time_in_seconds": float(
+                    scenario.get("time_budget", self.config["time_budget"])
+                ),
+                "log_search_progress": False,
+                "num_search_workers": workers,
+            }
+            jobs.append((name, data, scenario.get("model", {}), params))
+
+        self.results = []
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_solve_scenario, *job) for job in jobs]
+            for future in futures:
+                result = future.result()
+                self.results.append(result)
+                print(
+                    f"[Scenario] {result['name']}: {result['status']} "
+                    f"objective={result['objective']} ({result['wall_time']}s)"
+                )
+
+        lines = self._comparison_table()
+        print("\n" + "\n".join(lines))
+        self._write_log(start_dt, time.time() - start_ts, scenarios, lines)
+        return self.results
+
+    def _apply_slot_minutes(self, data, loader, slot_minutes):
+        """
+        เปลี่ยนความยาวคาบ: สร้าง time slots ใหม่ และคำนวณ duration_slots / เวลาว่างอาจารย์ใหม่
+        """
+        loader.slot_minutes = slot_minutes
+        data["time_slots"] = loader._generate_time_slots()
+        data["time_config"]["slot_minutes"] = slot_minutes
+        for c in data["courses"]:
+            c["components"] = loader._build_components(
+                c["uid"], c.get("l_hours"), c.get("p_hours"), c.get("type_hint")
+            )
+        if loader.availability_table is not None:
+            availability, preferences = loader._compile_availability(
+                loader.availability_table, data["time_slots"]
+            )
+            data["teacher_availability"] = availability
+            data["teacher_preferences"] = preferences
+
+    def _add_sections(self, data, loader, spec):
+        """
+        เพิ่มกลุ่มเรียนโดย copy กลุ่มเรียนสุดท้ายของวิชานั้น
+        spec: {"subject": รหัสวิชา, "count": จำนวน, "enrollment": (ไม่บังคับ), "teachers": (ไม่บังคับ)}
+        """
+        code = str(spec["subject"]).strip()
+        existing = [
+            c for c in data["courses"] if str(c.get("รหัสวิชา", "")).strip() == code
+        ]
+        if not existing:
+            print(f"Warning: add_sections: subject {code} not found")
+            return
+
+        template = existing[-1]
+        sections = [loader._to_int(c.get("กลุ่มเรียน")) for c in existing]
+        next_section = max(sections + [0]) + 1
+        for k in range(int(spec.get("count", 1))):
+            section = str(next_section + k)
+            year = str(template.get("ชั้นปี", "")).strip()
+            uid = f"{code}_{section}"
+            if year:
+                uid = f"{uid}_Y{year}"
+
+            course = copy.deepcopy(template)
+            course["กลุ่มเรียน"] = section
+            course["id"] = uid
+            course["uid"] = uid
+            if "enrollment" in spec:
+                course["ลง"] = str(spec["enrollment"])
+            if "teachers" in spec:
+                course["teacher_list"] = list(spec["teachers"])
+                for teacher in course["teacher_list"]:
+                    if teacher not in data["teachers"]:
+                        data["teachers"].append(teacher)
+            course["components"] = loader._build_components(
+                uid,
+                course.get("l_hours"),
+                course.get("p_hours"),
+                course.get("type_hint"),
+            )
+            data["courses"].append(course)
+
+    def _comparison_table(self):
+        families = []
+        for result in self.results:
+            for family in result["components"]:
+                if family not in families:
+                    families.append(family)
+
+        header = ["scenario", "status", "objective", "bound"] + families
+        header += ["courses", "rooms", "activities", "time (s)"]
+        lines = [
+            "## Scenario Comparison",
+            "| " + " | ".join(header) + " |",
+            "|" + "---|" * len(header),
+        ]
+        for result in self.results:
+            row = [
+                result["name"],
+                result["status"],
+                result["objective"],
+                result["bound"],
+            ]
+            row += [result["components"].get(family, "-") for family in families]
+            row += [
+                result["courses"],
+                result["rooms"],
+                result["activities"],
+                result["wall_time"],
+            ]
+            lines.append("| " + " | ".join(str(x) for x in row) + " |")
+        return lines
+
+    def _write_log(self, start_dt, elapsed_sec, scenarios, table_lines):
+        # จอง run ของตัวเอง (output/runs/V.<n>/) กันชนกับ run อื่นที่เขียนพร้อมกัน
+        archive = RunArchive("output")
+        version, run_dir = archive.allocate()
+        log_path = os.path.join(run_dir, f"Scenario_Batch_V.{version}.md")
+
+        lines = [
+            "# Scenario Batch Log",
+            "",
+            f"- Start: {start_dt.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"- Elapsed (s): {elapsed_sec:.6f}",
+            f"- Scenarios: {len(scenarios)}",
+            "",
+        ]
+        lines.extend(table_lines)
+        lines.extend(["", "## Scenario Definitions", "```json"])
+        lines.append(json.dumps(scenarios, ensure_ascii=False, indent=2))
+        lines.append("```")
+
+        atomic_write_text(log_path, "\n".join(lines))
+        archive.record("scenario_batch", log_path, scenarios=len(scenarios))
+        print(f"Saved scenario comparison to: {log_path}")
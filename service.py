@@ -0,0 +1,451 @@
+"""
+Local scheduling service (HTTP/JSON, asyncio, ไม่ต้องใช้ internet / library เพิ่ม)
+วิธีใช้: timetable-service --port 8765  (หรือ python -m src.service)
+
+POST   /jobs                {"data_dir", "params", "model", "export"} -> {"job_id"}
+GET    /jobs                รายการ job ทั้งหมด
+GET    /jobs/<id>           สถานะ + คำตอบล่าสุด
+GET    /jobs/<id>/stream    คำตอบระหว่างทางแบบ NDJSON (chunked) จนกว่า job จะจบ
+DELETE /jobs/<id>           ยกเลิก job (StopSearch)
+GET    /health
+"""
+
+import json
+import uuid
+import asyncio
+import argparse
+import threading
+from queue import Empty
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+from src.config import SERVICE
+from src.fingerprint import data_hash, missing_data_files
+from src.main import default_data_dir
+
+# ortools / pandas / numpy ถูก import ใน worker (_get_model, _run_job) เท่านั้น
+# process หลักของ service และ --help จึงเริ่มเร็ว
+
+# cache ภายใน worker process (process ของ pool อยู่ยาว จึงใช้ซ้ำข้าม request ได้)
+# key = fingerprint.data_hash ของไฟล์ข้อมูล
+_data_cache = OrderedDict()
+_model_cache = OrderedDict()
+
+
+def _cache_put(cache, key, value, cache_size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > cache_size:
+        cache.popitem(last=False)
+
+
+def _get_model(data_dir, digest, options, cache_size):
+    """
+    คืนค่า (timetable_model, ใช้จาก cache หรือไม่) โดยใช้ key = hash ข้อมูล + options
+    """
+    model_key = (digest, json.dumps(options, sort_keys=True))
+    if model_key in _model_cache:
+        _model_cache.move_to_end(model_key)
+        return _model_cache[model_key], True
+
+    from src.data_loader import DataLoader
+    from src.model import TimetableModel
+    from src.presolve import reduce_data
+
+    if digest in _data_cache:
+        _data_cache.move_to_end(digest)
+        data = _data_cache[digest]
+    else:
+        data = reduce_data(DataLoader(data_dir, interactive=False).load_data())
+        _cache_put(_data_cache, digest, data, cache_size)
+
+    # โมเดลแต่ละชุดเขียนข้อมูลเพิ่มลง data (room_pools, var_names) จึงใช้ copy แยกกัน
+    timetable_model = TimetableModel(dict(data), options=options)
+    timetable_model.build_model()
+    _cache_put(_model_cache, model_key, timetable_model, cache_size)
+    return timetable_model, False
+
+
+def _stream_callback(job_id, all_vars, events):
+    """
+    callback ที่ส่งคำตอบระหว่างทางกลับไปที่ service ผ่าน queue
+    (สร้าง class ตอนเรียก เพราะ cp_model ถูก import ใน worker เท่านั้น)
+    """
+    from ortools.sat.python import cp_model
+
+    class StreamCallback(cp_model.CpSolverSolutionCallback):
+        def __init__(self, job_id, all_vars, events):
+            super().__init__()
+            self.job_id = job_id
+            self.all_vars = all_vars
+            self.events = events
+            self.count = 0
+
+        def on_solution_callback(self):
+            self.count += 1
+            solution = {}
+            for c_vars in self.all_vars.values():
+                for act_id, act in c_vars["activities"].items():
+                    room = None
+                    for r_id, room_vars in act["rooms"].items():
+                        if self.Value(room_vars["is_present"]):
+                            room = r_id
+                            break
+                    solution[act_id] = {"start": self.Value(act["start"]), "room": room}
+            self.events.put(
+                (
+                    self.job_id,
+                    {
+                        "type": "solution",
+                        "index": self.count,
+                        "objective": self.ObjectiveValue(),
+                        "bound": self.BestObjectiveBound(),
+                        "wall_time": self.WallTime(),
+                        "solution": solution,
+                    },
+                )
+            )
+
+    return StreamCallback(job_id, all_vars, events)
+
+
+def _run_job(job_id, request, digest, events, cancel_event, cache_size):
+    """
+    รันใน worker process (ดู _solve_job) แล้วส่ง event "finished" เป็นตัวสุดท้ายเสมอ
+    event กับผลลัพธ์ของ future มาคนละช่องทาง service จึงรอ event นี้ก่อนจบ job
+    (ไม่งั้น job อาจ done ก่อนคำตอบสุดท้ายใน queue ถูกนำเข้า job["events"])
+    """
+    try:
+        return _solve_job(job_id, request, digest, events, cancel_event, cache_size)
+    finally:
+        events.put((job_id, {"type": "finished"}))
+
+
+def _solve_job(job_id, request, digest, events, cancel_event, cache_size):
+    """
+    โหลด/สร้างโมเดล (หรือใช้จาก cache) แล้ว solve
+    cancel_event ถูกเฝ้าโดย thread แยก แล้วเรียก StopSearch เมื่อถูกยกเลิก
+    """
+    from ortools.sat.python import cp_model
+    from src.solver import TimetableSolver
+
+    timetable_model, cached = _get_model(
+        request["data_dir"], digest, request.get("model", {}), cache_size
+    )
+    data = timetable_model.data
+    if cancel_event.is_set():
+        return {"status": "UNKNOWN", "cancelled": True, "objective": None}
+    events.put((job_id, {"type": "running", "model_cached": cached}))
+
+    params = {
+        "max_time_in_seconds": SERVICE["default_time"],
+        "log_search_progress": False,
+    }
+    params.update(request.get("params", {}))
+    solver = TimetableSolver(
+        timetable_model.model, timetable_model.all_vars, data, params=params
+    )
+
+    done = threading.Event()
+
+    def watch_cancel():
+        while not done.is_set():
+            if cancel_event.wait(0.2):
+                solver.solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch_cancel, daemon=True)
+    watcher.start()
+    try:
+        callback = _stream_callback(job_id, timetable_model.all_vars, events)
+        status = solver.run(callback)
+    finally:
+        done.set()
+        watcher.join()
+
+    result = {
+        "status": solver.solver.StatusName(status),
+        "cancelled": cancel_event.is_set(),
+        "objective": None,
+        "wall_time": solver.solver.WallTime(),
+        "solution": None,
+        "output_path": None,
+    }
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result["objective"] = solver.solver.ObjectiveValue()
+        result["solution"] = solver.extract_solution()
+        if request.get("export"):
+            solver.export_solution(result["solution"])
+            result["output_path"] = solver.last_output_path
+    return result
+
+
+class SchedulingService:
+    """
+    HTTP/JSON service แบบ asyncio (เขียนบน asyncio.start_server ไม่ใช้ library ภายนอก)
+    - solve job รันใน ProcessPoolExecutor (จำกัดจำนวน process)
+    - event ระหว่างทางส่งผ่าน Manager().Queue() แล้วกระจายให้ผู้ที่ stream อยู่
+    - ยกเลิกผ่าน Manager().Event() -> StopSearch ใน worker
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(SERVICE)
+        if config:
+            self.config.update(config)
+        self.jobs = {}
+        self.manager = None
+        self.events = None
+        self.pool = None
+        self.default_data_dir = default_data_dir()
+
+    async def serve(self):
+        self.manager = Manager()
+        self.events = self.manager.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.config["max_processes"])
+        pump = asyncio.create_task(self._pump_events())
+
+        server = await asyncio.start_server(
+            self._handle, self.config["host"], self.config["port"]
+        )
+        print(
+            f"Scheduling service listening on "
+            f"http://{self.config['host']}:{self.config['port']}"
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            pump.cancel()
+            for job in self.jobs.values():
+                job["cancel"].set()
+            self.pool.shutdown(wait=True)
+            self.manager.shutdown()
+
+    # ---------- jobs ----------
+
+    def submit(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("request body must be a JSON object")
+        request = dict(request)
+        request.setdefault("data_dir", self.default_data_dir)
+        # ตรวจก่อนรับ job (ไม่งั้น job จะ solve ข้อมูลว่างแล้วจบแบบ done)
+        if not isinstance(request["data_dir"], str):
+            raise ValueError("data_dir must be a string")
+        missing = missing_data_files(request["data_dir"])
+        if missing:
+            raise ValueError(
+                f"data_dir {request['data_dir']} is missing: {', '.join(missing)}"
+            )
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "data_hash": data_hash(request["data_dir"]),
+            "request": request,
+            "events": [],
+            "best": None,
+            "result": None,
+            "cancel": self.manager.Event(),
+            "changed": asyncio.Condition(),
+            # set เมื่อ _pump_events เห็น event "finished" ของ job นี้
+            "drained": asyncio.Event(),
+        }
+        self.jobs[job_id] = job
+        future = self.pool.submit(
+            _run_job,
+            job_id,
+            request,
+            job["data_hash"],
+            self.events,
+            job["cancel"],
+            self.config["cache_size"],
+        )
+        asyncio.ensure_future(self._wait_job(job, asyncio.wrap_future(future)))
+        return job
+
+    def cancel(self, job):
+        job["cancel"].set()
+        if job["status"] in ("queued", "running"):
+            job["status"] = "cancelling"
+
+    async def _wait_job(self, job, future):
+        try:
+            result = await future
+            # worker ส่ง "finished" ก่อน return แล้ว รอให้ event ก่อนหน้าทั้งหมดถูกนำเข้าก่อน
+            await job["drained"].wait()
+            job["result"] = result
+            job["status"] = "cancelled" if result["cancelled"] else "done"
+        except Exception as e:
+            job["result"] = {"error": str(e)}
+            job["status"] = "failed"
+        await self._notify(job)
+
+    async def _pump_events(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, event = await loop.run_in_executor(None, self._next_event)
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            if event is None:
+                continue
+            if event["type"] == "finished":
+                job["drained"].set()
+                continue
+            if event["type"] == "running" and job["status"] == "queued":
+                job["status"] = "running"
+            if event["type"] == "solution":
+                job["best"] = event
+            job["events"].append(event)
+            await self._notify(job)
+
+    def _next_event(self):
+        # ใช้ timeout เพื่อให้ thread ที่รอ queue จบได้ตอนปิด service
+        try:
+            return self.events.get(timeout=0.5)
+        except Empty:
+            return None, None
+
+    async def _notify(self, job):
+        async with job["changed"]:
+            job["changed"].notify_all()
+
+    def _summary(self, job, with_solution=False):
+        best = job["best"] or {}
+        summary = {
+            "job_id": job["id"],
+            "status": job["status"],
+            "data_hash": job["data_hash"],
+            "solutions": sum(1 for e in job["events"] if e["type"] == "solution"),
+            "objective": best.get("objective"),
+            "bound": best.get("bound"),
+        }
+        if job["result"]:
+            summary["result"] = {
+                k: v
+                for k, v in job["result"].items()
+                if with_solution or k != "solution"
+            }
+        return summary
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path, body, writer)
+        except (ValueError, TypeError, asyncio.IncompleteReadError) as e:
+            # JSON ผิด / body ไม่ใช่ object / client ตัดการเชื่อมต่อกลาง request
+            try:
+                await self._send_json(writer, 400, {"error": str(e)})
+            except ConnectionError:
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        header = await reader.readuntil(b"\r\n\r\n")
+        lines = header.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0].rstrip("/"), body
+
+    async def _route(self, method, path, body, writer):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"]:
+            await self._send_json(writer, 200, {"ok": True, "jobs": len(self.jobs)})
+        elif parts == ["jobs"] and method == "GET":
+            await self._send_json(
+                writer, 200, [self._summary(job) for job in self.jobs.values()]
+            )
+        elif parts == ["jobs"] and method == "POST":
+            request = json.loads(body or b"{}")
+            job = self.submit(request)
+            await self._send_json(writer, 202, {"job_id": job["id"]})
+        elif len(parts) >= 2 and parts[0] == "jobs" and parts[1] in self.jobs:
+            job = self.jobs[parts[1]]
+            if len(parts) == 2 and method == "GET":
+                await self._send_json(writer, 200, self._summary(job, True))
+            elif len(parts) == 2 and method == "DELETE":
+                self.cancel(job)
+                await self._send_json(writer, 202, self._summary(job))
+            elif parts[2:] == ["stream"] and method == "GET":
+                await self._stream(job, writer)
+            else:
+                await self._send_json(writer, 405, {"error": "method not allowed"})
+        else:
+            await self._send_json(writer, 404, {"error": "not found"})
+
+    async def _stream(self, job, writer):
+        """
+        ส่ง event ทั้งหมดของ job เป็น NDJSON แบบ chunked จนกว่า job จะจบ
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        sent = 0
+        while True:
+            while sent < len(job["events"]):
+                await self._send_chunk(writer, job["events"][sent])
+                sent += 1
+            if job["status"] in ("done", "cancelled", "failed"):
+                break
+            async with job["changed"]:
+                await job["changed"].wait()
+        await self._send_chunk(writer, {"type": "end", **self._summary(job)})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _send_chunk(self, writer, payload):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer, code, payload):
+        reasons = {
+            200: "OK",
+            202: "Accepted",
+            400: "Bad Request",
+            404: "Not Found",
+            405: "Method Not Allowed",
+        }
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {code} {reasons.get(code, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii") + data
+        )
+        await writer.drain()
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Local timetable scheduling service")
+    parser.add_argument("--host", default=SERVICE["host"])
+    parser.add_argument("--port", type=int, default=SERVICE["port"])
+    parser.add_argument("--max-processes", type=int, default=SERVICE["max_processes"])
+    args = parser.parse_args(argv)
+
+    service = SchedulingService(
+        {"host": args.host, "port": args.port, "max_processes": args.max_processes}
+    )
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        print("Service stopped.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,42 +1,138 @@
 from ortools.sat.python import cp_model
-import pandas as pd
+import json
 import os
 from datetime import datetime
 import time
+from src.config import POLISH, SOLVER_PARAMS
+from src.domains import day_label
+from src.fingerprint import file_digest
+from src.objectives import (
+    ObjectiveEvaluator,
+    breakdown_lines,
+    flatten_terms,
+    term_values,
+    weighted_breakdown,
+)
+from src.room_pools import assign_pool_rooms
+from src.runs import RunArchive, atomic_write_text
 
 
 class TimetableSolver:
-    def __init__(self, model, all_vars, data):
+    def __init__(self, model, all_vars, data, params=None, objective_terms=None):
         self.model = model
         self.all_vars = all_vars  # Structure ใหม่
         self.data = data
         self.solver = cp_model.CpSolver()
         self.last_output_path = None
+        # penalty แต่ละกลุ่ม (Constraints.objective_terms) ใช้แยก objective ใน run log
+        self.objective_terms = objective_terms or {}
+        self._flat_terms = None
 
-    def solve(self):
+        # พารามิเตอร์ solver (ค่าเริ่มต้นจาก config.SOLVER_PARAMS)
+        self.params = dict(SOLVER_PARAMS)
+        if params:
+            self.params.update(params)
+
+    def configure(self):
+        # ตั้งค่า Solver จาก self.params
+        for key, value in self.params.items():
+            setattr(self.solver.parameters, key, value)
+
+    def run(self, callback=None):
+        """
+        Solve อย่างเดียว (ไม่ export / ไม่เขียน log) ใช้ซ้ำใน portfolio
+        callback: CpSolverSolutionCallback (ไม่บังคับ) รับคำตอบระหว่างทาง
+        """
+        self.configure()
+        return self.solver.Solve(self.model, callback)
+
+    def solve(self, fallback=None, options=None):
+        """
+        fallback: คำตอบสำรอง {act_id: {"start", "room"}} (เช่นจาก heuristic.GreedyScheduler)
+        ใช้ export เมื่อ solver หมดเวลาโดยยังไม่เจอคำตอบ
+        options: ตัวเลือกของโมเดล (TimetableModel.options) ใช้ประเมิน objective ตอน polish
+        """
         start_ts = time.time()
         start_dt = datetime.now()
-        # ตั้งค่า Solver
-        self.solver.parameters.max_time_in_seconds = 600.0
-        self.solver.parameters.log_search_progress = True
-        self.solver.parameters.relative_gap_limit = 0.03
-        # self.solver.parameters.random_seed = 42
-
-        # เพิ่มจำนวน Thread เพื่อช่วยประมวลผล (ถ้าเครื่องมีหลาย Core)
-        self.solver.parameters.num_search_workers = 8
 
         print("--- Solving Model ---")
-        status = self.solver.Solve(self.model)
+        status = self.run()
         end_ts = time.time()
         end_dt = datetime.now()
+        memory = self.data.get("memory")
+        if memory is not None:
+            memory.record("solve")
 
         self.analyze_status(status)
-        self._write_run_log(status, start_dt, end_dt, end_ts - start_ts)
 
+        extra_lines = []
+        telemetry = {}
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            breakdown = self.objective_breakdown()
+            if breakdown:
+                extra_lines += breakdown_lines(breakdown)
+                telemetry["breakdown"] = breakdown
+
+        if status == cp_model.FEASIBLE and POLISH["enabled"]:
+            # หมดเวลาก่อนพิสูจน์ optimal -> local search ต่อ (ดู polish.py / config.POLISH)
+            from src.polish import SolutionPolisher
+
+            # โหมด reproducible: จำกัดด้วยจำนวนรอบแทนเวลา
+            repro = self.data.get("reproducibility")
+            config = {"iterations": repro["polish_iterations"]} if repro else None
+            polisher = SolutionPolisher(
+                self.data, self.extract_solution(), config=config, options=options
+            )
+            self.export_solution(polisher.run())
+            extra_lines += ["", "## Polish"]
+            extra_lines.extend(f"- {k}: {v}" for k, v in polisher.report.items())
+            extra_lines += [""] + breakdown_lines(
+                polisher.breakdown(), "## Objective Breakdown (polished)"
+            )
+            telemetry["polish"] = polisher.report
+            telemetry["polished_breakdown"] = polisher.breakdown()
+        elif status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
             self.export_solution()
         elif status == cp_model.INFEASIBLE:
             self.report_infeasibility()
+        elif fallback:
+            print("Solver found no solution in time -> exporting fallback schedule.")
+            self.export_solution(fallback)
+            breakdown = ObjectiveEvaluator(self.data, options).evaluate(fallback)
+            breakdown = weighted_breakdown(breakdown)
+            extra_lines = [
+                "## Fallback",
+                f"- exported fallback schedule ({len(fallback)} activities)",
+                "",
+            ] + breakdown_lines(breakdown, "## Objective Breakdown (fallback)")
+            telemetry["fallback_breakdown"] = breakdown
+
+        if memory is not None:
+            memory.record("export")
+        self._write_run_log(
+            status, start_dt, end_dt, end_ts - start_ts, extra_lines, telemetry
+        )
+        return status
+
+    def objective_breakdown(self):
+        """
+        ค่าและน้ำหนักของ penalty แต่ละกลุ่มจากคำตอบล่าสุด
+        คำนวณจาก solution vector ของ response ตาม index ตัวแปร (ไม่วน solver.Value)
+        คืนค่า {family: {"value", "weight", "weighted"}} หรือ {} ถ้าไม่มี objective_terms
+        """
+        if not self.objective_terms:
+            return {}
+        if self._flat_terms is None:
+            self._flat_terms = flatten_terms(self.objective_terms) or {}
+        if self._flat_terms:
+            values = term_values(self._flat_terms, self.solver.ResponseProto().solution)
+        else:
+            # ortools รุ่นเก่า: ถามค่าทีละ family (ช้ากว่าแต่ได้ค่าเดียวกัน)
+            values = {
+                family: expr if isinstance(expr, int) else self.solver.Value(expr)
+                for family, expr in self.objective_terms.items()
+            }
+        return weighted_breakdown(values)
 
     def analyze_status(self, status):
         print("\n--- Solver Status ---")
@@ -51,31 +147,64 @@ class TimetableSolver:
         print(f"Conflicts: {self.solver.NumConflicts()}")
         print(f"Wall Time: {self.solver.WallTime()} s")
 
-    def export_solution(self):
+    def extract_solution(self):
+        """
+        ดึงคำตอบจาก solver ออกมาเป็น dict ธรรมดา (ส่งข้าม process ได้)
+        คืนค่า {act_id: {"start": slot, "room": room_id}}
+        """
+        solution = {}
+        durations = {}
+        for c_vars in self.all_vars.values():
+            for act_id, act in c_vars["activities"].items():
+                # หาว่าสอนห้องไหน (วนดูว่าห้องไหนมีค่า presence == 1)
+                assigned_room = "Unassigned"
+                for r_id, room_vars in act["rooms"].items():
+                    if self.solver.Value(room_vars["is_present"]) == 1:
+                        assigned_room = r_id
+                        break
+                solution[act_id] = {
+                    "start": self.solver.Value(act["start"]),
+                    "room": assigned_room,
+                }
+                durations[act_id] = act["duration"]
+
+        # โหมด pool: คำตอบเป็น room class -> เลือกห้องจริงด้วย interval colouring
+        # (ถ้ากลุ่มวิชาเดียวกันเคยใช้ห้องไหนและห้องนั้นว่าง จะเลือกห้องเดิมก่อน)
+        members = self.data.get("room_pools")
+        if members:
+            groups = {}
+            for c in self.data["courses"]:
+                subject_code = str(c.get("รหัสวิชา", "")).strip()
+                for comp in c.get("components", []):
+                    groups[comp["id"]] = (subject_code, comp.get("type"))
+            solution = assign_pool_rooms(solution, members, durations, groups)
+        return solution
+
+    def export_solution(self, solution=None):
         print("\n--- Exporting Output ---")
         results = []
 
+        if solution is None:
+            solution = self.extract_solution()
+
         courses = self.data["courses"]
         rooms = self.data["rooms"]
         time_slots = self.data.get("time_slots", [])
+        room_capacity = {r["id"]: r.get("จำนวนที่นั่ง", "") for r in rooms}
 
         for c in courses:
             c_id = c["id"]
-            activities = self.all_vars[c_id]["activities"]
-            for act_id, act in activities.items():
+            for comp in c.get("components", []):
+                act_id = comp["id"]
+                if act_id not in solution:
+                    continue
                 # 1. ดึงเวลาเริ่มสอน
-                start_slot = self.solver.Value(act["start"])
-                duration = act["duration"]
+                start_slot = solution[act_id]["start"]
+                duration = comp.get("duration_slots", 1)
 
-                # 2. หาว่าสอนห้องไหน (วนดูว่าห้องไหนมีค่า presence == 1)
-                assigned_room = "Unassigned"
-                assigned_room_capacity = ""
-                for r in rooms:
-                    r_id = r["id"]
-                    if self.solver.Value(act["rooms"][r_id]["is_present"]) == 1:
-                        assigned_room = r_id
-                        assigned_room_capacity = r.get("จำนวนที่นั่ง", "")
-                        break
+                # 2. ห้องที่ถูกเลือก
+                assigned_room = solution[act_id]["room"]
+                assigned_room_capacity = room_capacity.get(assigned_room, "")
 
                 start_label = (
                     time_slots[start_slot]["label"]
@@ -87,7 +216,7 @@ class TimetableSolver:
                 # สร้าง Time Label แบบคอลัมน์เดียว: "Thursday 09:00-11:00"
                 time_label = start_label
                 if time_slots and start_slot < len(time_slots):
-                    day = time_slots[start_slot]["day"]
+                    day = day_label(time_slots[start_slot])
                     start_min = time_slots[start_slot]["start_min"]
                     slot_minutes = self.data.get("time_config", {}).get(
                         "slot_minutes", 30
@@ -99,7 +228,7 @@ class TimetableSolver:
                     {
                         "Course_ID": c_id,
                         "Activity_ID": act_id,
-                        "Activity_Type": act.get("type", ""),
+                        "Activity_Type": comp.get("type", ""),
                         "Course_Name": c.get("ชื่อวิชาภาษาอังกฤษ", c.get("name", "")),
                         "Enrollment": c.get("ลง", ""),
                         "Room_ID": assigned_room,
@@ -112,10 +241,16 @@ class TimetableSolver:
                 )
 
         if results:
+            # import ตอนใช้จริง (ไม่ให้ pandas ถ่วงเวลาเริ่มโปรแกรม)
+            import pandas as pd
+
             df_out = pd.DataFrame(results)
-            os.makedirs("output", exist_ok=True)
             output_path = self._next_versioned_output_path("output")
-            df_out.to_csv(output_path, index=False)
+            # เขียนไฟล์ชั่วคราวแล้ว rename (ผู้อ่าน เช่น validator ไม่เห็นไฟล์ครึ่งๆ กลางๆ)
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            df_out.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, output_path)
+            RunArchive("output").record("schedule", output_path, rows=len(df_out))
             self.last_output_path = output_path
             print(f"Saved result to: {output_path}")
             print(df_out.head())
@@ -129,10 +264,9 @@ class TimetableSolver:
         """
         print("\n--- Infeasibility Report ---")
         print("Model is INFEASIBLE.")
-        core = self.solver.SufficientAssumptionsForInfeasibility()
-        if core:
+        names = self._unsat_core_names()
+        if names:
             print("Unsat Core Assumptions:")
-            names = [v.Name() for v in core]
             print(", ".join(names))
 
             details = self.data.get("assumption_details", {})
@@ -144,6 +278,22 @@ class TimetableSolver:
         else:
             print("No unsat core available.")
 
+    def _unsat_core_names(self):
+        """
+        ชื่อของ assumption ใน unsat core
+        (solver คืนค่าเป็น index ของตัวแปร ชื่อถูกสร้างจาก data["var_names"] ตอนนี้)
+        """
+        core = self.solver.SufficientAssumptionsForInfeasibility()
+        var_names = self.data.get("var_names")
+        names = []
+        for literal in core:
+            index = literal if isinstance(literal, int) else literal.Index()
+            if var_names is not None:
+                names.append(var_names.name_of_index(index))
+            else:
+                names.append(self.model.Proto().variables[index].name)
+        return names
+
     def _minutes_to_time(self, minutes):
         h = minutes // 60
         m = minutes % 60
@@ -151,39 +301,30 @@ class TimetableSolver:
 
     def _next_versioned_output_path(self, output_dir):
         """
-        สร้างชื่อไฟล์แบบวิ่งเลขเวอร์ชัน: Schdule_Result_V.1.csv, Schdule_Result_V.2.csv, ...
+        จอง run ใหม่แบบ atomic (output/runs/V.<n>/ ดู runs.RunArchive)
+        คืนค่า path ของผลลัพธ์ใน run นั้น: runs/V.<n>/Schdule_Result_V.<n>.csv
         """
-        prefix = "Schdule_Result_V."
-        existing = []
-        for fname in os.listdir(output_dir):
-            if fname.startswith(prefix) and fname.endswith(".csv"):
-                num_str = fname[len(prefix) : -4]
-                if num_str.isdigit():
-                    existing.append(int(num_str))
-
-        next_ver = (max(existing) + 1) if existing else 1
-        return os.path.join(output_dir, f"{prefix}{next_ver}.csv")
+        version, run_dir = RunArchive(output_dir).allocate()
+        return os.path.join(run_dir, f"Schdule_Result_V.{version}.csv")
 
     def _next_versioned_log_path(self, output_dir):
-        prefix = "Schdule_Result_V."
-        existing = []
-        for fname in os.listdir(output_dir):
-            if fname.startswith(prefix) and fname.endswith(".md"):
-                num_str = fname[len(prefix) : -3]
-                if num_str.isdigit():
-                    existing.append(int(num_str))
-
-        next_ver = (max(existing) + 1) if existing else 1
-        return os.path.join(output_dir, f"{prefix}{next_ver}.md")
-
-    def _write_run_log(self, status, start_dt, end_dt, elapsed_sec):
-        log_dir = os.path.join("output", "logs")
-        os.makedirs(log_dir, exist_ok=True)
+        # run ที่ไม่มีผลลัพธ์ (เช่น INFEASIBLE) ก็ได้ run ของตัวเอง
+        version, run_dir = RunArchive(output_dir).allocate()
+        return os.path.join(run_dir, f"Schdule_Result_V.{version}.md")
+
+    def _run_log_path(self):
+        # log อยู่โฟลเดอร์เดียวกับผลลัพธ์ของ run นี้
         if self.last_output_path:
-            base = os.path.basename(self.last_output_path).replace(".csv", ".md")
-            log_path = os.path.join(log_dir, base)
-        else:
-            log_path = self._next_versioned_log_path(log_dir)
+            return self.last_output_path[: -len(".csv")] + ".md"
+        return self._next_versioned_log_path("output")
+
+    def _write_run_log(
+        self, status, start_dt, end_dt, elapsed_sec, extra_lines=None, telemetry=None
+    ):
+        """
+        เขียน run log (.md) และ telemetry (.json ชื่อเดียวกัน สำหรับอ่านด้วยโปรแกรม)
+        """
+        log_path = self._run_log_path()
 
         status_map = {
             cp_model.OPTIMAL: "OPTIMAL",
@@ -206,24 +347,46 @@ class TimetableSolver:
             f"- Elapsed (s): {elapsed_sec:.6f}",
             "",
             "## Solver Parameters",
-            f"- max_time_in_seconds: {self.solver.parameters.max_time_in_seconds}",
-            f"- log_search_progress: {self.solver.parameters.log_search_progress}",
-            f"- num_search_workers: {self.solver.parameters.num_search_workers}",
-            "",
-            "## Status",
-            f"- status: {status_map.get(status, 'UNKNOWN')}",
-            f"- objective: {objective_val}",
-            f"- conflicts: {self.solver.NumConflicts()}",
-            f"- branches: {self.solver.NumBranches()}",
-            f"- wall_time (s): {self.solver.WallTime()}",
         ]
+        lines.extend(f"- {key}: {value}" for key, value in self.params.items())
+        lines.extend(
+            [
+                "",
+                "## Status",
+                f"- status: {status_map.get(status, 'UNKNOWN')}",
+                f"- objective: {objective_val}",
+                f"- conflicts: {self.solver.NumConflicts()}",
+                f"- branches: {self.solver.NumBranches()}",
+                f"- wall_time (s): {self.solver.WallTime()}",
+            ]
+        )
+
+        report = self.data.get("presolve_report")
+        if report:
+            lines.append("")
+            lines.append("## Presolve")
+            lines.extend(f"- {key}: {value}" for key, value in report.items())
+
+        unavailable = self.data.get("teacher_unavailable")
+        if unavailable:
+            # กิจกรรมที่อาจารย์ไม่มีช่วงว่างยาวพอ (ทำให้ INFEASIBLE ดู Constraints)
+            lines.append("")
+            lines.append("## Teacher Availability Not Met")
+            lines.extend(
+                f"- {item['activity']}: {', '.join(item['teachers'])}"
+                for item in unavailable
+            )
+
+        memory = self.data.get("memory")
+        if memory is not None and memory.stages:
+            lines.append("")
+            lines.extend(memory.lines())
 
         if status == cp_model.INFEASIBLE:
-            core = self.solver.SufficientAssumptionsForInfeasibility()
-            if core:
+            names = self._unsat_core_names()
+            if names:
                 lines.append("")
                 lines.append("## Unsat Core Assumptions")
-                names = [v.Name() for v in core]
                 lines.append(", ".join(names))
                 details = self.data.get("assumption_details", {})
                 if details:
@@ -233,5 +396,66 @@ class TimetableSolver:
                         if n in details:
                             lines.append(f"- {n}: {details[n]}")
 
-        with open(log_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+        repro = self.data.get("reproducibility")
+        if repro:
+            repro = dict(repro)
+            if self.last_output_path:
+                repro["schedule"] = file_digest(self.last_output_path)
+            lines.append("")
+            lines.extend(self._reproducibility_lines(repro, log_path))
+
+        if extra_lines:
+            lines.append("")
+            lines.extend(extra_lines)
+
+        atomic_write_text(log_path, "\n".join(lines))
+
+        payload = {
+            "status": status_map.get(status, "UNKNOWN"),
+            "objective": objective_val,
+            "wall_time": self.solver.WallTime(),
+            "elapsed": elapsed_sec,
+            "output_path": self.last_output_path,
+        }
+        if memory is not None:
+            payload["memory"] = memory.stages
+        if repro:
+            payload["reproducibility"] = repro
+        payload.update(telemetry or {})
+        telemetry_path = log_path[: -len(".md")] + ".json"
+        atomic_write_text(
+            telemetry_path,
+            json.dumps(payload, ensure_ascii=False, indent=2, default=str),
+        )
+        fields = {"status": payload["status"], "telemetry": telemetry_path}
+        if repro:
+            # key สำหรับ cache / หา run ที่ input เหมือนกัน
+            fields["fingerprint"] = repro["fingerprints"]["run"]
+        RunArchive("output").record("log", log_path, **fields)
+
+    def _reproducibility_lines(self, repro, log_path):
+        fingerprints = repro["fingerprints"]
+        lines = [
+            "## Reproducibility",
+            f"- replay: timetable --replay {os.path.basename(os.path.dirname(log_path))}",
+            f"- data_dir: {repro['data_dir']}",
+            f"- excluded courses: {', '.join(repro['exclude_codes']) or '-'}",
+            f"- polish iterations: {repro['polish_iterations']}",
+            f"- wall-clock limit reached: {self._hit_wall_limit()}",
+            "",
+            "## Fingerprints (sha256)",
+        ]
+        lines.extend(
+            f"- data/{fname}: {digest}"
+            for fname, digest in fingerprints["data"].items()
+        )
+        lines.append(f"- config: {fingerprints['config']}")
+        lines.append(f"- model: {fingerprints.get('model', '-')}")
+        lines.append(f"- run: {fingerprints['run']}")
+        lines.append(f"- schedule: {repro.get('schedule', '-')}")
+        return lines
+
+    def _hit_wall_limit(self):
+        # หยุดเพราะเวลาจริงหมด (ไม่ใช่ deterministic time) -> run ซ้ำอาจได้ผลต่างไป
+        limit = self.params.get("max_time_in_seconds")
+        return bool(limit) and self.solver.WallTime() >= limit
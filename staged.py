@@ -0,0 +1,119 @@
+import math
+import time
+from datetime import datetime
+
+from ortools.sat.python import cp_model
+from src.config import STAGED
+from src.solver import TimetableSolver
+
+
+class StagedSolver:
+    """
+    Lexicographic / staged solving แทน weighted sum ก้อนเดียว
+    1. หา feasible solution (ไม่มี objective)
+    2. optimize ทีละ tier ตาม config.STAGED["stages"]
+       ค่าที่ได้ของ tier จะถูกตรึงเป็น upper bound และใช้คำตอบเป็น hint ของ tier ถัดไป
+    """
+
+    def __init__(self, timetable_model, data, config=None):
+        self.timetable_model = timetable_model
+        self.data = data
+        self.config = dict(STAGED)
+        if config:
+            self.config.update(config)
+
+        self.solution = None
+        self.stage_results = []
+
+    def solve(self):
+        start_ts = time.time()
+        start_dt = datetime.now()
+
+        model = self.timetable_model.model
+        all_vars = self.timetable_model.all_vars
+        constraints = self.timetable_model.constraints
+        tolerance = float(self.config.get("tolerance", 0.0))
+
+        solver = TimetableSolver(model, all_vars, self.data)
+        base_params = dict(solver.params)
+        status = cp_model.UNKNOWN
+
+        # Stage 0: Feasibility
+        print("--- Staged Solving: feasibility ---")
+        model.ClearObjective()
+        solver.params["max_time_in_seconds"] = float(self.config["feasibility_time"])
+        status = self._run_stage(solver, "feasibility", None)
+        if self.solution is None:
+            solver.analyze_status(status)
+            if status == cp_model.INFEASIBLE:
+                solver.report_infeasibility()
+            self._finish(solver, status, start_ts, start_dt)
+            return status
+
+        # Stage 1..n: optimize ทีละ tier
+        for stage in self.config["stages"]:
+            terms = [t for t in stage["terms"] if t in constraints.objective_terms]
+            if not terms:
+                print(f"[Stage {stage['name']}] skipped (no terms in model)")
+                continue
+
+            print(f"--- Staged Solving: {stage['name']} ({', '.join(terms)}) ---")
+            tier_expr = constraints.weighted_objective(terms)
+            model.ClearObjective()
+            model.ClearHints()
+            self.timetable_model.add_hints(self.solution)
+            model.Minimize(tier_expr)
+
+            solver.params = dict(base_params)
+            solver.params["max_time_in_seconds"] = float(stage["time"])
+            solver.params.update(stage.get("params", {}))
+            stage_status = self._run_stage(solver, stage["name"], tier_expr)
+            if stage_status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                status = stage_status
+                # ตรึงค่าที่ดีที่สุดของ tier นี้เป็น bound ของ tier ถัดไป
+                best = int(round(solver.solver.ObjectiveValue()))
+                model.Add(tier_expr <= best + math.floor(abs(best) * tolerance))
+
+        model.ClearObjective()
+        solver.analyze_status(status)
+        solver.export_solution(self.solution)
+        self._finish(solver, status, start_ts, start_dt)
+        return status
+
+    def _run_stage(self, solver, name, tier_expr):
+        stage_start = time.time()
+        stage_status = solver.run()
+        result = {
+            "name": name,
+            "status": solver.solver.StatusName(stage_status),
+            "objective": None,
+            "bound": None,
+            "time": time.time() - stage_start,
+        }
+        if stage_status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.solution = solver.extract_solution()
+            if tier_expr is not None:
+                result["objective"] = solver.solver.ObjectiveValue()
+                result["bound"] = solver.solver.BestObjectiveBound()
+        self.stage_results.append(result)
+        print(
+            f"[Stage {name}] status={result['status']} "
+            f"objective={result['objective']} bound={result['bound']} "
+            f"time={result['time']:.2f}s"
+        )
+        return stage_status
+
+    def _finish(self, solver, status, start_ts, start_dt):
+        lines = [
+            "## Stages",
+            "| stage | status | objective | bound | time (s) |",
+            "|---|---|---|---|---|",
+        ]
+        for r in self.stage_results:
+            lines.append(
+                f"| {r['name']} | {r['status']} | {r['objective']} "
+                f"| {r['bound']} | {r['time']:.2f} |"
+            )
+        solver._write_run_log(
+            status, start_dt, datetime.now(), time.time() - start_ts, lines
+        )
@@ -0,0 +1,327 @@
+import math
+
+
+def _to_int(value):
+    if value is None:
+        return 0
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        digits = "".join([c for c in str(value) if c.isdigit()])
+        return int(digits) if digits else 0
+
+
+def group_identical_rooms(rooms):
+    """
+    จัดกลุ่มห้องที่สลับกันได้ (ความจุเท่ากัน และ feature อื่นเหมือนกันทุกคอลัมน์)
+    คืนค่า list ของกลุ่ม: [{"capacity": int, "rooms": [room_id, ...]}, ...]
+    """
+    groups = {}
+    for r in rooms:
+        features = tuple(
+            sorted(
+                (str(k), str(v).strip())
+                for k, v in r.items()
+                if k not in ("id", "ห้อง", "จำนวนที่นั่ง")
+            )
+        )
+        key = (_to_int(r.get("จำนวนที่นั่ง", 0)), features)
+        groups.setdefault(key, []).append(r["id"])
+
+    return [
+        {"capacity": capacity, "rooms": room_ids}
+        for (capacity, _), room_ids in groups.items()
+    ]
+
+
+class SymmetryBreaker:
+    """
+    ตัด symmetry ของโมเดลก่อน solve
+    - ห้องที่เหมือนกัน (และกิจกรรมชุดเดียวกันใช้ได้): บังคับให้จำนวนครั้งที่ใช้ห้องเรียงจากมากไปน้อย
+    - กลุ่มเรียนที่สลับกันได้ (รหัสวิชา, ชั้นปี, จำนวนลง, อาจารย์, โดเมนของกิจกรรม และ cohort
+      ชุดเดียวกัน): บังคับให้เวลาเริ่มของกิจกรรมแรกเรียงกันตามลำดับ
+    - stream ที่สลับกันได้ทั้งชุด (cohort ที่อนุมานแบ่งกลุ่มเรียนลำดับที่ i ไว้ใน stream ที่ i
+      จึงสลับกลุ่มเรียนทีละวิชาไม่ได้ แต่สลับทุกวิชาของ stream พร้อมกันได้): เรียงตามวิชาแรก
+    การสลับห้องกับการสลับกลุ่มเรียนเป็นอิสระต่อกัน จึงใช้ทั้งสองแบบพร้อมกันได้
+    ทุก cut มี assumption literal (assumption(name, detail) จาก Constraints) ให้ unsat core
+    บอกได้ว่า INFEASIBLE เพราะ cut ไม่ใช่เพราะข้อมูล
+    """
+
+    def __init__(self, model, all_vars, data, assumption=None):
+        self.model = model
+        self.all_vars = all_vars
+        self.data = data
+        self.assumption = assumption
+        self.report = {}
+        # กลุ่มที่ตัดแล้ว (ใช้จัด hint ให้ตรงกับลำดับใน canonical_hint)
+        self.room_groups = []
+        # แต่ละ class: list ของ unit (tuple ของ course id ที่ย้ายไปด้วยกัน) ตามลำดับของ cut
+        self.course_classes = []
+        self.literals = []
+
+    def apply(self):
+        print("Breaking Symmetry")
+        room_cuts = self._break_room_symmetry()
+        section_classes, stream_classes = self._course_classes()
+        course_cuts = self._break_course_symmetry(section_classes + stream_classes)
+        if self.literals:
+            self.model.AddAssumptions(self.literals)
+
+        classes = self.room_groups + self.course_classes
+        self.report = {
+            "room_classes": len(self.room_groups),
+            "rooms_in_classes": sum(len(g) for g in self.room_groups),
+            "room_ordering_constraints": room_cuts,
+            "course_classes": len(section_classes),
+            "courses_in_classes": sum(len(g) for g in section_classes),
+            "stream_classes": len(stream_classes),
+            "streams_in_classes": sum(len(g) for g in stream_classes),
+            "course_ordering_constraints": course_cuts,
+            # log10 ของจำนวน permutation ที่ถูกตัดออก (sum log10(k!))
+            "log10_permutations_removed": round(
+                sum(math.lgamma(len(g) + 1) for g in classes) / math.log(10), 2
+            ),
+        }
+
+        print(
+            f"[Symmetry] Rooms: {self.report['rooms_in_classes']} rooms in "
+            f"{self.report['room_classes']} classes "
+            f"({room_cuts} ordering constraints)"
+        )
+        print(
+            f"[Symmetry] Courses: {self.report['courses_in_classes']} sections in "
+            f"{self.report['course_classes']} classes, "
+            f"{self.report['streams_in_classes']} streams in "
+            f"{self.report['stream_classes']} classes "
+            f"({course_cuts} ordering constraints)"
+        )
+        print(
+            "[Symmetry] Removed ~10^"
+            f"{self.report['log10_permutations_removed']} equivalent solutions"
+        )
+        return self.report
+
+    def _guard(self, name, detail):
+        if self.assumption is None:
+            return None
+        literal = self.assumption(name, detail)
+        self.literals.append(literal)
+        return literal
+
+    def _add_cut(self, constraint, literal):
+        if literal is not None:
+            constraint.OnlyEnforceIf(literal)
+
+    def _break_room_symmetry(self):
+        usage_terms = {}
+        # ห้องสลับกันได้เมื่อกิจกรรมชุดเดียวกันเลือกได้ (เช่น ห้องที่ presolve ตรึงไว้สลับไม่ได้)
+        acts_of_room = {}
+        for c_vars in self.all_vars.values():
+            for act_id, act in c_vars["activities"].items():
+                for r_id, room_vars in act["rooms"].items():
+                    usage_terms.setdefault(r_id, []).append(room_vars["is_present"])
+                    acts_of_room.setdefault(r_id, []).append(act_id)
+
+        groups = []
+        for g in group_identical_rooms(self.data["rooms"]):
+            by_acts = {}
+            for r_id in g["rooms"]:
+                if r_id in usage_terms:
+                    key = frozenset(acts_of_room[r_id])
+                    by_acts.setdefault(key, []).append(r_id)
+            groups.extend(ids for ids in by_acts.values() if len(ids) > 1)
+
+        cuts = 0
+        for room_ids in groups:
+            literal = self._guard(
+                "symmetry_room_order", {"room_id": room_ids[0], "rooms": len(room_ids)}
+            )
+            for r_a, r_b in zip(room_ids, room_ids[1:]):
+                self._add_cut(
+                    self.model.Add(sum(usage_terms[r_a]) >= sum(usage_terms[r_b])),
+                    literal,
+                )
+                cuts += 1
+        self.room_groups = groups
+        return cuts
+
+    def _signature(self, c):
+        """
+        สิ่งที่ต้องเหมือนกันเพื่อให้สลับกลุ่มเรียนได้ (ไม่รวม cohort)
+        โดเมนของแต่ละกิจกรรม (start ที่อาจารย์ว่าง / ห้องที่ใช้ได้) มาจาก all_vars
+        """
+        subject_code = str(c.get("รหัสวิชา", "")).strip()
+        activities = self.all_vars[c["id"]]["activities"]
+        if not subject_code or not activities:
+            return None
+        return (
+            subject_code,
+            str(c.get("ชั้นปี", "")).strip(),
+            _to_int(c.get("ลง", 0)),
+            frozenset(c.get("teacher_list", [])),
+            tuple(
+                (
+                    act["type"],
+                    act["duration"],
+                    tuple(act["valid_starts"]),
+                    frozenset(act["rooms"]),
+                )
+                for act in activities.values()
+            ),
+        )
+
+    def _course_classes(self):
+        """
+        คืนค่า (section_classes, stream_classes) แต่ละ class เป็น list ของ unit
+        - section: unit = (course id,) กลุ่มเรียนที่อยู่ใน cohort ชุดเดียวกันทุก cohort
+        - stream: unit = course id ของ cohort ที่ต่างจาก cohort อื่นใน class เรียงตาม signature
+          ใช้เมื่อการสลับ unit ทั้งชุดพา cohort ทุกกลุ่มไปเป็น cohort ที่มีอยู่จริง
+        """
+        signature_ids = {}
+        signature_of = {}
+        for c in self.data["courses"]:
+            if c["id"] not in self.all_vars:
+                continue
+            signature = self._signature(c)
+            if signature is not None:
+                signature_of[c["id"]] = signature_ids.setdefault(
+                    signature, len(signature_ids)
+                )
+
+        cohorts = {}
+        cohorts_of = {}
+        for cohort_id, course_ids in self.data.get("cohorts", {}).items():
+            members = frozenset(c_id for c_id in course_ids if c_id in self.all_vars)
+            if members:
+                cohorts[cohort_id] = members
+                for c_id in members:
+                    cohorts_of.setdefault(c_id, set()).add(cohort_id)
+
+        groups = {}
+        for c_id, sig in signature_of.items():
+            key = (sig, frozenset(cohorts_of.get(c_id, ())))
+            groups.setdefault(key, []).append((c_id,))
+        section_classes = [units for units in groups.values() if len(units) > 1]
+        used = {c_id for units in section_classes for unit in units for c_id in unit}
+
+        stream_classes = []
+        if cohorts:
+            for units in self._stream_classes(cohorts, signature_of):
+                moved = {c_id for unit in units for c_id in unit}
+                if moved & used:
+                    continue
+                used |= moved
+                stream_classes.append(units)
+        return section_classes, stream_classes
+
+    def _stream_classes(self, cohorts, signature_of):
+        family = set(cohorts.values())
+        buckets = {}
+        for cohort_id, members in cohorts.items():
+            if all(c_id in signature_of for c_id in members):
+                key = tuple(sorted(signature_of[c_id] for c_id in members))
+                buckets.setdefault(key, []).append(cohort_id)
+
+        classes = []
+        for cohort_ids in buckets.values():
+            remaining = list(cohort_ids)
+            while len(remaining) > 1:
+                head = remaining.pop(0)
+                members = [head]
+                for cohort_id in list(remaining):
+                    units = self._stream_units(
+                        cohorts, members + [cohort_id], signature_of
+                    )
+                    if units and self._is_symmetry(units, family):
+                        members.append(cohort_id)
+                        remaining.remove(cohort_id)
+                if len(members) > 1:
+                    units = self._stream_units(cohorts, members, signature_of)
+                    classes.append(units)
+        return classes
+
+    def _stream_units(self, cohorts, cohort_ids, signature_of):
+        shared = frozenset.intersection(*(cohorts[k] for k in cohort_ids))
+        units = []
+        seen = set()
+        for cohort_id in cohort_ids:
+            moved = cohorts[cohort_id] - shared
+            unit = tuple(sorted(moved, key=lambda c_id: signature_of[c_id]))
+            if not unit or seen & moved:
+                return None
+            seen |= moved
+            units.append(unit)
+        sig_rows = {tuple(signature_of[c_id] for c_id in unit) for unit in units}
+        if len(sig_rows) != 1 or len(set(next(iter(sig_rows)))) != len(units[0]):
+            return None
+        return units
+
+    def _is_symmetry(self, units, family):
+        # สลับ unit แรกกับทุก unit (transposition เหล่านี้สร้างทุก permutation ของ class)
+        for unit in units[1:]:
+            swap = {}
+            for c_a, c_b in zip(units[0], unit):
+                swap[c_a] = c_b
+                swap[c_b] = c_a
+            for members in family:
+                if not members.isdisjoint(swap):
+                    if frozenset(swap.get(c, c) for c in members) not in family:
+                        return False
+        return True
+
+    def _break_course_symmetry(self, classes):
+        cuts = 0
+        for units in classes:
+            literal = self._guard(
+                "symmetry_course_order",
+                {"course": units[0][0], "units": len(units)},
+            )
+            firsts = [self._first_activity(unit[0])["start"] for unit in units]
+            for s_a, s_b in zip(firsts, firsts[1:]):
+                self._add_cut(self.model.Add(s_a <= s_b), literal)
+                cuts += 1
+        self.course_classes = classes
+        return cuts
+
+    def _first_activity(self, c_id):
+        return next(iter(self.all_vars[c_id]["activities"].values()))
+
+    def canonical_hint(self, solution):
+        """
+        สลับคำตอบ (เช่นจาก greedy) ให้เป็นตัวแทนที่ผ่าน cut ข้างบน
+        (hint ที่ขัดกับ cut ทำให้ solver ทิ้ง hint ไปทั้งชุด)
+        solution: {act_id: {"start": slot, "room": room_id}} ห้องเป็น id ในโมเดล
+        """
+        solution = dict(solution)
+
+        for units in self.course_classes:
+            acts = [
+                [list(self.all_vars[c_id]["activities"]) for c_id in unit]
+                for unit in units
+            ]
+            pivots = [solution.get(unit_acts[0][0]) for unit_acts in acts]
+            if any(p is None for p in pivots):
+                continue
+            order = sorted(range(len(units)), key=lambda k: pivots[k]["start"])
+            moved = {}
+            for target, source in enumerate(order):
+                for target_acts, source_acts in zip(acts[target], acts[source]):
+                    for t_act, s_act in zip(target_acts, source_acts):
+                        moved[t_act] = solution.get(s_act)
+            for act_id, sol in moved.items():
+                if sol is None:
+                    solution.pop(act_id, None)
+                else:
+                    solution[act_id] = sol
+
+        for room_ids in self.room_groups:
+            usage = {r_id: 0 for r_id in room_ids}
+            for sol in solution.values():
+                if sol.get("room") in usage:
+                    usage[sol["room"]] += 1
+            ranked = sorted(room_ids, key=lambda r_id: -usage[r_id])
+            relabel = dict(zip(ranked, room_ids))
+            for act_id, sol in solution.items():
+                if sol.get("room") in relabel:
+                    solution[act_id] = dict(sol, room=relabel[sol["room"]])
+        return solution
@@ -1,9 +1,17 @@
 import os
 import glob
-import pandas as pd
+import argparse
 
 
 def _find_latest_schedule():
+    # run ใหม่ถูกบันทึกใน output/manifest.jsonl (ไม่ต้อง glob ทั้งโฟลเดอร์)
+    from src.runs import RunArchive
+
+    latest = RunArchive("output").latest("schedule")
+    if latest:
+        return latest
+
+    # ผลลัพธ์แบบเดิม (ก่อนมี manifest) อยู่ใน output/ โดยตรง
     candidates = glob.glob(os.path.join("output", "Schdule_Result_V.*.csv"))
     if not candidates:
         # fallback to legacy name
@@ -55,19 +63,56 @@ def _parse_indices(raw, max_idx):
 
 
 def _find_conflicts(df_sched):
+    # ใช้ OccupancyIndex (track_owners) แทนการเทียบทุกคู่ O(n^2)
+    from src.occupancy import OccupancyIndex
+
     conflicts = []
     rows = df_sched.sort_values(["Start_Slot", "End_Slot"]).reset_index(drop=True)
-    for i in range(len(rows)):
-        a = rows.iloc[i]
-        for j in range(i + 1, len(rows)):
-            b = rows.iloc[j]
-            # overlap in global slot timeline
-            if a["Start_Slot"] < b["End_Slot"] and b["Start_Slot"] < a["End_Slot"]:
-                conflicts.append((a, b))
+    if rows.empty:
+        return conflicts
+    index = OccupancyIndex(int(rows["End_Slot"].max()), track_owners=True)
+    for j in range(len(rows)):
+        b = rows.iloc[j]
+        start, duration = int(b["Start_Slot"]), int(b["End_Slot"]) - int(b["Start_Slot"])
+        if duration <= 0:
+            continue
+        # overlap in global slot timeline
+        for i in index.owners("all", start, duration):
+            conflicts.append((rows.iloc[i], b))
+        index.assign("all", start, duration, owner=j)
     return conflicts
 
 
-def main():
+def report_objective(schedule_path, data_dir="data"):
+    """
+    แยก objective ของตารางที่ export แล้ว (CSV อย่างเดียว ไม่ต้อง solve) ตาม penalty แต่ละกลุ่ม
+    ข้อมูลวิชา/ห้อง/คาบโหลดจาก data_dir แบบเดียวกับตอน solve
+    """
+    import pandas as pd
+    from src.data_loader import DataLoader
+    from src.objectives import breakdown_from_schedule, breakdown_lines
+    from src.presolve import reduce_data
+
+    data = reduce_data(DataLoader(data_dir, interactive=False).load_data())
+    df_sched = pd.read_csv(schedule_path, dtype=str)
+    breakdown = breakdown_from_schedule(df_sched.to_dict("records"), data)
+    print("\n" + "\n".join(breakdown_lines(breakdown)))
+    return breakdown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check conflicts of selected courses in the latest schedule"
+    )
+    parser.add_argument(
+        "--objective", action="store_true",
+        help="แสดง objective breakdown ของตารางล่าสุดแทนการตรวจ conflict (ไม่ถามอะไร)",
+    )
+    args = parser.parse_args(argv)
+
+    # import ตอนใช้จริง (ไม่ให้ pandas ถ่วงเวลา import module นี้)
+    import pandas as pd
+
     courses_path = os.path.join("data", "Comsci_Test.csv")
     schedule_path = _find_latest_schedule()
 
@@ -79,6 +124,10 @@ def main():
         print("Error: schedule result file not found in output/.")
         return
 
+    if args.objective:
+        report_objective(schedule_path)
+        return
+
     df_courses = pd.read_csv(courses_path, dtype=str)
 
     years = sorted(